@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+
+"""
+tile_pyramid.py
+────────────────────────────────────────────────────────────────────────────
+XYZ web-map tiles of wind_simulation_module velocity grids
+
+Renders a run's ux/uy grids, georeferenced by their EPSG:2180 bounds, as
+Web Mercator "{z}/{x}/{y}.png" tiles so the web map loads only the visible
+part of a result. Self-contained (numpy and the standard library): the
+EPSG:2180 projection and the PNG encoder are built in.
+
+API:
+-----
+generate_tile_pyramid(ux, uy, bounds, out_dir) → dict (tiles.json: zooms, layers, colour/velocity scales)
+grid_bounds(grid_info) → EPSG:2180 bounds from grid_info["bounds"] / grid_info["grid_properties"]["bounds"]
+`python tile_pyramid.py` → demo pyramid in a temporary directory
+"""
+
+import json
+import multiprocessing
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# EPSG:2180 (PUWG 1992): transverse Mercator on GRS80, central meridian 19°E,
+# scale 0.9993, false easting 500 km and northing -5300 km. ETRS89 and WGS84
+# agree to well below a grid cell, so latitudes/longitudes are used as WGS84
+_PUWG92 = {"a": 6378137.0, "f": 1.0 / 298.257222101, "lon0": 19.0, "k0": 0.9993,
+           "false_easting": 500000.0, "false_northing": -5300000.0}
+_WEB_MERCATOR_RADIUS = 6378137.0
+
+def _tm_series(f: float) -> Dict:
+    """Krüger series coefficients (to n³, sub-millimetre) of a transverse Mercator on flattening f"""
+    n = f / (2.0 - f)
+    return {
+        "n": n,
+        "A": (1.0 + n * n / 4.0 + n ** 4 / 64.0) / (1.0 + n),
+        "alpha": (n / 2.0 - 2.0 * n * n / 3.0 + 5.0 * n ** 3 / 16.0,
+                  13.0 * n * n / 48.0 - 3.0 * n ** 3 / 5.0,
+                  61.0 * n ** 3 / 240.0),
+        "beta": (n / 2.0 - 2.0 * n * n / 3.0 + 37.0 * n ** 3 / 96.0,
+                 n * n / 48.0 + n ** 3 / 15.0,
+                 17.0 * n ** 3 / 480.0),
+        "delta": (2.0 * n - 2.0 * n * n / 3.0 - 2.0 * n ** 3,
+                  7.0 * n * n / 3.0 - 8.0 * n ** 3 / 5.0,
+                  56.0 * n ** 3 / 15.0)
+    }
+
+def _puwg92_from_lonlat(lon: np.ndarray, lat: np.ndarray):
+    """EPSG:2180 easting/northing (m) of longitudes/latitudes (degrees)"""
+    p = _PUWG92
+    s = _tm_series(p["f"])
+    phi = np.deg2rad(lat)
+    dlon = np.deg2rad(lon - p["lon0"])
+    e = 2.0 * np.sqrt(s["n"]) / (1.0 + s["n"])
+    t = np.sinh(np.arctanh(np.sin(phi)) - e * np.arctanh(e * np.sin(phi)))
+    xi = np.arctan2(t, np.cos(dlon))
+    eta = np.arctanh(np.sin(dlon) / np.sqrt(1.0 + t * t))
+    x, y = eta.copy(), xi.copy()
+    for j, alpha in enumerate(s["alpha"], start=1):
+        x += alpha * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+        y += alpha * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+    scale = p["k0"] * p["a"] * s["A"]
+    return p["false_easting"] + scale * x, p["false_northing"] + scale * y
+
+def _lonlat_from_puwg92(easting: np.ndarray, northing: np.ndarray):
+    """Longitudes/latitudes (degrees) of EPSG:2180 easting/northing (m)"""
+    p = _PUWG92
+    s = _tm_series(p["f"])
+    scale = p["k0"] * p["a"] * s["A"]
+    xi = (np.asarray(northing, dtype=np.float64) - p["false_northing"]) / scale
+    eta = (np.asarray(easting, dtype=np.float64) - p["false_easting"]) / scale
+    xi1, eta1 = xi.copy(), eta.copy()
+    for j, beta in enumerate(s["beta"], start=1):
+        xi1 -= beta * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+        eta1 -= beta * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+    chi = np.arcsin(np.sin(xi1) / np.cosh(eta1))
+    phi = chi.copy()
+    for j, delta in enumerate(s["delta"], start=1):
+        phi += delta * np.sin(2 * j * chi)
+    lon = p["lon0"] + np.rad2deg(np.arctan2(np.sinh(eta1), np.cos(xi1)))
+    return lon, np.rad2deg(phi)
+
+def _png_bytes(rgba: np.ndarray) -> bytes:
+    """PNG file (8-bit RGBA, no row filter, zlib) of an (h, w, 4) uint8 image"""
+    h, w = rgba.shape[:2]
+    rows = np.zeros((h, 4 * w + 1), dtype=np.uint8)
+    rows[:, 1:] = rgba.reshape(h, 4 * w)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+            + chunk(b"IEND", b""))
+
+def _sample_nearest(field: np.ndarray, x: np.ndarray, y: np.ndarray, fill=None) -> np.ndarray:
+    """Nearest-cell lookup; points off the grid get `fill` (or the nearest edge cell)"""
+    ny, nx = field.shape
+    i = np.rint(x).astype(np.intp)
+    j = np.rint(y).astype(np.intp)
+    inside = (i >= 0) & (i < nx) & (j >= 0) & (j < ny)
+    values = field[np.clip(j, 0, ny - 1), np.clip(i, 0, nx - 1)]
+    if fill is not None:
+        values = np.where(inside, values, fill)
+    return values
+
+def _sample_bilinear(field: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Bilinear interpolation, clamped to the grid"""
+    ny, nx = field.shape
+    x = np.clip(x, 0.0, nx - 1)
+    y = np.clip(y, 0.0, ny - 1)
+    i0 = np.floor(x).astype(np.intp)
+    j0 = np.floor(y).astype(np.intp)
+    i1 = np.minimum(i0 + 1, nx - 1)
+    j1 = np.minimum(j0 + 1, ny - 1)
+    fx = x - i0
+    fy = y - j0
+    return ((1.0 - fy) * ((1.0 - fx) * field[j0, i0] + fx * field[j0, i1])
+            + fy * ((1.0 - fx) * field[j1, i0] + fx * field[j1, i1]))
+
+# Magnitude colour map: viridis anchors, interpolated to a 256-entry lookup table
+_VIRIDIS_ANCHORS = np.array([
+    [68, 1, 84], [72, 40, 120], [62, 74, 137], [49, 104, 142], [38, 130, 142],
+    [31, 158, 137], [53, 183, 121], [109, 205, 89], [180, 222, 44], [253, 231, 37]],
+    dtype=np.float64)
+_MAGNITUDE_COLORMAP = np.stack([
+    np.interp(np.linspace(0.0, 1.0, 256), np.linspace(0.0, 1.0, len(_VIRIDIS_ANCHORS)),
+              _VIRIDIS_ANCHORS[:, channel]) for channel in range(3)], axis=1).round().astype(np.uint8)
+
+def grid_bounds(grid_info: Dict) -> Optional[Tuple[float, float, float, float]]:
+    """
+    EPSG:2180 (min easting, min northing, max easting, max northing) of the
+    grid from grid_info["bounds"] (or grid_info["grid_properties"]["bounds"]),
+    given as a sequence in that order or a dict with minx/miny/maxx/maxy;
+    None if absent.
+    """
+    bounds = grid_info.get("bounds", grid_info.get("grid_properties", {}).get("bounds"))
+    if bounds is None:
+        return None
+    if isinstance(bounds, dict):
+        bounds = [bounds[key] for key in ("minx", "miny", "maxx", "maxy")]
+    return tuple(float(value) for value in bounds)
+
+def _tile_lonlat(z: int, tx: int, ty: int, tile_px: int):
+    """Longitudes/latitudes (degrees) of the pixel centres of XYZ tile (z, tx, ty)"""
+    world = tile_px * 2.0 ** z
+    px = (tx * tile_px + np.arange(tile_px) + 0.5) / world
+    py = (ty * tile_px + np.arange(tile_px) + 0.5) / world
+    lon = px * 360.0 - 180.0
+    lat = np.rad2deg(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * py))))
+    return np.meshgrid(lon, lat)
+
+def _tile_range(lonlat_bounds: Tuple[float, float, float, float], z: int):
+    """Inclusive XYZ tile index ranges (x0, x1, y0, y1) covering west/south/east/north bounds at zoom z"""
+    west, south, east, north = lonlat_bounds
+    n = 2 ** z
+
+    def tile_y(lat):
+        phi = np.deg2rad(lat)
+        return (1.0 - np.log(np.tan(phi) + 1.0 / np.cos(phi)) / np.pi) / 2.0 * n
+
+    x0, x1 = (int(np.clip(np.floor((lon + 180.0) / 360.0 * n), 0, n - 1)) for lon in (west, east))
+    y0, y1 = (int(np.clip(np.floor(tile_y(lat)), 0, n - 1)) for lat in (north, south))
+    return x0, x1, y0, y1
+
+# Grids of the pyramid being rendered, set in each worker by `_init_tile_worker`
+_TILE_GRIDS: Dict = {}
+
+def _init_tile_worker(grids: Dict) -> None:
+    """Process-pool initializer: keep the grids for `_render_tile` calls"""
+    _TILE_GRIDS.clear()
+    _TILE_GRIDS.update(grids)
+
+def _render_tile(tile: Tuple[int, int, int]) -> int:
+    """
+    Write the magnitude and velocity PNGs of one XYZ tile from `_TILE_GRIDS`;
+    returns 1, or 0 for a tile outside the grid (nothing written).
+    """
+    z, tx, ty = tile
+    g = _TILE_GRIDS
+    ny, nx = g["magnitude"].shape
+    tile_px = g["tile_px"]
+    minx, miny, maxx, maxy = g["bounds"]
+
+    # Continuous grid coordinates (cell centres at integers, row 0 north)
+    lon, lat = _tile_lonlat(z, tx, ty, tile_px)
+    easting, northing = _puwg92_from_lonlat(lon, lat)
+    col = (easting - minx) / (maxx - minx) * nx - 0.5
+    row = (maxy - northing) / (maxy - miny) * ny - 0.5
+    inside = (col >= -0.5) & (col <= nx - 0.5) & (row >= -0.5) & (row <= ny - 0.5)
+    if not inside.any():
+        return 0
+    fluid = inside & ~_sample_nearest(g["mask"], col, row)
+
+    magnitude = _sample_bilinear(g["magnitude"], col, row)
+    level = np.clip(magnitude / g["vmax"], 0.0, 1.0) if g["vmax"] > 0 else np.zeros_like(magnitude)
+    rgba = np.zeros((tile_px, tile_px, 4), dtype=np.uint8)
+    rgba[..., :3] = _MAGNITUDE_COLORMAP[np.rint(level * 255).astype(np.intp)]
+    rgba[..., 3] = np.where(fluid, 255, 0)
+    magnitude_png = _png_bytes(rgba)
+
+    # Velocity: (u / scale + 1) * 127.5 in red (ux) and green (uy), blue 0
+    rgba[..., 2] = 0
+    for channel, name in enumerate(("ux", "uy")):
+        u = _sample_bilinear(g[name], col, row) / g["velocity_scale"] if g["velocity_scale"] > 0 else 0.0
+        rgba[..., channel] = np.rint((np.clip(u, -1.0, 1.0) + 1.0) * 127.5).astype(np.uint8)
+    velocity_png = _png_bytes(rgba)
+
+    for layer, data in (("magnitude", magnitude_png), ("velocity", velocity_png)):
+        tile_dir = os.path.join(g["out_dir"], layer, str(z), str(tx))
+        os.makedirs(tile_dir, exist_ok=True)
+        with open(os.path.join(tile_dir, f"{ty}.png"), "wb") as f:
+            f.write(data)
+    return 1
+
+def generate_tile_pyramid(ux: np.ndarray, uy: np.ndarray, bounds: Tuple[float, float, float, float],
+                          out_dir: str, mask: Optional[np.ndarray] = None,
+                          zoom_range: Optional[Tuple[int, int]] = None,
+                          vmax: Optional[float] = None, tile_px: int = 256,
+                          processes: Optional[int] = None) -> Dict:
+    """
+    Render velocity grids as an XYZ (Web Mercator, "{z}/{x}/{y}.png") tile
+    pyramid for web maps.
+
+    bounds is the grid's EPSG:2180 (min easting, min northing, max easting,
+    max northing), row 0 being the northern edge. Two layers are written
+    under out_dir: "magnitude" (speed colour-mapped with viridis from 0 to
+    vmax, default the 99th percentile) and "velocity" (ux, uy encoded as
+    (u / velocity_scale + 1) * 127.5 in red and green, for client-side
+    particles; y follows the grid rows). Obstacle cells and pixels outside
+    the grid are transparent. zoom_range defaults to the zoom whose pixels
+    match the grid cells down to the one where the grid fits a single tile.
+    Tiles are rendered by a process pool ("spawn", `processes` workers,
+    default the CPU count; 1 renders inline), so callers need the usual
+    `if __name__ == "__main__":` guard. tiles.json in out_dir describes the
+    pyramid and is returned.
+    """
+    ux = np.asarray(ux, dtype=np.float64)
+    uy = np.asarray(uy, dtype=np.float64)
+    ny, nx = ux.shape
+    solid = np.zeros((ny, nx), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    magnitude = np.sqrt(ux ** 2 + uy ** 2)
+    fluid_magnitude = magnitude[~solid]
+    if vmax is None:
+        vmax = float(np.percentile(fluid_magnitude, 99)) if fluid_magnitude.size else 0.0
+    velocity_scale = float(max(np.max(np.abs(ux[~solid]), initial=0.0),
+                               np.max(np.abs(uy[~solid]), initial=0.0)))
+
+    # Grid footprint in longitude/latitude, from points along its edges
+    minx, miny, maxx, maxy = bounds
+    edge = np.linspace(0.0, 1.0, 33)
+    easting = np.concatenate([minx + edge * (maxx - minx), np.full(33, maxx),
+                              maxx - edge * (maxx - minx), np.full(33, minx)])
+    northing = np.concatenate([np.full(33, miny), miny + edge * (maxy - miny),
+                               np.full(33, maxy), maxy - edge * (maxy - miny)])
+    lon, lat = _lonlat_from_puwg92(easting, northing)
+    lonlat_bounds = (float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max()))
+
+    if zoom_range is None:
+        cell_m = min((maxx - minx) / nx, (maxy - miny) / ny)
+        centre_lat = np.deg2rad((lonlat_bounds[1] + lonlat_bounds[3]) / 2.0)
+        metres_per_px_z0 = 2.0 * np.pi * _WEB_MERCATOR_RADIUS * np.cos(centre_lat) / tile_px
+        max_zoom = int(np.clip(np.ceil(np.log2(metres_per_px_z0 / cell_m)), 0, 22))
+        min_zoom = max(0, max_zoom - int(np.ceil(np.log2(max(max(ny, nx) / tile_px, 1.0)))))
+        zoom_range = (min_zoom, max_zoom)
+
+    tiles = []
+    for z in range(zoom_range[0], zoom_range[1] + 1):
+        x0, x1, y0, y1 = _tile_range(lonlat_bounds, z)
+        tiles += [(z, tx, ty) for tx in range(x0, x1 + 1) for ty in range(y0, y1 + 1)]
+
+    grids = {"ux": ux, "uy": uy, "magnitude": magnitude, "mask": solid, "bounds": tuple(bounds),
+             "vmax": vmax, "velocity_scale": velocity_scale, "tile_px": tile_px, "out_dir": out_dir}
+    os.makedirs(out_dir, exist_ok=True)
+    t0 = time.time()
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        _init_tile_worker(grids)
+        written = sum(_render_tile(tile) for tile in tiles)
+        _TILE_GRIDS.clear()
+    else:
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_tile_worker, initargs=(grids,)) as pool:
+            written = sum(pool.map(_render_tile, tiles, chunksize=max(1, len(tiles) // (4 * processes))))
+
+    pyramid = {
+        "tiles": written,
+        "zoom_range": [int(zoom_range[0]), int(zoom_range[1])],
+        "tile_size": tile_px,
+        "bounds_epsg2180": [float(value) for value in bounds],
+        "bounds_lonlat": list(lonlat_bounds),
+        "magnitude": {"url": "magnitude/{z}/{x}/{y}.png", "colormap": "viridis",
+                      "vmin": 0.0, "vmax": vmax},
+        "velocity": {"url": "velocity/{z}/{x}/{y}.png", "scale": velocity_scale,
+                     "encoding": "u = (channel / 127.5 - 1) * scale; red ux, green uy (down the grid rows)"}
+    }
+    with open(os.path.join(out_dir, "tiles.json"), "w") as f:
+        json.dump(pyramid, f, indent=2)
+    print(f"🗺️  Wrote {written} tiles per layer for zooms {zoom_range[0]}-{zoom_range[1]} "
+          f"to {out_dir} in {time.time() - t0:.2f}s")
+    return pyramid
+
+# ──────────────────────────────────────────────────────────────────────────
+# Example usage and testing
+# ──────────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import tempfile
+
+    # Demo: a synthetic 3 m grid in Gdańsk (tests live in tests/test_tile_pyramid.py)
+    ny, nx = 100, 150
+    y, x = np.mgrid[0:ny, 0:nx]
+    mask = np.zeros((ny, nx), dtype=bool)
+    mask[40:60, 70:90] = True
+    bounds = grid_bounds({"bounds": [477000.0, 720500.0, 477450.0, 720800.0]})
+    out_dir = tempfile.mkdtemp(prefix="tiles_")
+    pyramid = generate_tile_pyramid(3.0 + np.sin(x / 20.0), np.cos(y / 15.0), bounds, out_dir,
+                                    mask=mask, zoom_range=(14, 17))
+    print(f"🗺️  {pyramid['tiles']} tiles per layer in {out_dir}")
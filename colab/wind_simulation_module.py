@@ -17,27 +17,232 @@ Improvements:
 API:
 -----
 run_wind_simulation(obstacle_mask, grid_info, weather_data, sim_params) → dict
+run_wind_ensemble(obstacle_mask, grid_info, weather_data, sim_params) → dict (stacked per direction)
+benchmark_lbm_layouts(grid_shape, iterations) → dict (MLUPS per population layout)
+benchmark_lbm_kernels(grid_shape, iterations) → dict (MLUPS per kernel, fused also with skip_solid_cells)
+save_solver_state(path, state) / load_solver_state(path) → warm-start checkpoints
+sim_params["rotate_domain"] = True → solve with the wind along x (lattice cropped to the obstacles plus a margin sized from their extent), results in the original frame
+sim_params["frozen_tile_size"] = N → fused runs freeze settled N×N tiles, performance reports skipped_tile_fraction
+sim_params["checkpoint_dir"] → periodic background checkpoints, resume_from_checkpoint continues bitwise
+sim_params["result_schema_version"] = 3 / convert_results_schema(results, 3) → columnar vectors, CSR streamlines/particles
+sim_params["bundle_path"] → binary uint16/float16 grid bundle; load_result_bundle(path) memory-maps it, bundle_array decodes
+sim_params["tile_pyramid_dir"] → XYZ PNG tiles (viridis magnitude + encoded velocity) via tile_pyramid.py
+sim_params["results_path"] / write_results_json(path, results) → JSON (.gz) streamed from arrays and path generators, same text as json.dump
+sim_params["averaging_window"] = N → results["time_averaged"]: mean fields and turbulence intensity over the last N iterations
+pack_obstacle_mask(mask) / load_obstacle_mask(path) → bit-packed masks (8 cells per byte) for both run_* entry points
+plan_simulation_params(wind_speed_ms, pixel_size_m, grid_shape, target_reynolds) → lattice velocity, ω, iterations, cost
+benchmark_multigrid(obstacle_mask, levels, tolerance) → dict (time to residual)
+benchmark_frozen_tiles(obstacle_mask, tile_size, tile_tolerance) → dict (time to residual, skipped tile fraction)
+precompile_kernels(cache_dir) / `python wind_simulation_module.py --warmup --cache-dir DIR` → JIT cache warm-up
+autotune_kernels(grid_shape) → best threads/threading layer/chunk size per (host, grid bucket, kernel, precision), applied by run_wind_simulation unless sim_params["autotune"] = False
 """
 
 import numpy as np
+import os
 import time
-from numba import njit, prange
+import functools
+import gzip
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from numba import njit, prange, set_num_threads
+import numba
+from numba.core import types
+from numba.core.dispatcher import Dispatcher
+from numba.extending import overload
 import json
-from typing import Dict, List, Tuple, Optional
+import socket
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+
+# Grid samplers shared with the tile renderer (tile_pyramid.py next to this
+# file, within the colab package or on its own)
+try:
+    from .tile_pyramid import _sample_bilinear, _sample_nearest
+except ImportError:
+    from tile_pyramid import _sample_bilinear, _sample_nearest
 
 # ──────────────────────────────────────────────────────────────────────────
 # ENHANCED LBM KERNEL - NUMBA COMPATIBLE
 # ──────────────────────────────────────────────────────────────────────────
 
+# D2Q9 lattice (same ordering as the kernels): velocities and opposite directions
+_D2Q9_CX = np.array([0, 1, 0, -1, 0, 1, -1, -1, 1], dtype=np.int64)
+_D2Q9_CY = np.array([0, 0, 1, 0, -1, 1, 1, -1, -1], dtype=np.int64)
+_D2Q9_OPP = np.array([0, 3, 4, 1, 2, 7, 8, 5, 6], dtype=np.int64)
+
+# Default lattice inflow speed (lattice units; Mach 0.17), see
+# sim_params["lattice_velocity"] and `plan_simulation_params`
+_LATTICE_VELOCITY = 0.1
+
+# Lattice velocities sim_params may use: below the floor runs need impractical
+# iteration counts, above the cap compressibility errors grow
+_LATTICE_VELOCITY_RANGE = (0.01, 0.2)
+
+# Columns of the convergence history (one row per tracked iteration, every
+# 10th; lattice units): mean |u|^2, relative L2 velocity change and max |Δu|
+# since the previous tracked iteration, and total mass relative to the start
+_HISTORY_COLUMNS = ("mean_velocity_sq", "residual", "max_velocity_change", "mass_drift")
+
+@njit(cache=True, inline='always')
+def _row_flow_metrics(ux, uy, ux_track, uy_track, j, row_metrics):
+    """
+    Convergence-history sums for row j: Σ|u|², Σ|Δu|² and max |Δu|² against
+    the previous tracked field in ux_track/uy_track, which is updated.
+    """
+    s_u2 = 0.0
+    s_du2 = 0.0
+    d_max = 0.0
+    for i in range(ux.shape[1]):
+        u = ux[j, i]
+        v = uy[j, i]
+        du = u - ux_track[j, i]
+        dv = v - uy_track[j, i]
+        d2 = du * du + dv * dv
+        s_u2 += u * u + v * v
+        s_du2 += d2
+        d_max = max(d_max, d2)
+        ux_track[j, i] = u
+        uy_track[j, i] = v
+    row_metrics[j, 0] = s_u2
+    row_metrics[j, 1] = s_du2
+    row_metrics[j, 2] = d_max
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _flow_metrics(ux, uy, ux_track, uy_track, row_metrics):
+    """`_row_flow_metrics` for every row, in parallel"""
+    for j in prange(ux.shape[0]):
+        _row_flow_metrics(ux, uy, ux_track, uy_track, j, row_metrics)
+
+@njit(cache=True)
+def _reduce_flow_metrics(row_metrics, n_cells, mass, mass0, out):
+    """Combine per-row metric sums and the total mass into a history row (`_HISTORY_COLUMNS`)"""
+    s_u2 = 0.0
+    s_du2 = 0.0
+    d_max = 0.0
+    for j in range(row_metrics.shape[0]):
+        s_u2 += row_metrics[j, 0]
+        s_du2 += row_metrics[j, 1]
+        d_max = max(d_max, row_metrics[j, 2])
+    out[0] = s_u2 / n_cells
+    out[1] = np.sqrt(s_du2 / s_u2) if s_u2 > 0.0 else 0.0
+    out[2] = np.sqrt(d_max)
+    out[3] = mass / mass0 - 1.0 if mass0 != 0.0 else 0.0
+
+# Running moments over the averaging window (sim_params["averaging_window"]),
+# one (ny, nx) float64 plane each: Welford means and sums of squared
+# deviations of ux, uy and |u|, plus the ux-uy co-moment, which is needed to
+# rotate the variances back from a rotated run's frame
+_FLOW_STAT_FIELDS = ("mean_ux", "mean_uy", "mean_speed", "m2_ux", "m2_uy", "m2_speed", "c_uxuy")
+
+@njit(cache=True, inline='always')
+def _row_welford(ux, uy, j, count, stats):
+    """Add row j of (ux, uy) to the running moments in stats as sample number `count` (1-based)"""
+    inv = 1.0 / count
+    for i in range(ux.shape[1]):
+        u = np.float64(ux[j, i])
+        v = np.float64(uy[j, i])
+        s = np.sqrt(u * u + v * v)
+        du = u - stats[0, j, i]
+        dv = v - stats[1, j, i]
+        ds = s - stats[2, j, i]
+        stats[0, j, i] += du * inv
+        stats[1, j, i] += dv * inv
+        stats[2, j, i] += ds * inv
+        stats[3, j, i] += du * (u - stats[0, j, i])
+        stats[4, j, i] += dv * (v - stats[1, j, i])
+        stats[5, j, i] += ds * (s - stats[2, j, i])
+        stats[6, j, i] += du * (v - stats[1, j, i])
+
+@njit(parallel=True, cache=True)
+def _welford_update(ux, uy, count, stats):
+    """`_row_welford` for every row, in parallel"""
+    for j in prange(ux.shape[0]):
+        _row_welford(ux, uy, j, count, stats)
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _array_sum(values):
+    """Parallel float64 sum of a 1-D array (population mass)"""
+    total = 0.0
+    for n in prange(values.shape[0]):
+        total += values[n]
+    return total
+
+@njit(parallel=True, cache=True)
+def _velocity_residual(ux, uy, ux_prev, uy_prev):
+    """
+    Relative L2 change of the velocity field since the previous check:
+    ||u - u_prev|| / ||u||, reduced per row in parallel. The current field
+    is copied into ux_prev/uy_prev for the next check. A diverged (non-finite)
+    field gives inf, so it never counts as converged; this function is built
+    without fastmath to keep that check.
+    """
+    ny, nx = ux.shape
+    row_diff = np.zeros(ny, dtype=np.float64)
+    row_norm = np.zeros(ny, dtype=np.float64)
+
+    for j in prange(ny):
+        s_diff = 0.0
+        s_norm = 0.0
+        for i in range(nx):
+            du = ux[j, i] - ux_prev[j, i]
+            dv = uy[j, i] - uy_prev[j, i]
+            s_diff += du * du + dv * dv
+            s_norm += ux[j, i] * ux[j, i] + uy[j, i] * uy[j, i]
+            ux_prev[j, i] = ux[j, i]
+            uy_prev[j, i] = uy[j, i]
+        row_diff[j] = s_diff
+        row_norm[j] = s_norm
+
+    norm = np.sum(row_norm)
+    diff = np.sum(row_diff)
+    if not (np.isfinite(norm) and np.isfinite(diff)):
+        return np.inf
+    if norm <= 0.0:
+        return 0.0
+    return np.sqrt(diff / norm)
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _reflect_boundary_links(F, boundary_links):
+    """
+    Halfway bounce-back for SoA populations F[9, ny, nx] (pull convention).
+
+    For every link (j, i, k) of `_build_lattice_index` the obstacle slot that
+    fluid cell (j, i) pulls direction k from is overwritten with the cell's
+    own post-collision population in the opposite direction, so the next
+    streaming pass reflects it at the wall midway between the two cells.
+    Each obstacle slot belongs to exactly one link, so the loop is race-free.
+    """
+    for n in prange(boundary_links.shape[0]):
+        j = boundary_links[n, 0]
+        i = boundary_links[n, 1]
+        k = boundary_links[n, 2]
+        F[k, j - _D2Q9_CY[k], i - _D2Q9_CX[k]] = F[_D2Q9_OPP[k], j, i]
+
 @njit(parallel=True, fastmath=True, cache=True)
 def _lbm_enhanced(mask, wind_speed, wind_deg, nx, ny, max_iter, omega, 
-                  enable_performance_tracking=False):
+                  enable_performance_tracking=False,
+                  convergence_tolerance=0.0, check_interval=100,
+                  boundary_links=None, initial_populations=None, rho_out=None,
+                  lattice_velocity=_LATTICE_VELOCITY, flow_stats=None, stats_start=0):
     """
     Enhanced LBM kernel with performance optimizations - NUMBA COMPATIBLE:
     - Memory-aligned arrays (without order parameter)
     - Reduced temporary allocations
     - Better cache utilization
     - Optional performance tracking
+    - Optional halfway bounce-back over precomputed boundary_links
+      (see `_build_lattice_index`) instead of the full-grid obstacle sweep
+    - Optional warm start from initial_populations (SoA f[9, ny, nx], see
+      `solver_state_populations`) instead of the uniform F = 1 rest state;
+      the final density is copied into rho_out when given
+    - Inflow at lattice_velocity (lattice units), scaled to wind_speed on output
+    - Optional running moments of the velocity field (lattice units) from
+      iteration stats_start on, accumulated into flow_stats[7, ny, nx]
+      (`_FLOW_STAT_FIELDS`) during the collision pass
     """
     
     # D2Q9 lattice vectors and weights (optimized layout)
@@ -50,23 +255,60 @@ def _lbm_enhanced(mask, wind_speed, wind_deg, nx, ny, max_iter, omega,
     # Pre-allocate arrays - NUMBA COMPATIBLE (no order parameter)
     F = np.ones((ny, nx, 9), dtype=np.float64)
     Fs = np.empty((ny, nx, 9), dtype=np.float64)
+    if initial_populations is not None:
+        for j in prange(ny):
+            for i in range(nx):
+                for k in range(9):
+                    F[j, i, k] = initial_populations[k, j, i]
     
     # Inlet velocity (meteorological to mathematical conversion)
     rad = np.deg2rad(90.0 - wind_deg)
-    u0 = 0.1 * np.cos(rad)
-    v0 = 0.1 * np.sin(rad)
+    u0 = lattice_velocity * np.cos(rad)
+    v0 = lattice_velocity * np.sin(rad)
     
     # Macroscopic variables
     rho = np.ones((ny, nx), dtype=np.float64)
     ux = np.zeros((ny, nx), dtype=np.float64)  
     uy = np.zeros((ny, nx), dtype=np.float64)
     
-    # Performance tracking arrays (if enabled)
-    convergence_history = np.zeros(max_iter, dtype=np.float64) if enable_performance_tracking else None
+    # Performance tracking arrays (if enabled): history rows, the field at
+    # the previous tracked iteration and per-row metric sums
+    history_rows = max_iter if enable_performance_tracking else 0
+    convergence_history = np.zeros((history_rows, 4), dtype=np.float64)
+    track_ny = ny if enable_performance_tracking else 1
+    track_nx = nx if enable_performance_tracking else 1
+    ux_track = np.zeros((track_ny, track_nx), dtype=np.float64)
+    uy_track = np.zeros((track_ny, track_nx), dtype=np.float64)
+    row_metrics = np.zeros((ny, 4), dtype=np.float64)
+    mass0 = 0.0
+    for j in range(ny):
+        for i in range(nx):
+            for k in range(9):
+                mass0 += F[j, i, k]
+
+    # Residual check state (velocity at the previous check)
+    check_residual = convergence_tolerance > 0.0
+    ux_prev = np.zeros((ny, nx), dtype=np.float64)
+    uy_prev = np.zeros((ny, nx), dtype=np.float64)
+    iterations_done = 0
+
+    # Averaging window (trailing max_iter - stats_start iterations); a run
+    # that converges keeps going until the window after convergence is full
+    averaging_window = max_iter - stats_start
+    stop_at = max_iter
     
     # Main simulation loop with enhanced performance
     for iteration in range(max_iter):
         
+        # 0) HALFWAY BOUNCE-BACK: the obstacle slot each wall link streams
+        #    from takes the fluid cell's own reflected population
+        if boundary_links is not None:
+            for n in prange(boundary_links.shape[0]):
+                j = boundary_links[n, 0]
+                i = boundary_links[n, 1]
+                k = boundary_links[n, 2]
+                F[j - cy[k], i - cx[k], k] = F[j, i, _D2Q9_OPP[k]]
+        
         # 1) STREAMING with better memory access pattern
         for j in prange(ny):
             for i in range(nx):
@@ -79,15 +321,17 @@ def _lbm_enhanced(mask, wind_speed, wind_deg, nx, ny, max_iter, omega,
         F, Fs = Fs, F
         
         # 2) BOUNCE-BACK with unrolled loops for better performance
-        for j in prange(ny):
-            for i in range(nx):
-                if mask[j, i]:
-                    # Horizontal reflections
-                    temp = F[j, i, 1]; F[j, i, 1] = F[j, i, 3]; F[j, i, 3] = temp
-                    temp = F[j, i, 2]; F[j, i, 2] = F[j, i, 4]; F[j, i, 4] = temp
-                    # Diagonal reflections  
-                    temp = F[j, i, 5]; F[j, i, 5] = F[j, i, 7]; F[j, i, 7] = temp
-                    temp = F[j, i, 6]; F[j, i, 6] = F[j, i, 8]; F[j, i, 8] = temp
+        #    (full-way, inside obstacles; links already handled otherwise)
+        if boundary_links is None:
+            for j in prange(ny):
+                for i in range(nx):
+                    if mask[j, i]:
+                        # Horizontal reflections
+                        temp = F[j, i, 1]; F[j, i, 1] = F[j, i, 3]; F[j, i, 3] = temp
+                        temp = F[j, i, 2]; F[j, i, 2] = F[j, i, 4]; F[j, i, 4] = temp
+                        # Diagonal reflections  
+                        temp = F[j, i, 5]; F[j, i, 5] = F[j, i, 7]; F[j, i, 7] = temp
+                        temp = F[j, i, 6]; F[j, i, 6] = F[j, i, 8]; F[j, i, 8] = temp
         
         # 3) BOUNDARY CONDITIONS (outflow)
         for i in prange(nx):
@@ -137,8 +381,19 @@ def _lbm_enhanced(mask, wind_speed, wind_deg, nx, ny, max_iter, omega,
                 ux[j, 0] = u0
                 uy[j, 0] = v0
         
-        # 6) COLLISION (BGK) with optimized equilibrium computation
+        # 6) COLLISION (BGK) with optimized equilibrium computation; tracked
+        #    iterations also reduce the row's convergence metrics here
+        track = enable_performance_tracking and iteration % 10 == 0
         for j in prange(ny):
+            if track:
+                _row_flow_metrics(ux, uy, ux_track, uy_track, j, row_metrics)
+                s_mass = 0.0
+                for i in range(nx):
+                    s_mass += rho[j, i]
+                row_metrics[j, 3] = s_mass
+            if flow_stats is not None:
+                if iteration >= stats_start:
+                    _row_welford(ux, uy, j, iteration - stats_start + 1, flow_stats)
             for i in range(nx):
                 u_local = ux[j, i]
                 v_local = uy[j, i]
@@ -151,149 +406,3046 @@ def _lbm_enhanced(mask, wind_speed, wind_deg, nx, ny, max_iter, omega,
                     feq = rho_local * w[k] * (1.0 + 3.0*cu + 4.5*cu*cu - 1.5*usq)
                     F[j, i, k] += omega * (feq - F[j, i, k])
         
-        # Optional convergence tracking
-        if enable_performance_tracking and iteration % 10 == 0:
-            # Calculate simple convergence metric
-            velocity_magnitude = 0.0
-            for j in range(ny):
-                for i in range(nx):
-                    velocity_magnitude += ux[j, i]*ux[j, i] + uy[j, i]*uy[j, i]
-            convergence_history[iteration] = velocity_magnitude / (nx * ny)
+        # Optional convergence tracking (row sums from the collision pass)
+        if track:
+            _reduce_flow_metrics(row_metrics, nx * ny, np.sum(row_metrics[:, 3]), mass0,
+                                 convergence_history[iteration])
+
+        # Optional early termination once the velocity field stops changing
+        # (with running moments: once the averaging window is full)
+        iterations_done = iteration + 1
+        if check_residual and iterations_done % check_interval == 0:
+            if _velocity_residual(ux, uy, ux_prev, uy_prev) < convergence_tolerance:
+                if flow_stats is None:
+                    break
+                check_residual = False
+                stats_start = min(stats_start, iterations_done)
+                stop_at = min(max_iter, stats_start + averaging_window)
+        if iterations_done >= stop_at:
+            break
+    
+    if rho_out is not None:
+        rho_out[:, :] = rho
     
     # Scale to physical velocity
-    scale = wind_speed / 0.1
+    scale = wind_speed / lattice_velocity
     ux *= scale
     uy *= scale
     
-    return ux, uy, convergence_history
+    if enable_performance_tracking:
+        return ux, uy, convergence_history, iterations_done
+    return ux, uy, None, iterations_done
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _lbm_enhanced_soa(mask, wind_speed, wind_deg, nx, ny, max_iter, omega,
+                      enable_performance_tracking=False,
+                      convergence_tolerance=0.0, check_interval=100,
+                      boundary_links=None, initial_populations=None, rho_out=None,
+                      lattice_velocity=_LATTICE_VELOCITY, flow_stats=None, stats_start=0):
+    """
+    Structure-of-arrays variant of `_lbm_enhanced` (populations as F[9, ny, nx]):
+    - Each direction is streamed as contiguous row copies (no modulo in the hot loop)
+    - Moment and collision loops run direction-outer / column-inner so the
+      inner loop is unit-stride and vectorizes
+    - Same physics, update order, bounce-back, warm-start and running-moment
+      options as the AoS kernel
+    """
+
+    # D2Q9 lattice vectors and weights (same ordering as the AoS kernel)
+    c = np.array([[0, 0], [1, 0], [0, 1], [-1, 0], [0, -1],
+                  [1, 1], [-1, 1], [-1, -1], [1, -1]], dtype=np.int32)
+    w = np.array([4/9, 1/9, 1/9, 1/9, 1/9, 1/36, 1/36, 1/36, 1/36], dtype=np.float64)
+
+    cx, cy = c[:, 0], c[:, 1]
+
+    # One contiguous (ny, nx) plane per direction
+    F = np.ones((9, ny, nx), dtype=np.float64)
+    Fs = np.empty((9, ny, nx), dtype=np.float64)
+    if initial_populations is not None:
+        F[:] = initial_populations
+
+    # Inlet velocity (meteorological to mathematical conversion)
+    rad = np.deg2rad(90.0 - wind_deg)
+    u0 = lattice_velocity * np.cos(rad)
+    v0 = lattice_velocity * np.sin(rad)
+
+    # Macroscopic variables
+    rho = np.ones((ny, nx), dtype=np.float64)
+    ux = np.zeros((ny, nx), dtype=np.float64)
+    uy = np.zeros((ny, nx), dtype=np.float64)
+
+    # Performance tracking arrays (if enabled), as in the AoS kernel
+    history_rows = max_iter if enable_performance_tracking else 0
+    convergence_history = np.zeros((history_rows, 4), dtype=np.float64)
+    track_ny = ny if enable_performance_tracking else 1
+    track_nx = nx if enable_performance_tracking else 1
+    ux_track = np.zeros((track_ny, track_nx), dtype=np.float64)
+    uy_track = np.zeros((track_ny, track_nx), dtype=np.float64)
+    row_metrics = np.zeros((ny, 4), dtype=np.float64)
+    mass0 = np.sum(F)
+
+    # Residual check state (velocity at the previous check)
+    check_residual = convergence_tolerance > 0.0
+    ux_prev = np.zeros((ny, nx), dtype=np.float64)
+    uy_prev = np.zeros((ny, nx), dtype=np.float64)
+    iterations_done = 0
+
+    # Averaging window (trailing max_iter - stats_start iterations); a run
+    # that converges keeps going until the window after convergence is full
+    averaging_window = max_iter - stats_start
+    stop_at = max_iter
+
+    for iteration in range(max_iter):
+
+        # 0) HALFWAY BOUNCE-BACK over the precomputed wall links
+        if boundary_links is not None:
+            _reflect_boundary_links(F, boundary_links)
+
+        # 1) STREAMING - one row shift per direction, periodic wrap handled
+        #    outside the contiguous copy
+        for j in prange(ny):
+            for k in range(9):
+                src_j = (j - cy[k]) % ny
+                sx = cx[k]
+                if sx == 0:
+                    for i in range(nx):
+                        Fs[k, j, i] = F[k, src_j, i]
+                elif sx > 0:
+                    Fs[k, j, 0] = F[k, src_j, nx - 1]
+                    for i in range(1, nx):
+                        Fs[k, j, i] = F[k, src_j, i - 1]
+                else:
+                    for i in range(nx - 1):
+                        Fs[k, j, i] = F[k, src_j, i + 1]
+                    Fs[k, j, nx - 1] = F[k, src_j, 0]
+
+        F, Fs = Fs, F
+
+        # 2) BOUNCE-BACK (full-way) inside obstacles
+        if boundary_links is None:
+            for j in prange(ny):
+                for i in range(nx):
+                    if mask[j, i]:
+                        temp = F[1, j, i]; F[1, j, i] = F[3, j, i]; F[3, j, i] = temp
+                        temp = F[2, j, i]; F[2, j, i] = F[4, j, i]; F[4, j, i] = temp
+                        temp = F[5, j, i]; F[5, j, i] = F[7, j, i]; F[7, j, i] = temp
+                        temp = F[6, j, i]; F[6, j, i] = F[8, j, i]; F[8, j, i] = temp
+
+        # 3) BOUNDARY CONDITIONS (outflow) - whole rows / columns per direction
+        for k in prange(9):
+            for i in range(nx):
+                F[k, 0, i] = F[k, 1, i]
+                F[k, ny-1, i] = F[k, ny-2, i]
+
+        for k in prange(9):
+            for j in range(ny):
+                F[k, j, 0] = F[k, j, 1]
+                F[k, j, nx-1] = F[k, j, nx-2]
+
+        # 4) MACROSCOPIC VARIABLES - accumulate one direction plane at a time
+        for j in prange(ny):
+            for i in range(nx):
+                rho[j, i] = 0.0
+                ux[j, i] = 0.0
+                uy[j, i] = 0.0
+            for k in range(9):
+                ck_x = cx[k]
+                ck_y = cy[k]
+                for i in range(nx):
+                    f_val = F[k, j, i]
+                    rho[j, i] += f_val
+                    ux[j, i] += f_val * ck_x
+                    uy[j, i] += f_val * ck_y
+            for i in range(nx):
+                s_rho = rho[j, i]
+                if s_rho > 1e-12:
+                    ux[j, i] = ux[j, i] / s_rho
+                    uy[j, i] = uy[j, i] / s_rho
+                else:
+                    ux[j, i] = uy[j, i] = 0.0
+
+        # 5) INFLOW CONDITIONS based on wind direction
+        if wind_deg >= 315 or wind_deg < 45:  # North
+            for i in prange(nx):
+                ux[0, i] = u0
+                uy[0, i] = v0
+        elif wind_deg < 135:  # East
+            for j in prange(ny):
+                ux[j, nx-1] = u0
+                uy[j, nx-1] = v0
+        elif wind_deg < 225:  # South
+            for i in prange(nx):
+                ux[ny-1, i] = u0
+                uy[ny-1, i] = v0
+        else:  # West
+            for j in prange(ny):
+                ux[j, 0] = u0
+                uy[j, 0] = v0
+
+        # 6) COLLISION (BGK) - direction-outer so each plane row is unit-stride;
+        #    tracked iterations also reduce the row's convergence metrics here
+        track = enable_performance_tracking and iteration % 10 == 0
+        for j in prange(ny):
+            if track:
+                _row_flow_metrics(ux, uy, ux_track, uy_track, j, row_metrics)
+                s_mass = 0.0
+                for i in range(nx):
+                    s_mass += rho[j, i]
+                row_metrics[j, 3] = s_mass
+            if flow_stats is not None:
+                if iteration >= stats_start:
+                    _row_welford(ux, uy, j, iteration - stats_start + 1, flow_stats)
+            for k in range(9):
+                ck_x = cx[k]
+                ck_y = cy[k]
+                wk = w[k]
+                for i in range(nx):
+                    u_local = ux[j, i]
+                    v_local = uy[j, i]
+                    usq = u_local * u_local + v_local * v_local
+                    cu = u_local * ck_x + v_local * ck_y
+                    feq = rho[j, i] * wk * (1.0 + 3.0*cu + 4.5*cu*cu - 1.5*usq)
+                    F[k, j, i] += omega * (feq - F[k, j, i])
+
+        # Optional convergence tracking (row sums from the collision pass)
+        if track:
+            _reduce_flow_metrics(row_metrics, nx * ny, np.sum(row_metrics[:, 3]), mass0,
+                                 convergence_history[iteration])
+
+        # Optional early termination once the velocity field stops changing
+        # (with running moments: once the averaging window is full)
+        iterations_done = iteration + 1
+        if check_residual and iterations_done % check_interval == 0:
+            if _velocity_residual(ux, uy, ux_prev, uy_prev) < convergence_tolerance:
+                if flow_stats is None:
+                    break
+                check_residual = False
+                stats_start = min(stats_start, iterations_done)
+                stop_at = min(max_iter, stats_start + averaging_window)
+        if iterations_done >= stop_at:
+            break
+
+    if rho_out is not None:
+        rho_out[:, :] = rho
+
+    # Scale to physical velocity
+    scale = wind_speed / lattice_velocity
+    ux *= scale
+    uy *= scale
+
+    if enable_performance_tracking:
+        return ux, uy, convergence_history, iterations_done
+    return ux, uy, None, iterations_done
 
 # ──────────────────────────────────────────────────────────────────────────
-# ENHANCED STREAMLINE GENERATION
+# BIT-PACKED OBSTACLE MASKS
 # ──────────────────────────────────────────────────────────────────────────
 
-@njit(fastmath=True, cache=True)
-def _generate_streamlines(ux, uy, nx, ny, num_streamlines=200, max_points=100, 
-                         min_speed=0.1, step_size=1.0):
+def pack_obstacle_mask(mask: np.ndarray) -> Dict:
     """
-    Generate streamlines using 4th-order Runge-Kutta integration
+    Bit-pack an obstacle mask, 8 cells per byte (np.packbits, little bit order).
+
+    Returns {"bits": uint8 (ny, row_bytes), "shape": (ny, nx)} with rows padded
+    to whole 64-bit words, so the fused kernels read the mask as uint64 words
+    (see `_is_solid`, `_packed_run`). Accepted as obstacle_mask by
+    run_wind_simulation and run_wind_ensemble.
     """
-    streamlines = []
-    
-    for stream_idx in range(num_streamlines):
-        # Random starting point
-        start_x = np.random.random() * (nx - 1)
-        start_y = np.random.random() * (ny - 1)
-        
-        streamline = []
-        x, y = start_x, start_y
-        
-        for point_idx in range(max_points):
-            # Check bounds
-            if x < 1 or x >= nx-1 or y < 1 or y >= ny-1:
-                break
-            
-            # Bilinear interpolation for velocity
-            i, j = int(x), int(y)
-            fx, fy = x - i, y - j
-            
-            # Get velocities at grid points
-            u00 = ux[j, i]
-            u10 = ux[j, i+1]  
-            u01 = ux[j+1, i]
-            u11 = ux[j+1, i+1]
-            
-            v00 = uy[j, i]
-            v10 = uy[j, i+1]
-            v01 = uy[j+1, i] 
-            v11 = uy[j+1, i+1]
-            
-            # Bilinear interpolation
-            u_interp = u00*(1-fx)*(1-fy) + u10*fx*(1-fy) + u01*(1-fx)*fy + u11*fx*fy
-            v_interp = v00*(1-fx)*(1-fy) + v10*fx*(1-fy) + v01*(1-fx)*fy + v11*fx*fy
-            
-            speed = np.sqrt(u_interp*u_interp + v_interp*v_interp)
-            
-            # Stop if speed too low
-            if speed < min_speed:
-                break
-            
-            # Add point to streamline
-            streamline.append((x, y, speed))
-            
-            # 4th-order Runge-Kutta step
-            k1x, k1y = u_interp * step_size, v_interp * step_size
-            
-            # For simplicity, use Euler step (can be enhanced to full RK4)
-            x += k1x
-            y += k1y
-        
-        if len(streamline) > 5:  # Only keep streamlines with sufficient points
-            streamlines.append(streamline)
-    
-    return streamlines
+    mask = np.asarray(mask, dtype=bool)
+    ny, nx = mask.shape
+    bits = np.zeros((ny, -(-nx // 64) * 8), dtype=np.uint8)
+    bits[:, :-(-nx // 8)] = np.packbits(mask, axis=1, bitorder="little")
+    return {"bits": bits, "shape": (ny, nx)}
+
+def unpack_obstacle_mask(packed: Dict) -> np.ndarray:
+    """Boolean obstacle mask of a `pack_obstacle_mask` result"""
+    return _dense_mask(_mask_words(packed), packed["shape"][1])
+
+def save_obstacle_mask(path: str, mask: np.ndarray) -> None:
+    """Save an obstacle mask (dense or packed) bit-packed to an .npz file"""
+    packed = mask if _is_packed_mask(mask) else pack_obstacle_mask(mask)
+    ny, nx = packed["shape"]
+    np.savez(path, bits=packed["bits"][:, :-(-nx // 8)], shape=np.array([ny, nx]))
+
+def load_obstacle_mask(path: str) -> Dict:
+    """Load a `save_obstacle_mask` file as a packed mask, without unpacking it"""
+    with np.load(path) as data:
+        ny, nx = (int(n) for n in data["shape"])
+        bits = np.zeros((ny, -(-nx // 64) * 8), dtype=np.uint8)
+        bits[:, :-(-nx // 8)] = data["bits"]
+    return {"bits": bits, "shape": (ny, nx)}
+
+def _is_packed_mask(mask) -> bool:
+    """True for `pack_obstacle_mask` results"""
+    return isinstance(mask, dict)
+
+def _mask_shape(mask) -> Tuple[int, int]:
+    """(ny, nx) of a dense or packed obstacle mask"""
+    return tuple(mask["shape"]) if _is_packed_mask(mask) else mask.shape
+
+def _mask_words(packed: Dict) -> np.ndarray:
+    """Packed mask rows as little-endian uint64 words (a view, no copy)"""
+    return np.ascontiguousarray(packed["bits"]).view("<u8")
+
+def _dense_mask(mask, nx: int) -> np.ndarray:
+    """Boolean mask from a dense mask, a packed mask or packed words of width nx"""
+    if _is_packed_mask(mask):
+        mask = _mask_words(mask)
+    if mask.dtype == np.uint64:
+        return np.unpackbits(mask.view(np.uint8), axis=1, count=nx,
+                             bitorder="little").view(np.bool_)
+    return np.asarray(mask, dtype=bool)
+
+def _kernel_mask(mask, packed: bool):
+    """Mask argument of the fused kernels: packed words or the dense mask"""
+    if packed or _is_packed_mask(mask):
+        return _mask_words(mask if _is_packed_mask(mask) else pack_obstacle_mask(mask))
+    return mask
+
+def _is_solid(mask, j, i):
+    """Obstacle flag of cell (j, i); compiled per mask type by `_is_solid_impl`"""
+    return mask[j, i]
+
+@overload(_is_solid, inline='always')
+def _is_solid_impl(mask, j, i):
+    """Dense masks index directly, packed uint64 words test bit i % 64 of word i // 64"""
+    if isinstance(mask, types.Array) and mask.dtype == types.uint64:
+        def packed(mask, j, i):
+            return (mask[j, i >> 6] >> np.uint64(i & 63)) & np.uint64(1) != np.uint64(0)
+        return packed
+
+    def dense(mask, j, i):
+        return mask[j, i]
+    return dense
+
+def _is_packed(mask):
+    """True if mask holds packed words; a compile-time constant in the kernels"""
+    return mask.dtype == np.uint64
+
+@overload(_is_packed, inline='always')
+def _is_packed_impl(mask):
+    packed = isinstance(mask, types.Array) and mask.dtype == types.uint64
+    return lambda mask: packed
+
+# ──────────────────────────────────────────────────────────────────────────
+# FUSED PULL KERNEL (stream + bounce-back + outflow + moments + collide)
+# ──────────────────────────────────────────────────────────────────────────
+
+@njit(fastmath=True, cache=True, inline='always')
+def _collide_cell(h0, h1, h2, h3, h4, h5, h6, h7, h8, solid, inflow,
+                  u0, v0, omega, rho0, t):
+    """
+    Bounce-back, moments, inflow and BGK collision for one cell's streamed
+    populations. Returns the 9 post-collision populations and (u, v).
+    Obstacle cells reflect and then collide like the split kernels do.
+
+    Populations are stored shifted by their rest value, h_k = f_k - rho0*w_k,
+    so the stored numbers are small deviations and keep their precision in
+    float32. `t` is the storage scalar type; all constants are cast to it so
+    float32 runs stay in float32 arithmetic.
+    """
+
+    # Full-way bounce-back inside obstacles
+    if solid:
+        h1, h3 = h3, h1
+        h2, h4 = h4, h2
+        h5, h7 = h7, h5
+        h6, h8 = h8, h6
+
+    # Moments (the rest-state shift cancels out of the momentum sums)
+    drho = h0 + h1 + h2 + h3 + h4 + h5 + h6 + h7 + h8
+    rho = rho0 + drho
+    if rho > t(1e-12):
+        u = (h1 - h3 + h5 - h6 - h7 + h8) / rho
+        v = (h2 - h4 + h5 + h6 - h7 - h8) / rho
+    else:
+        u = v = t(0.0)
+
+    # Inflow edge prescribes the velocity
+    if inflow:
+        u = u0
+        v = v0
+
+    # BGK collision on the shifted equilibrium heq_k = feq_k - rho0*w_k
+    usq = t(1.5) * (u * u + v * v)
+    w0 = t(4.0 / 9.0)
+    w1 = t(1.0 / 9.0)
+    w2 = t(1.0 / 36.0)
+    c3 = t(3.0)
+    c45 = t(4.5)
+
+    g0 = h0 + omega * (w0 * (drho - rho * usq) - h0)
+    cu = u
+    g1 = h1 + omega * (w1 * (drho + rho * (c3*cu + c45*cu*cu - usq)) - h1)
+    cu = v
+    g2 = h2 + omega * (w1 * (drho + rho * (c3*cu + c45*cu*cu - usq)) - h2)
+    cu = -u
+    g3 = h3 + omega * (w1 * (drho + rho * (c3*cu + c45*cu*cu - usq)) - h3)
+    cu = -v
+    g4 = h4 + omega * (w1 * (drho + rho * (c3*cu + c45*cu*cu - usq)) - h4)
+    cu = u + v
+    g5 = h5 + omega * (w2 * (drho + rho * (c3*cu + c45*cu*cu - usq)) - h5)
+    cu = -u + v
+    g6 = h6 + omega * (w2 * (drho + rho * (c3*cu + c45*cu*cu - usq)) - h6)
+    cu = -u - v
+    g7 = h7 + omega * (w2 * (drho + rho * (c3*cu + c45*cu*cu - usq)) - h7)
+    cu = u - v
+    g8 = h8 + omega * (w2 * (drho + rho * (c3*cu + c45*cu*cu - usq)) - h8)
+
+    return g0, g1, g2, g3, g4, g5, g6, g7, g8, u, v
+
+@njit(fastmath=True, cache=True, inline='always')
+def _is_inflow_cell(j, i, ny, nx, inflow_edge):
+    """True if (j, i) lies on the inflow edge (0=north, 1=east, 2=south, 3=west)"""
+    return ((inflow_edge == 0 and j == 0) or (inflow_edge == 1 and i == nx - 1) or
+            (inflow_edge == 2 and j == ny - 1) or (inflow_edge == 3 and i == 0))
+
+@njit(fastmath=True, cache=True, inline='always')
+def _fused_cell(F, Fs, mask, j, i, jj, ii, u0, v0, inflow_edge, omega,
+                rho0, t, store_macro, ux, uy):
+    """
+    Pull-update a single cell (j, i) from source cell (jj, ii).
+
+    Outflow edges copy the populations of their interior neighbour, so edge
+    cells gather as if they were the clamped interior cell (jj, ii).
+    """
+    ny = F.shape[1]
+    nx = F.shape[2]
+
+    # Gather streamed populations: f_k(x) = F[k, x - c_k]
+    g0, g1, g2, g3, g4, g5, g6, g7, g8, u, v = _collide_cell(
+        F[0, jj, ii], F[1, jj, ii - 1], F[2, jj - 1, ii],
+        F[3, jj, ii + 1], F[4, jj + 1, ii], F[5, jj - 1, ii - 1],
+        F[6, jj - 1, ii + 1], F[7, jj + 1, ii + 1], F[8, jj + 1, ii - 1],
+        _is_solid(mask, jj, ii), _is_inflow_cell(j, i, ny, nx, inflow_edge),
+        u0, v0, omega, rho0, t)
+
+    if store_macro:
+        ux[j, i] = u
+        uy[j, i] = v
+
+    Fs[0, j, i] = g0
+    Fs[1, j, i] = g1
+    Fs[2, j, i] = g2
+    Fs[3, j, i] = g3
+    Fs[4, j, i] = g4
+    Fs[5, j, i] = g5
+    Fs[6, j, i] = g6
+    Fs[7, j, i] = g7
+    Fs[8, j, i] = g8
+
+# Cell classes of a row span: dense (reads the mask), all fluid, all solid
+_SPAN_DENSE = 0
+_SPAN_FLUID = 1
+_SPAN_SOLID = 2
+
+@njit(fastmath=True, cache=True, inline='always')
+def _fused_span(F, Fs, mask, j, i0, i1, span_kind, store_macro, omega, rho0, t, ux, uy):
+    """
+    Pull update of interior cells [i0, i1) of interior row j (no inflow).
+
+    span_kind is a compile-time constant: dense spans read the mask per cell,
+    fluid spans skip it and solid spans only reflect their streamed
+    populations back where they came from, without moments or collision
+    (their velocity is stored as 0).
+    """
+    for i in range(i0, i1):
+        if span_kind == _SPAN_SOLID:
+            Fs[0, j, i] = F[0, j, i]
+            Fs[1, j, i] = F[3, j, i + 1]
+            Fs[2, j, i] = F[4, j + 1, i]
+            Fs[3, j, i] = F[1, j, i - 1]
+            Fs[4, j, i] = F[2, j - 1, i]
+            Fs[5, j, i] = F[7, j + 1, i + 1]
+            Fs[6, j, i] = F[8, j + 1, i - 1]
+            Fs[7, j, i] = F[5, j - 1, i - 1]
+            Fs[8, j, i] = F[6, j - 1, i + 1]
+            if store_macro:
+                ux[j, i] = t(0.0)
+                uy[j, i] = t(0.0)
+            continue
+        if span_kind == _SPAN_DENSE:
+            solid = _is_solid(mask, j, i)
+        else:
+            solid = False
+        g0, g1, g2, g3, g4, g5, g6, g7, g8, u, v = _collide_cell(
+            F[0, j, i], F[1, j, i - 1], F[2, j - 1, i],
+            F[3, j, i + 1], F[4, j + 1, i], F[5, j - 1, i - 1],
+            F[6, j - 1, i + 1], F[7, j + 1, i + 1], F[8, j + 1, i - 1],
+            solid, False, t(0.0), t(0.0), omega, rho0, t)
+        if store_macro:
+            ux[j, i] = u
+            uy[j, i] = v
+        Fs[0, j, i] = g0
+        Fs[1, j, i] = g1
+        Fs[2, j, i] = g2
+        Fs[3, j, i] = g3
+        Fs[4, j, i] = g4
+        Fs[5, j, i] = g5
+        Fs[6, j, i] = g6
+        Fs[7, j, i] = g7
+        Fs[8, j, i] = g8
+
+@njit(fastmath=True, cache=True, inline='always')
+def _packed_run(words, j, i0, i1):
+    """
+    End of the run of whole 64-cell words starting at cell i0 of row j that
+    are all obstacle-free or all not (capped at i1), and whether it is fluid.
+    """
+    fluid = words[j, i0 >> 6] == 0
+    i_end = min(((i0 >> 6) + 1) << 6, i1)
+    while i_end < i1 and (words[j, i_end >> 6] == 0) == fluid:
+        i_end = min(i_end + 64, i1)
+    return i_end, fluid
+
+@njit(fastmath=True, cache=True, inline='always')
+def _fused_dense_span(F, Fs, mask, j, i0, i1, store_macro, omega, rho0, t, ux, uy):
+    """
+    Dense `_fused_span` over [i0, i1). With a packed mask runs of 64-cell
+    words that hold no obstacle update as fluid spans, without bit tests.
+    """
+    if _is_packed(mask):
+        i = i0
+        while i < i1:
+            i_end, fluid = _packed_run(mask, j, i, i1)
+            if fluid:
+                _fused_span(F, Fs, mask, j, i, i_end, _SPAN_FLUID,
+                            store_macro, omega, rho0, t, ux, uy)
+            else:
+                _fused_span(F, Fs, mask, j, i, i_end, _SPAN_DENSE,
+                            store_macro, omega, rho0, t, ux, uy)
+            i = i_end
+    else:
+        _fused_span(F, Fs, mask, j, i0, i1, _SPAN_DENSE, store_macro, omega, rho0, t, ux, uy)
+
+@njit(fastmath=True, cache=True, inline='always')
+def _fused_row(F, Fs, mask, j, u0, v0, inflow_edge, omega, rho0, t,
+               store_macro, ux, uy, use_spans, span_ptr, span_start, span_end, span_solid):
+    """Pull update of row j (outflow rows and columns gather from their neighbours)"""
+    ny = F.shape[1]
+    nx = F.shape[2]
+
+    if j == 0 or j == ny - 1:
+        # Outflow rows gather as their interior neighbour row
+        jj = 1 if j == 0 else ny - 2
+        for i in range(nx):
+            ii = min(max(i, 1), nx - 2)
+            _fused_cell(F, Fs, mask, j, i, jj, ii, u0, v0, inflow_edge,
+                        omega, rho0, t, store_macro, ux, uy)
+        return
+
+    # Interior columns gather without clamping (vectorizes)
+    if use_spans:
+        for s in range(span_ptr[j], span_ptr[j + 1]):
+            if span_solid[s]:
+                _fused_span(F, Fs, mask, j, span_start[s], span_end[s], _SPAN_SOLID,
+                            store_macro, omega, rho0, t, ux, uy)
+            else:
+                _fused_span(F, Fs, mask, j, span_start[s], span_end[s], _SPAN_FLUID,
+                            store_macro, omega, rho0, t, ux, uy)
+    else:
+        _fused_dense_span(F, Fs, mask, j, 1, nx - 1, store_macro, omega, rho0, t, ux, uy)
+
+    # Edge columns use the neighbour column
+    _fused_cell(F, Fs, mask, j, 0, j, 1, u0, v0, inflow_edge,
+                omega, rho0, t, store_macro, ux, uy)
+    _fused_cell(F, Fs, mask, j, nx - 1, j, nx - 2, u0, v0, inflow_edge,
+                omega, rho0, t, store_macro, ux, uy)
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _lbm_fused_steps(F, Fs, mask, u0, v0, inflow_edge, omega, rho0, n_steps, ux, uy,
+                     use_spans, span_ptr, span_start, span_end, span_solid,
+                     halfway, boundary_links):
+    """
+    Advance n_steps iterations with the fused single-pass pull kernel.
+
+    Every cell reads its 9 neighbours from F and writes 9 values to Fs, so one
+    iteration is a single sweep over the populations instead of six. ux/uy are
+    written on the last step only. Returns the (current, spare) buffer pair.
+    Works on float32 or float64 shifted populations (see `_collide_cell`).
+
+    With use_spans the interior rows iterate the span lists from
+    `_build_lattice_index`: fluid cells update without reading the mask,
+    obstacle wall cells only reflect and obstacle-interior cells are not
+    visited at all. With halfway the fluid cells next to obstacles pull their
+    reflected populations through `_reflect_boundary_links` instead, so
+    obstacle cells are never read (the span lists then hold fluid runs only).
+    """
+    ny = F.shape[1]
+    t = F.dtype.type
+    u0_t = t(u0)
+    v0_t = t(v0)
+    omega_t = t(omega)
+    rho0_t = t(rho0)
+
+    for step in range(n_steps):
+        store_macro = step == n_steps - 1
+        if halfway:
+            _reflect_boundary_links(F, boundary_links)
+
+        for j in prange(ny):
+            _fused_row(F, Fs, mask, j, u0_t, v0_t, inflow_edge, omega_t, rho0_t, t,
+                       store_macro, ux, uy,
+                       use_spans, span_ptr, span_start, span_end, span_solid)
+
+        F, Fs = Fs, F
+
+    return F, Fs
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _lbm_fused_rows(F, Fs, mask, u0, v0, inflow_edge, omega, rho0, j0, j1, store_macro,
+                    ux, uy, span_ptr, span_start, span_end, span_solid):
+    """
+    One dense `_lbm_fused_steps` iteration restricted to rows [j0, j1).
+
+    Used by the domain-decomposed runner: each process updates its own strip
+    of Fs from F, reading the rows just outside the strip as halos.
+    """
+    t = F.dtype.type
+    u0_t = t(u0)
+    v0_t = t(v0)
+    omega_t = t(omega)
+    rho0_t = t(rho0)
+
+    for j in prange(j0, j1):
+        _fused_row(F, Fs, mask, j, u0_t, v0_t, inflow_edge, omega_t, rho0_t, t,
+                   store_macro, ux, uy,
+                   False, span_ptr, span_start, span_end, span_solid)
+
+@njit(fastmath=True, cache=True, inline='always')
+def _fused_row_segment(F, Fs, mask, j, i0, i1, u0, v0, inflow_edge, omega, rho0, t,
+                       store_macro, ux, uy, use_spans, span_ptr, span_start, span_end, span_solid):
+    """`_fused_row` restricted to columns [i0, i1) of row j (spans are clipped to it)"""
+    ny = F.shape[1]
+    nx = F.shape[2]
+
+    if j == 0 or j == ny - 1:
+        jj = 1 if j == 0 else ny - 2
+        for i in range(i0, i1):
+            ii = min(max(i, 1), nx - 2)
+            _fused_cell(F, Fs, mask, j, i, jj, ii, u0, v0, inflow_edge,
+                        omega, rho0, t, store_macro, ux, uy)
+        return
+
+    if use_spans:
+        for s in range(span_ptr[j], span_ptr[j + 1]):
+            s0 = max(span_start[s], i0)
+            s1 = min(span_end[s], i1)
+            if s0 >= s1:
+                continue
+            if span_solid[s]:
+                _fused_span(F, Fs, mask, j, s0, s1, _SPAN_SOLID,
+                            store_macro, omega, rho0, t, ux, uy)
+            else:
+                _fused_span(F, Fs, mask, j, s0, s1, _SPAN_FLUID,
+                            store_macro, omega, rho0, t, ux, uy)
+    else:
+        _fused_dense_span(F, Fs, mask, j, max(i0, 1), min(i1, nx - 1),
+                          store_macro, omega, rho0, t, ux, uy)
+
+    if i0 == 0:
+        _fused_cell(F, Fs, mask, j, 0, j, 1, u0, v0, inflow_edge,
+                    omega, rho0, t, store_macro, ux, uy)
+    if i1 == nx:
+        _fused_cell(F, Fs, mask, j, nx - 1, j, nx - 2, u0, v0, inflow_edge,
+                    omega, rho0, t, store_macro, ux, uy)
+
+@njit(parallel=True, cache=True)
+def _copy_tile_runs(F, Fs, tile_size, run_ptr, run_start, run_end):
+    """Copy the populations of the listed tile column runs from F into Fs"""
+    ny = F.shape[1]
+    for j in prange(ny):
+        ty = j // tile_size
+        for r in range(run_ptr[ty], run_ptr[ty + 1]):
+            for k in range(9):
+                for i in range(run_start[r], run_end[r]):
+                    Fs[k, j, i] = F[k, j, i]
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _lbm_tiled_steps(F, Fs, mask, u0, v0, inflow_edge, omega, rho0, n_steps, ux, uy,
+                     use_spans, span_ptr, span_start, span_end, span_solid,
+                     halfway, boundary_links, tile_size, active_ptr, active_start, active_end,
+                     frozen_ptr, frozen_start, frozen_end, refresh_steps):
+    """
+    `_lbm_fused_steps` updating only the active tiles, except on refresh steps.
+
+    active_*/frozen_* list, per row of tiles, the column runs of consecutive
+    active and frozen tiles (see `_tile_runs`). A frozen tile is copied into
+    the spare buffer before it is skipped, so it holds its state in both
+    buffers and its neighbours stream from a consistent field. Every tile is
+    updated on the steps where refresh_steps is True and on the last step,
+    so ux/uy are current everywhere. Returns the (current, spare) buffer pair.
+    """
+    ny = F.shape[1]
+    t = F.dtype.type
+    u0_t = t(u0)
+    v0_t = t(v0)
+    omega_t = t(omega)
+    rho0_t = t(rho0)
+    has_frozen = frozen_start.shape[0] > 0
+    synced = False
+
+    for step in range(n_steps):
+        store_macro = step == n_steps - 1
+        refresh = store_macro or refresh_steps[step]
+        if halfway:
+            _reflect_boundary_links(F, boundary_links)
+
+        if refresh or not has_frozen:
+            for j in prange(ny):
+                _fused_row(F, Fs, mask, j, u0_t, v0_t, inflow_edge, omega_t, rho0_t, t,
+                           store_macro, ux, uy,
+                           use_spans, span_ptr, span_start, span_end, span_solid)
+            synced = False
+        else:
+            if not synced:
+                _copy_tile_runs(F, Fs, tile_size, frozen_ptr, frozen_start, frozen_end)
+                synced = True
+            for j in prange(ny):
+                ty = j // tile_size
+                for r in range(active_ptr[ty], active_ptr[ty + 1]):
+                    _fused_row_segment(F, Fs, mask, j, active_start[r], active_end[r],
+                                       u0_t, v0_t, inflow_edge, omega_t, rho0_t, t,
+                                       store_macro, ux, uy,
+                                       use_spans, span_ptr, span_start, span_end, span_solid)
+
+        F, Fs = Fs, F
+
+    return F, Fs
+
+@njit(parallel=True, cache=True)
+def _tile_residuals(ux, uy, ux_prev, uy_prev, tile_size, residuals):
+    """
+    Per-tile `_velocity_residual`: RMS velocity change of each tile since the
+    previous check over the RMS speed of the whole field, so tiles compare
+    directly with the global residual. The current field is copied into
+    ux_prev/uy_prev; non-finite tiles get inf (built without fastmath).
+    """
+    ny, nx = ux.shape
+    n_tiles_y, n_tiles_x = residuals.shape
+    tile_diff = np.zeros((n_tiles_y, n_tiles_x), dtype=np.float64)
+    row_norm = np.zeros(n_tiles_y, dtype=np.float64)
+
+    for ty in prange(n_tiles_y):
+        s_norm = 0.0
+        for j in range(ty * tile_size, min((ty + 1) * tile_size, ny)):
+            for i in range(nx):
+                du = ux[j, i] - ux_prev[j, i]
+                dv = uy[j, i] - uy_prev[j, i]
+                tile_diff[ty, i // tile_size] += du * du + dv * dv
+                s_norm += ux[j, i] * ux[j, i] + uy[j, i] * uy[j, i]
+                ux_prev[j, i] = ux[j, i]
+                uy_prev[j, i] = uy[j, i]
+        row_norm[ty] = s_norm
+
+    mean_norm = np.sum(row_norm) / (ny * nx)
+    for ty in range(n_tiles_y):
+        for tx in range(n_tiles_x):
+            cells = ((min((ty + 1) * tile_size, ny) - ty * tile_size) *
+                     (min((tx + 1) * tile_size, nx) - tx * tile_size))
+            diff = tile_diff[ty, tx] / cells
+            if not (np.isfinite(diff) and np.isfinite(mean_norm)):
+                residuals[ty, tx] = np.inf
+            elif mean_norm <= 0.0:
+                residuals[ty, tx] = 0.0
+            else:
+                residuals[ty, tx] = np.sqrt(diff / mean_norm)
+
+# ──────────────────────────────────────────────────────────────────────────
+# AA-PATTERN IN-PLACE KERNEL (single population buffer)
+# ──────────────────────────────────────────────────────────────────────────
+
+@njit(fastmath=True, cache=True, inline='always')
+def _aa_gather(F, j, i, odd):
+    """
+    Streamed populations of cell (j, i) under the AA pattern.
+
+    Even steps find them in place, odd steps read the neighbours' opposite
+    slots written by the previous even step. (j, i) must be an interior cell.
+    """
+    if odd:
+        return (F[0, j, i], F[3, j, i - 1], F[4, j - 1, i],
+                F[1, j, i + 1], F[2, j + 1, i], F[7, j - 1, i - 1],
+                F[8, j - 1, i + 1], F[5, j + 1, i + 1], F[6, j + 1, i - 1])
+    return (F[0, j, i], F[1, j, i], F[2, j, i], F[3, j, i], F[4, j, i],
+            F[5, j, i], F[6, j, i], F[7, j, i], F[8, j, i])
+
+@njit(fastmath=True, cache=True, inline='always')
+def _aa_scatter(F, j, i, odd, wrap, g0, g1, g2, g3, g4, g5, g6, g7, g8):
+    """
+    Store post-collision populations of cell (j, i) under the AA pattern.
+
+    Even steps write them back into the cell's opposite slots, odd steps push
+    them to the neighbours (periodic wrap is only needed for edge cells).
+    """
+    ny = F.shape[1]
+    nx = F.shape[2]
+    if odd:
+        if wrap:
+            jn = (j + 1) % ny
+            js = (j - 1 + ny) % ny
+            ie = (i + 1) % nx
+            iw = (i - 1 + nx) % nx
+        else:
+            jn = j + 1
+            js = j - 1
+            ie = i + 1
+            iw = i - 1
+        F[0, j, i] = g0
+        F[1, j, ie] = g1
+        F[2, jn, i] = g2
+        F[3, j, iw] = g3
+        F[4, js, i] = g4
+        F[5, jn, ie] = g5
+        F[6, jn, iw] = g6
+        F[7, js, iw] = g7
+        F[8, js, ie] = g8
+    else:
+        F[0, j, i] = g0
+        F[3, j, i] = g1
+        F[4, j, i] = g2
+        F[1, j, i] = g3
+        F[2, j, i] = g4
+        F[7, j, i] = g5
+        F[8, j, i] = g6
+        F[5, j, i] = g7
+        F[6, j, i] = g8
+
+@njit(fastmath=True, cache=True, inline='always')
+def _aa_interior_row(F, mask, j, odd, store_macro, omega, rho0, t, ux, uy):
+    """AA update of the interior cells of interior row j (no inflow)"""
+    nx = F.shape[2]
+    for i in range(1, nx - 1):
+        f0, f1, f2, f3, f4, f5, f6, f7, f8 = _aa_gather(F, j, i, odd)
+        g0, g1, g2, g3, g4, g5, g6, g7, g8, u, v = _collide_cell(
+            f0, f1, f2, f3, f4, f5, f6, f7, f8, mask[j, i], False,
+            t(0.0), t(0.0), omega, rho0, t)
+        if store_macro:
+            ux[j, i] = u
+            uy[j, i] = v
+        _aa_scatter(F, j, i, odd, False, g0, g1, g2, g3, g4, g5, g6, g7, g8)
+
+@njit(fastmath=True, cache=True, inline='always')
+def _edge_cell(e, ny, nx):
+    """(j, i) of the e-th outflow edge cell: top row, bottom row, left, right"""
+    if e < nx:
+        return 0, e
+    if e < 2 * nx:
+        return ny - 1, e - nx
+    side = e - 2 * nx
+    if side < ny - 2:
+        return side + 1, 0
+    return side - (ny - 2) + 1, nx - 1
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _lbm_aa_steps(F, E, mask, u0, v0, inflow_edge, omega, rho0, n_steps, parity, ux, uy):
+    """
+    Advance n_steps iterations in place with the AA access pattern.
+
+    Same update as `_lbm_fused_steps` but with a single population buffer:
+    even steps read and write each cell's own slots, odd steps gather from
+    and scatter to the neighbours. Each cell's read set equals its write set,
+    so cells never race. Edge cells copy their interior neighbour's inputs,
+    which are staged in E (9 × perimeter) before the sweep overwrites them.
+    `parity` is the number of steps already taken modulo 2; the new parity is
+    returned.
+    """
+    ny = F.shape[1]
+    nx = F.shape[2]
+    n_edge = E.shape[1]
+    t = F.dtype.type
+    u0_t = t(u0)
+    v0_t = t(v0)
+    omega_t = t(omega)
+    rho0_t = t(rho0)
+
+    for step in range(n_steps):
+        odd = (parity + step) % 2 == 1
+        store_macro = step == n_steps - 1
+
+        # Stage edge inputs from their clamped interior source cells
+        for e in prange(n_edge):
+            j, i = _edge_cell(np.int64(e), ny, nx)
+            jj = min(max(j, 1), ny - 2)
+            ii = min(max(i, 1), nx - 2)
+            f = _aa_gather(F, jj, ii, odd)
+            for k in range(9):
+                E[k, e] = f[k]
+
+        # Interior cells update in place; parity is a compile-time constant
+        # inside each loop so the gather/scatter pattern vectorizes
+        if odd:
+            for j in prange(1, ny - 1):
+                _aa_interior_row(F, mask, j, True, store_macro, omega_t, rho0_t, t, ux, uy)
+        else:
+            for j in prange(1, ny - 1):
+                _aa_interior_row(F, mask, j, False, store_macro, omega_t, rho0_t, t, ux, uy)
+
+        # Edge cells collide their staged inputs
+        for e in prange(n_edge):
+            j, i = _edge_cell(np.int64(e), ny, nx)
+            jj = min(max(j, 1), ny - 2)
+            ii = min(max(i, 1), nx - 2)
+            g0, g1, g2, g3, g4, g5, g6, g7, g8, u, v = _collide_cell(
+                E[0, e], E[1, e], E[2, e], E[3, e], E[4, e],
+                E[5, e], E[6, e], E[7, e], E[8, e], mask[jj, ii],
+                _is_inflow_cell(j, i, ny, nx, inflow_edge),
+                u0_t, v0_t, omega_t, rho0_t, t)
+            if store_macro:
+                ux[j, i] = u
+                uy[j, i] = v
+            _aa_scatter(F, j, i, odd, True, g0, g1, g2, g3, g4, g5, g6, g7, g8)
+
+    return (parity + n_steps) % 2
+
+# ──────────────────────────────────────────────────────────────────────────
+# STEPPING KERNEL DRIVERS
+# ──────────────────────────────────────────────────────────────────────────
+
+# D2Q9 weights and the rest density of the kernels' initial state (all
+# populations start at 1, so rho0 = 9); stepping kernels store f - rho0*w
+_D2Q9_WEIGHTS = np.array([4/9, 1/9, 1/9, 1/9, 1/9, 1/36, 1/36, 1/36, 1/36], dtype=np.float64)
+_RHO0 = 9.0
+
+# Storage precisions selectable through sim_params["precision"]
+_LBM_PRECISIONS = {
+    "float64": np.float64,
+    "float32": np.float32,
+}
+
+def _initial_populations(ny: int, nx: int, dtype=np.float64,
+                         initial_populations: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Shifted SoA populations equivalent to the split kernels' F = 1 start, or
+    to a warm start from initial_populations (unshifted f[9, ny, nx]). The
+    shift is applied in float64 before casting to the storage dtype.
+    """
+    F = np.empty((9, ny, nx), dtype=dtype)
+    for k in range(9):
+        if initial_populations is None:
+            F[k] = 1.0 - _RHO0 * _D2Q9_WEIGHTS[k]
+        else:
+            F[k] = initial_populations[k] - _RHO0 * _D2Q9_WEIGHTS[k]
+    return F
+
+def _build_lattice_index(mask: np.ndarray, walls: bool = True) -> Dict:
+    """
+    Precompute compact cell index lists for an obstacle mask (once per mask).
+
+    Interior cells (rows/columns 1..n-2; the outflow edges keep their own
+    path) are stored as row spans of equal cell class in CSR form:
+    span_ptr[j]:span_ptr[j+1] are the spans of row j, each covering columns
+    [span_start, span_end) that are all fluid or all obstacle wall cells
+    (span_solid). Wall cells are obstacle cells with a fluid neighbour, or
+    within two cells of the outflow edges, which gather from them; the other
+    (obstacle-interior) cells never feed a fluid cell and get no span. With
+    walls=False (halfway bounce-back) only fluid spans are listed.
+    boundary_links lists (j, i, k) for every interior fluid cell whose
+    population k is pulled from an obstacle cell at (j - c_ky, i - c_kx).
+    """
+    ny, nx = mask.shape
+    mask_b = np.asarray(mask, dtype=bool)
+    inner = mask_b[1:-1, 1:-1]
+
+    # Obstacle-interior cells: all 8 neighbours solid, away from the edges
+    enclosed = inner.copy()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            enclosed &= mask_b[1 + dy:ny - 1 + dy, 1 + dx:nx - 1 + dx]
+    enclosed[:2] = enclosed[-2:] = False
+    enclosed[:, :2] = enclosed[:, -2:] = False
+    # Cell class: 0 fluid, 1 wall, 2 obstacle interior
+    cell_class = inner.astype(np.int8) + enclosed
+
+    span_ptr = np.zeros(ny + 1, dtype=np.int64)
+    starts, ends, solid = [], [], []
+    for r in range(inner.shape[0]):
+        row = cell_class[r]
+        cuts = np.flatnonzero(row[1:] != row[:-1]) + 1
+        row_starts = np.concatenate(([0], cuts))
+        row_ends = np.concatenate((cuts, [row.size]))
+        kinds = row[row_starts]
+        keep = kinds < 2 if walls else kinds == 0
+        starts.append(row_starts[keep] + 1)
+        ends.append(row_ends[keep] + 1)
+        solid.append(kinds[keep] == 1)
+        span_ptr[r + 2] = span_ptr[r + 1] + np.count_nonzero(keep)
+    span_ptr[ny] = span_ptr[ny - 1]
+
+    # Pull links crossing a fluid/solid face: x fluid, x - c_k solid
+    links = []
+    for k in range(1, 9):
+        cx, cy = _D2Q9_CX[k], _D2Q9_CY[k]
+        src = mask_b[1 - cy:ny - 1 - cy, 1 - cx:nx - 1 - cx]
+        jj, ii = np.nonzero(~inner & src)
+        links.append(np.stack((jj + 1, ii + 1, np.full(jj.size, k)), axis=1))
+
+    return {
+        "span_ptr": span_ptr,
+        "span_start": np.concatenate(starts).astype(np.int64),
+        "span_end": np.concatenate(ends).astype(np.int64),
+        "span_solid": np.concatenate(solid).astype(np.bool_),
+        "boundary_links": np.concatenate(links).astype(np.int32),
+        "fluid_cells": int(inner.size - np.count_nonzero(inner)),
+        "solid_cells": int(np.count_nonzero(inner)),
+        "spanless_cells": int(np.count_nonzero(inner) if not walls else np.count_nonzero(enclosed))
+    }
+
+def _dense_lattice_index(ny: int) -> Dict:
+    """Empty span lists for kernels running the dense (mask-reading) path"""
+    return {
+        "span_ptr": np.zeros(ny + 1, dtype=np.int64),
+        "span_start": np.zeros(0, dtype=np.int64),
+        "span_end": np.zeros(0, dtype=np.int64),
+        "span_solid": np.zeros(0, dtype=np.bool_)
+    }
+
+def _lattice_index_for(mask: np.ndarray, needed: bool, nx: int, walls: bool = True) -> Dict:
+    """
+    Index lists for the kernels (built only when spans or links are used).
+    mask may be packed words of width nx (see `_kernel_mask`).
+    """
+    if not needed:
+        index = _dense_lattice_index(mask.shape[0])
+        index["boundary_links"] = np.zeros((0, 3), dtype=np.int32)
+        return index
+    index = _build_lattice_index(_dense_mask(mask, nx), walls)
+    print(f"🧱 Index lists: {index['fluid_cells']:,} fluid / {index['solid_cells']:,} solid cells, "
+          f"{len(index['span_start']):,} spans ({index['spanless_cells']:,} obstacle cells in none), "
+          f"{len(index['boundary_links']):,} boundary links")
+    return index
+
+def _inflow_edge(wind_deg: float) -> int:
+    """Inflow edge index used by the kernels: 0=north, 1=east, 2=south, 3=west"""
+    if wind_deg >= 315 or wind_deg < 45:
+        return 0
+    elif wind_deg < 135:
+        return 1
+    elif wind_deg < 225:
+        return 2
+    return 3
+
+def _run_steps(advance, max_iter, enable_performance_tracking, ux, uy,
+               convergence_tolerance=0.0, check_interval=100, resume=None,
+               checkpoint_interval=0, save_checkpoint=None, total_mass=None,
+               flow_stats=None, stats_start=0):
+    """
+    Call advance(n_steps) until max_iter steps are done or the run converges.
+
+    The run stops on every 10th iteration when tracking is enabled, so that
+    iteration's velocity field can be sampled as in the split kernels (history
+    rows as in `_HISTORY_COLUMNS`; total_mass() gives the lattice mass for the
+    drift column, which stays 0 without it). With
+    convergence_tolerance > 0 it also stops every check_interval iterations
+    and exits once the relative velocity residual drops below the tolerance.
+    With checkpoint_interval > 0 it stops every checkpoint_interval
+    iterations and calls save_checkpoint(iteration, loop_state) after the
+    convergence check. `resume` is a loop_state from a checkpoint
+    (iteration, history, residual baseline) to continue from.
+    With flow_stats (see `_FLOW_STAT_FIELDS`) it advances one step at a time
+    from stats_start on and adds every velocity field to the running moments;
+    the max_iter - stats_start iterations averaged form a trailing window, so
+    a converged run continues until the window after convergence is full.
+    Returns (convergence_history, iterations actually run).
+    """
+    convergence_history = None
+    if enable_performance_tracking:
+        convergence_history = np.zeros((max_iter, len(_HISTORY_COLUMNS)), dtype=np.float64)
+        ux_track = np.zeros_like(ux)
+        uy_track = np.zeros_like(uy)
+        row_metrics = np.zeros((ux.shape[0], len(_HISTORY_COLUMNS)), dtype=np.float64)
+        mass0 = np.array(total_mass() if total_mass is not None else 0.0)
+    check_residual = convergence_tolerance > 0.0
+    if check_residual:
+        ux_prev = np.zeros_like(ux)
+        uy_prev = np.zeros_like(uy)
+
+    iteration = 0
+    if resume is not None:
+        iteration = int(resume["iteration"])
+        if enable_performance_tracking and resume.get("history") is not None:
+            n = min(max_iter, len(resume["history"]))
+            convergence_history[:n] = resume["history"][:n]
+            ux_track[:] = resume["ux_track"]
+            uy_track[:] = resume["uy_track"]
+            mass0 = np.array(resume["mass0"])
+        if check_residual and resume.get("ux_prev") is not None:
+            ux_prev[:] = resume["ux_prev"]
+            uy_prev[:] = resume["uy_prev"]
+        if flow_stats is not None and resume.get("flow_stats") is not None:
+            flow_stats[:] = resume["flow_stats"]
+
+    averaging_window = max_iter - stats_start
+    end = max_iter
+    if resume is not None and resume.get("converged_stats_start") is not None:
+        check_residual = False
+        stats_start = int(resume["converged_stats_start"])
+        end = min(max_iter, stats_start + averaging_window)
+
+    while iteration < end:
+        stop = end
+        if enable_performance_tracking:
+            stop = min(stop, -(-iteration // 10) * 10 + 1)
+        if check_residual:
+            stop = min(stop, (iteration // check_interval + 1) * check_interval)
+        if checkpoint_interval > 0:
+            stop = min(stop, (iteration // checkpoint_interval + 1) * checkpoint_interval)
+        if flow_stats is not None:
+            stop = min(stop, max(stats_start, iteration + 1))
+        advance(stop - iteration)
+        iteration = stop
+
+        if flow_stats is not None and iteration > stats_start:
+            _welford_update(ux, uy, iteration - stats_start, flow_stats)
+
+        if enable_performance_tracking and (iteration - 1) % 10 == 0:
+            _flow_metrics(ux, uy, ux_track, uy_track, row_metrics)
+            _reduce_flow_metrics(row_metrics, ux.size,
+                                 total_mass() if total_mass is not None else 0.0,
+                                 float(mass0), convergence_history[iteration - 1])
+        if check_residual and iteration % check_interval == 0:
+            if _velocity_residual(ux, uy, ux_prev, uy_prev) < convergence_tolerance:
+                if flow_stats is None:
+                    break
+                check_residual = False
+                stats_start = min(stats_start, iteration)
+                end = min(max_iter, stats_start + averaging_window)
+        if checkpoint_interval > 0 and iteration % checkpoint_interval == 0 and iteration < end:
+            save_checkpoint(iteration, {
+                "history": convergence_history,
+                "ux_track": ux_track if enable_performance_tracking else None,
+                "uy_track": uy_track if enable_performance_tracking else None,
+                "mass0": mass0 if enable_performance_tracking else None,
+                "ux_prev": ux_prev if check_residual else None,
+                "uy_prev": uy_prev if check_residual else None,
+                "flow_stats": flow_stats,
+                "converged_stats_start": None if check_residual or flow_stats is None
+                                         or convergence_tolerance <= 0.0 else np.array(stats_start)
+            })
+
+    return convergence_history, iteration
+
+def _lbm_fused(mask, wind_speed, wind_deg, nx, ny, max_iter, omega,
+               enable_performance_tracking=False, convergence_tolerance=0.0,
+               check_interval=100, dtype=np.float64, skip_solid_cells=False,
+               bounce_back="fullway", initial_populations=None, rho_out=None,
+               checkpoint_dir=None, checkpoint_interval=0, resume_from_checkpoint=False,
+               lattice_velocity=_LATTICE_VELOCITY, flow_stats=None, stats_start=0,
+               frozen_tile_size=0, frozen_tile_tolerance=1e-4, frozen_tile_interval=8,
+               tile_stats=None):
+    """
+    Drop-in replacement for `_lbm_enhanced` built on `_lbm_fused_steps`.
+
+    Uses the SoA population layout with two buffers of the given dtype.
+    The final density (sum of the post-collision populations, which BGK
+    conserves) is written to rho_out when given.
+
+    skip_solid_cells runs the span lists of `_build_lattice_index`: obstacle
+    cells no longer collide, wall cells only reflect and obstacle-interior
+    populations are no longer updated. Obstacle cells then report zero
+    velocity and the rest density, as with halfway bounce-back.
+
+    With checkpoint_dir the populations, ux/uy and loop state are saved there
+    every checkpoint_interval iterations from a background thread (see
+    `_checkpoint_writer`); resume_from_checkpoint continues bitwise from the
+    latest one, which takes precedence over initial_populations.
+
+    flow_stats/stats_start accumulate running moments of the velocity field
+    as in `_lbm_enhanced`, sampled after every step by `_run_steps`.
+
+    With frozen_tile_size > 0 the lattice is split into square tiles whose
+    residuals are measured every check_interval steps; settled tiles are
+    frozen to one update every frozen_tile_interval steps (see
+    `_frozen_tile_advance`). tile_stats then receives the tile-update counts.
+    """
+    buffers = [_initial_populations(ny, nx, dtype, initial_populations),
+               np.empty((9, ny, nx), dtype=dtype)]
+    ux = np.zeros((ny, nx), dtype=dtype)
+    uy = np.zeros((ny, nx), dtype=dtype)
+
+    rad = np.deg2rad(90.0 - wind_deg)
+    u0 = lattice_velocity * np.cos(rad)
+    v0 = lattice_velocity * np.sin(rad)
+    edge = _inflow_edge(wind_deg)
+    halfway = bounce_back == "halfway"
+    index = _lattice_index_for(mask, skip_solid_cells or halfway, nx, walls=not halfway)
+
+    if frozen_tile_size > 0:
+        advance = _frozen_tile_advance(
+            buffers, mask, u0, v0, edge, omega, ux, uy, skip_solid_cells, index, halfway,
+            frozen_tile_size, frozen_tile_tolerance, frozen_tile_interval, check_interval,
+            tile_stats)
+    else:
+        def advance(n_steps):
+            buffers[0], buffers[1] = _lbm_fused_steps(
+                buffers[0], buffers[1], mask, u0, v0, edge, omega, _RHO0, n_steps, ux, uy,
+                skip_solid_cells, index["span_ptr"], index["span_start"],
+                index["span_end"], index["span_solid"], halfway, index["boundary_links"])
+
+    config = {"kernel": "fused", "shape": [ny, nx], "dtype": np.dtype(dtype).name,
+              "wind_direction_deg": float(wind_deg), "omega": float(omega),
+              "lattice_velocity": float(lattice_velocity),
+              "averaging_start": int(stats_start) if flow_stats is not None else None,
+              "bounce_back": bounce_back, "skip_solid_cells": bool(skip_solid_cells)}
+    resume, checkpoint_kwargs, close_checkpoints = _checkpoint_hooks(
+        checkpoint_dir, checkpoint_interval, resume_from_checkpoint, config,
+        lambda: ({"populations": buffers[0], "ux": ux, "uy": uy}, {}))
+    if resume is not None:
+        buffers[0][:] = resume["populations"]
+        ux[:] = resume["ux"]
+        uy[:] = resume["uy"]
+
+    try:
+        convergence_history, iterations = _run_steps(
+            advance, max_iter, enable_performance_tracking, ux, uy,
+            convergence_tolerance, check_interval, **checkpoint_kwargs,
+            flow_stats=flow_stats, stats_start=stats_start,
+            total_mass=lambda: _RHO0 * ny * nx + _array_sum(buffers[0].reshape(-1)))
+    finally:
+        close_checkpoints()
+
+    no_solid_state = halfway or skip_solid_cells
+    if no_solid_state:
+        # Obstacle cells hold no physical state with link-based walls or
+        # without collision
+        solid = _dense_mask(mask, nx)
+        ux[solid] = 0.0
+        uy[solid] = 0.0
+    if rho_out is not None:
+        rho_out[:] = _RHO0 + buffers[0].sum(axis=0, dtype=np.float64)
+        if no_solid_state:
+            rho_out[solid] = _RHO0
+
+    # Scale to physical velocity (post-processing always works in float64)
+    scale = wind_speed / lattice_velocity
+    return (ux.astype(np.float64) * scale, uy.astype(np.float64) * scale,
+            convergence_history, iterations)
+
+def _frozen_tiles(residuals: np.ndarray, tolerance: float) -> np.ndarray:
+    """Tiles that settled below tolerance together with all their 8 neighbours"""
+    unsettled = np.pad(~(residuals < tolerance), 1)
+    near_unsettled = np.zeros(residuals.shape, dtype=bool)
+    for dy in range(3):
+        for dx in range(3):
+            near_unsettled |= unsettled[dy:dy + residuals.shape[0], dx:dx + residuals.shape[1]]
+    return ~near_unsettled
+
+def _tile_runs(tiles: np.ndarray, tile_size: int, nx: int):
+    """Column ranges of consecutive selected tiles per row of tiles: (run_ptr, run_start, run_end)"""
+    run_ptr = np.zeros(tiles.shape[0] + 1, dtype=np.int64)
+    starts, ends = [], []
+    for ty, row in enumerate(tiles):
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], row, [False])).astype(np.int8)))
+        starts.extend(edges[0::2] * tile_size)
+        ends.extend(np.minimum(edges[1::2] * tile_size, nx))
+        run_ptr[ty + 1] = len(starts)
+    return run_ptr, np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+def _frozen_tile_advance(buffers, mask, u0, v0, edge, omega, ux, uy, use_spans, index,
+                         halfway, tile_size, tolerance, interval, check_interval, tile_stats):
+    """
+    advance(n_steps) for `_lbm_fused` running `_lbm_tiled_steps`.
+
+    Every check_interval steps each tile's residual is measured
+    (`_tile_residuals`); a tile that settled below tolerance together with
+    its 8 neighbours is frozen, and a frozen tile is re-activated as soon as
+    it or a neighbour changes by more again. Frozen tiles are updated only
+    on every interval-th step and on the last step of each call. tile_stats
+    receives "tile_updates" and "skipped_tile_updates".
+    """
+    ny, nx = ux.shape
+    n_tiles = (-(-ny // tile_size), -(-nx // tile_size))
+    frozen = np.zeros(n_tiles, dtype=np.bool_)
+    runs = [_tile_runs(~frozen, tile_size, nx) + _tile_runs(frozen, tile_size, nx)]
+    residuals = np.zeros(n_tiles, dtype=np.float64)
+    ux_prev = np.zeros_like(ux)
+    uy_prev = np.zeros_like(uy)
+    interval = max(1, int(interval))
+    stats = tile_stats if tile_stats is not None else {}
+    stats.setdefault("tile_updates", 0)
+    stats.setdefault("skipped_tile_updates", 0)
+    done = [0]
+
+    def advance(n_steps):
+        while n_steps > 0:
+            chunk = min(n_steps, check_interval - done[0] % check_interval)
+            refresh_steps = (done[0] + np.arange(chunk)) % interval == 0
+            buffers[0], buffers[1] = _lbm_tiled_steps(
+                buffers[0], buffers[1], mask, u0, v0, edge, omega, _RHO0, chunk, ux, uy,
+                use_spans, index["span_ptr"], index["span_start"], index["span_end"],
+                index["span_solid"], halfway, index["boundary_links"], tile_size, *runs[0],
+                refresh_steps)
+
+            refresh_steps[-1] = True
+            stats["tile_updates"] += chunk * frozen.size
+            stats["skipped_tile_updates"] += (int(np.count_nonzero(~refresh_steps)) *
+                                              int(np.count_nonzero(frozen)))
+            done[0] += chunk
+            n_steps -= chunk
+
+            if done[0] % check_interval == 0:
+                _tile_residuals(ux, uy, ux_prev, uy_prev, tile_size, residuals)
+                frozen[:] = _frozen_tiles(residuals, tolerance)
+                runs[0] = _tile_runs(~frozen, tile_size, nx) + _tile_runs(frozen, tile_size, nx)
+
+    return advance
+
+def _lbm_aa(mask, wind_speed, wind_deg, nx, ny, max_iter, omega,
+            enable_performance_tracking=False, convergence_tolerance=0.0,
+            check_interval=100, dtype=np.float64, initial_populations=None,
+            rho_out=None, checkpoint_dir=None, checkpoint_interval=0,
+            resume_from_checkpoint=False, lattice_velocity=_LATTICE_VELOCITY,
+            flow_stats=None, stats_start=0):
+    """
+    Drop-in replacement for `_lbm_enhanced` built on `_lbm_aa_steps`.
+
+    Keeps a single SoA population buffer plus a perimeter-sized staging
+    buffer, roughly halving the solver's memory footprint. The first (even)
+    AA step reads its populations in place, so a warm start is taken as
+    already streamed - for an equilibrium start this is one streaming step
+    ahead of the other kernels. rho_out receives the final density; after
+    an odd step the populations are already streamed, so it is then the
+    density the next step would collide with. Checkpoints work as in
+    `_lbm_fused` and also record the AA step parity; so do running moments
+    (flow_stats).
+    """
+    F = _initial_populations(ny, nx, dtype, initial_populations)
+    E = np.empty((9, 2 * nx + 2 * (ny - 2)), dtype=dtype)
+    ux = np.zeros((ny, nx), dtype=dtype)
+    uy = np.zeros((ny, nx), dtype=dtype)
+
+    rad = np.deg2rad(90.0 - wind_deg)
+    u0 = lattice_velocity * np.cos(rad)
+    v0 = lattice_velocity * np.sin(rad)
+    edge = _inflow_edge(wind_deg)
+    parity = [0]
+
+    def advance(n_steps):
+        parity[0] = _lbm_aa_steps(F, E, mask, u0, v0, edge, omega, _RHO0, n_steps,
+                                  parity[0], ux, uy)
+
+    config = {"kernel": "aa", "shape": [ny, nx], "dtype": np.dtype(dtype).name,
+              "wind_direction_deg": float(wind_deg), "omega": float(omega),
+              "lattice_velocity": float(lattice_velocity),
+              "averaging_start": int(stats_start) if flow_stats is not None else None}
+    resume, checkpoint_kwargs, close_checkpoints = _checkpoint_hooks(
+        checkpoint_dir, checkpoint_interval, resume_from_checkpoint, config,
+        lambda: ({"populations": F, "ux": ux, "uy": uy}, {"parity": int(parity[0])}))
+    if resume is not None:
+        F[:] = resume["populations"]
+        ux[:] = resume["ux"]
+        uy[:] = resume["uy"]
+        parity[0] = int(resume["info"]["parity"])
+
+    try:
+        convergence_history, iterations = _run_steps(
+            advance, max_iter, enable_performance_tracking, ux, uy,
+            convergence_tolerance, check_interval, **checkpoint_kwargs,
+            flow_stats=flow_stats, stats_start=stats_start,
+            total_mass=lambda: _RHO0 * ny * nx + _array_sum(F.reshape(-1)))
+    finally:
+        close_checkpoints()
+
+    if rho_out is not None:
+        rho_out[:] = _RHO0 + F.sum(axis=0, dtype=np.float64)
+
+    # Scale to physical velocity (post-processing always works in float64)
+    scale = wind_speed / lattice_velocity
+    return (ux.astype(np.float64) * scale, uy.astype(np.float64) * scale,
+            convergence_history, iterations)
+
+# ──────────────────────────────────────────────────────────────────────────
+# ENSEMBLE KERNEL (several wind directions on one mask)
+# ──────────────────────────────────────────────────────────────────────────
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _lbm_ensemble_steps(F, Fs, mask, u0, v0, inflow_edge, omega, rho0, n_steps, ux, uy):
+    """
+    Advance n_steps iterations of independent fused lattices sharing one mask.
+
+    F/Fs hold (n_members, 9, ny, nx) shifted populations, ux/uy are
+    (n_members, ny, nx) and u0/v0/inflow_edge give each member's inlet.
+    Rows are the parallel loop and members the inner one, so a mask row is
+    read once per step and stays in cache for every member. Per member this
+    is the dense `_lbm_fused_steps` update. Returns the (current, spare) pair.
+    """
+    n_members = F.shape[0]
+    ny = F.shape[2]
+    t = F.dtype.type
+    u0_t = u0.astype(F.dtype)
+    v0_t = v0.astype(F.dtype)
+    omega_t = t(omega)
+    rho0_t = t(rho0)
+    span_ptr = np.zeros(ny + 1, dtype=np.int64)
+    no_spans = np.zeros(0, dtype=np.int64)
+    no_solid = np.zeros(0, dtype=np.bool_)
+
+    for step in range(n_steps):
+        store_macro = step == n_steps - 1
+
+        for j in prange(ny):
+            for d in range(n_members):
+                _fused_row(F[d], Fs[d], mask, j, u0_t[d], v0_t[d], inflow_edge[d],
+                           omega_t, rho0_t, t, store_macro, ux[d], uy[d],
+                           False, span_ptr, no_spans, no_spans, no_solid)
+
+        F, Fs = Fs, F
+
+    return F, Fs
+
+def _lbm_ensemble(mask, wind_speeds, wind_degs, nx, ny, max_iter, omega,
+                  enable_performance_tracking=False, convergence_tolerance=0.0,
+                  check_interval=100, dtype=np.float64, lattice_velocity=_LATTICE_VELOCITY):
+    """
+    Run one lattice per wind direction in a single `_lbm_ensemble_steps` call.
+
+    Returns stacked physical velocities ux, uy of shape (n_dirs, ny, nx)
+    (float64), the convergence history (mean over members) and the
+    iterations run. The residual check covers all members together.
+    """
+    wind_speeds = np.asarray(wind_speeds, dtype=np.float64)
+    wind_degs = np.asarray(wind_degs, dtype=np.float64)
+    n_members = len(wind_degs)
+
+    buffers = [np.empty((n_members, 9, ny, nx), dtype=dtype),
+               np.empty((n_members, 9, ny, nx), dtype=dtype)]
+    buffers[0][:] = _initial_populations(ny, nx, dtype)
+    ux = np.zeros((n_members, ny, nx), dtype=dtype)
+    uy = np.zeros((n_members, ny, nx), dtype=dtype)
+
+    rad = np.deg2rad(90.0 - wind_degs)
+    u0 = lattice_velocity * np.cos(rad)
+    v0 = lattice_velocity * np.sin(rad)
+    edges = np.array([_inflow_edge(deg) for deg in wind_degs], dtype=np.int64)
+
+    def advance(n_steps):
+        buffers[0], buffers[1] = _lbm_ensemble_steps(
+            buffers[0], buffers[1], mask, u0, v0, edges, omega, _RHO0, n_steps, ux, uy)
+
+    # Members stacked along rows: reshape gives views the kernel keeps writing to
+    convergence_history, iterations = _run_steps(
+        advance, max_iter, enable_performance_tracking,
+        ux.reshape(n_members * ny, nx), uy.reshape(n_members * ny, nx),
+        convergence_tolerance, check_interval,
+        total_mass=lambda: _RHO0 * n_members * ny * nx + _array_sum(buffers[0].reshape(-1)))
+
+    # Scale each member to its physical wind speed
+    scale = (wind_speeds / lattice_velocity)[:, None, None]
+    return (ux.astype(np.float64) * scale, uy.astype(np.float64) * scale,
+            convergence_history, iterations)
+
+# ──────────────────────────────────────────────────────────────────────────
+# DOMAIN-DECOMPOSED MULTI-PROCESS RUNNER (shared-memory strips)
+# ──────────────────────────────────────────────────────────────────────────
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _lbm_enhanced_rows(F, Fs, mask, rho, ux, uy, wind_deg, omega, j0, j1, lattice_velocity):
+    """
+    One `_lbm_enhanced` iteration (AoS) restricted to rows [j0, j1).
+
+    Same per-cell arithmetic and pass order as the single-process kernel, so
+    a decomposed run reproduces it exactly. Streaming reads the rows next to
+    the strip (the halos); every later pass only touches the strip, provided
+    rows 0/1 and ny-2/ny-1 each belong to one strip. Populations end up in Fs.
+    """
+    ny, nx = mask.shape
+    c = np.array([[0, 0], [1, 0], [0, 1], [-1, 0], [0, -1],
+                  [1, 1], [-1, 1], [-1, -1], [1, -1]], dtype=np.int32)
+    w = np.array([4/9, 1/9, 1/9, 1/9, 1/9, 1/36, 1/36, 1/36, 1/36], dtype=np.float64)
+    cx, cy = c[:, 0], c[:, 1]
+
+    # Inlet velocity, computed exactly as in the kernel
+    rad = np.deg2rad(90.0 - wind_deg)
+    u0 = lattice_velocity * np.cos(rad)
+    v0 = lattice_velocity * np.sin(rad)
+
+    # 1) STREAMING into the strip
+    for j in prange(j0, j1):
+        for i in range(nx):
+            for k in range(9):
+                src_j = (j - cy[k]) % ny
+                src_i = (i - cx[k]) % nx
+                Fs[j, i, k] = F[src_j, src_i, k]
+
+    # 2) BOUNCE-BACK
+    for j in prange(j0, j1):
+        for i in range(nx):
+            if mask[j, i]:
+                temp = Fs[j, i, 1]; Fs[j, i, 1] = Fs[j, i, 3]; Fs[j, i, 3] = temp
+                temp = Fs[j, i, 2]; Fs[j, i, 2] = Fs[j, i, 4]; Fs[j, i, 4] = temp
+                temp = Fs[j, i, 5]; Fs[j, i, 5] = Fs[j, i, 7]; Fs[j, i, 7] = temp
+                temp = Fs[j, i, 6]; Fs[j, i, 6] = Fs[j, i, 8]; Fs[j, i, 8] = temp
+
+    # 3) BOUNDARY CONDITIONS (outflow), rows before columns as in the kernel
+    if j0 == 0:
+        for i in prange(nx):
+            for k in range(9):
+                Fs[0, i, k] = Fs[1, i, k]
+    if j1 == ny:
+        for i in prange(nx):
+            for k in range(9):
+                Fs[ny-1, i, k] = Fs[ny-2, i, k]
+
+    for j in prange(j0, j1):
+        for k in range(9):
+            Fs[j, 0, k] = Fs[j, 1, k]
+            Fs[j, nx-1, k] = Fs[j, nx-2, k]
+
+    # 4) MACROSCOPIC VARIABLES
+    for j in prange(j0, j1):
+        for i in range(nx):
+            s_rho = s_ux = s_uy = 0.0
+            for k in range(9):
+                f_val = Fs[j, i, k]
+                s_rho += f_val
+                s_ux += f_val * cx[k]
+                s_uy += f_val * cy[k]
+
+            rho[j, i] = s_rho
+            if s_rho > 1e-12:
+                ux[j, i] = s_ux / s_rho
+                uy[j, i] = s_uy / s_rho
+            else:
+                ux[j, i] = uy[j, i] = 0.0
+
+    # 5) INFLOW CONDITIONS
+    if wind_deg >= 315 or wind_deg < 45:  # North
+        if j0 == 0:
+            for i in prange(nx):
+                ux[0, i] = u0
+                uy[0, i] = v0
+    elif wind_deg < 135:  # East
+        for j in prange(j0, j1):
+            ux[j, nx-1] = u0
+            uy[j, nx-1] = v0
+    elif wind_deg < 225:  # South
+        if j1 == ny:
+            for i in prange(nx):
+                ux[ny-1, i] = u0
+                uy[ny-1, i] = v0
+    else:  # West
+        for j in prange(j0, j1):
+            ux[j, 0] = u0
+            uy[j, 0] = v0
+
+    # 6) COLLISION (BGK)
+    for j in prange(j0, j1):
+        for i in range(nx):
+            u_local = ux[j, i]
+            v_local = uy[j, i]
+            rho_local = rho[j, i]
+            usq = u_local * u_local + v_local * v_local
+
+            for k in range(9):
+                cu = u_local * cx[k] + v_local * cy[k]
+                feq = rho_local * w[k] * (1.0 + 3.0*cu + 4.5*cu*cu - 1.5*usq)
+                Fs[j, i, k] += omega * (feq - Fs[j, i, k])
+
+def _strip_bounds(ny: int, processes: int) -> List[Tuple[int, int]]:
+    """Split rows into near-equal strips of at least 2 rows each"""
+    if ny < 2 * processes:
+        raise ValueError(f"Grid of {ny} rows is too small for {processes} strips")
+    edges = np.linspace(0, ny, processes + 1).round().astype(int)
+    return [(int(edges[p]), int(edges[p + 1])) for p in range(processes)]
+
+def _attach_shared_arrays(specs: Dict) -> Tuple[Dict, List]:
+    """Map {name: (shm name, shape, dtype)} to numpy views on shared memory"""
+    handles, arrays = [], {}
+    for key, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        handles.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return arrays, handles
+
+def _strip_worker(specs, kernel, j0, j1, u0, v0, wind_deg, omega, lattice_velocity, threads,
+                  fill_value, step_barrier, command_barrier, control):
+    """
+    Worker process owning rows [j0, j1) of the shared lattice.
+
+    Waits for a step count from the parent, advances that many iterations
+    with a barrier between iterations (after which the neighbouring strips'
+    edge rows are the halos of the next one), then reports back. A step
+    count of 0 ends the worker.
+    """
+    shared, handles = _attach_shared_arrays(specs)
+    try:
+        if threads:
+            set_num_threads(threads)
+        buffers = [shared["F"], shared["Fs"]]
+        mask, ux, uy = shared["mask"], shared["ux"], shared["uy"]
+        empty_ptr = np.zeros(mask.shape[0] + 1, dtype=np.int64)
+        empty_span = np.zeros(0, dtype=np.int64)
+        empty_solid = np.zeros(0, dtype=np.bool_)
+
+        # First touch of the strip's pages happens in the owning process
+        if fill_value is not None:
+            if kernel == "split":
+                buffers[0][j0:j1] = fill_value
+            else:
+                for k in range(9):
+                    buffers[0][k, j0:j1] = fill_value[k]
+
+        edge = _inflow_edge(wind_deg)
+        parity = 0
+        while True:
+            command_barrier.wait()
+            n_steps = int(control[0])
+            if n_steps <= 0:
+                break
+            for step in range(n_steps):
+                F, Fs = buffers[parity], buffers[1 - parity]
+                if kernel == "split":
+                    _lbm_enhanced_rows(F, Fs, mask, shared["rho"], ux, uy,
+                                       wind_deg, omega, j0, j1, lattice_velocity)
+                else:
+                    _lbm_fused_rows(F, Fs, mask, u0, v0, edge, omega, _RHO0, j0, j1,
+                                    step == n_steps - 1, ux, uy,
+                                    empty_ptr, empty_span, empty_span, empty_solid)
+                step_barrier.wait()
+                parity = 1 - parity
+            command_barrier.wait()
+    except BaseException:
+        step_barrier.abort()
+        command_barrier.abort()
+        raise
+    finally:
+        for shm in handles:
+            shm.close()
+
+def _lbm_decomposed(mask, wind_speed, wind_deg, nx, ny, max_iter, omega,
+                    enable_performance_tracking=False, convergence_tolerance=0.0,
+                    check_interval=100, processes=2, kernel="split", dtype=np.float64,
+                    threads_per_process=None, initial_populations=None, rho_out=None,
+                    lattice_velocity=_LATTICE_VELOCITY, flow_stats=None, stats_start=0):
+    """
+    Drop-in replacement for the single-process kernels that splits the grid
+    into horizontal strips, one per process.
+
+    The lattice (populations, velocity, density, mask) lives in
+    multiprocessing.shared_memory; each process updates only its own rows
+    and reads the rows just outside its strip as one-cell halos once every
+    process has passed the per-iteration barrier. kernel="split" mirrors
+    `_lbm_enhanced` (AoS, float64) and kernel="fused" mirrors
+    `_lbm_fused_steps` (dense path), cell for cell, so the result equals the
+    single-process run. Processes are started with the "spawn" method.
+    Running moments (flow_stats) are accumulated here from the shared
+    velocity field, as in `_lbm_fused`.
+    """
+    strips = _strip_bounds(ny, processes)
+    if threads_per_process is None:
+        threads_per_process = max(1, (os.cpu_count() or 1) // processes)
+
+    if kernel == "split":
+        pop_shape, pop_dtype = (ny, nx, 9), np.float64
+    else:
+        pop_shape, pop_dtype = (9, ny, nx), np.dtype(dtype)
+    layout = {
+        "F": (pop_shape, pop_dtype),
+        "Fs": (pop_shape, pop_dtype),
+        "mask": ((ny, nx), np.bool_),
+        "ux": ((ny, nx), pop_dtype),
+        "uy": ((ny, nx), pop_dtype),
+        "rho": ((ny, nx), np.float64),
+    }
+
+    ctx = multiprocessing.get_context("spawn")
+    blocks, workers = [], []
+    try:
+        specs = {}
+        for key, (shape, dt) in layout.items():
+            size = max(int(np.prod(shape)) * np.dtype(dt).itemsize, 1)
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            blocks.append(shm)
+            specs[key] = (shm.name, shape, np.dtype(dt).str)
+        shared = {key: np.ndarray(shape, dtype=dt, buffer=shm.buf)
+                  for (key, (shape, dt)), shm in zip(layout.items(), blocks)}
+        shared["mask"][:] = mask
+        shared["ux"][:] = 0.0
+        shared["uy"][:] = 0.0
+
+        # Initial populations: workers fill their own strips from the rest
+        # state; a warm start is copied in here
+        if initial_populations is not None:
+            if kernel == "split":
+                shared["F"][:] = np.transpose(initial_populations, (1, 2, 0))
+            else:
+                shared["F"][:] = _initial_populations(ny, nx, pop_dtype, initial_populations)
+            fill_value = None
+        elif kernel == "split":
+            fill_value = 1.0
+        else:
+            fill_value = _initial_populations(1, 1, pop_dtype)[:, 0, 0]
+
+        rad = np.deg2rad(90.0 - wind_deg)
+        u0 = lattice_velocity * np.cos(rad)
+        v0 = lattice_velocity * np.sin(rad)
+
+        control = ctx.Array("q", 1, lock=False)
+        step_barrier = ctx.Barrier(processes)
+        command_barrier = ctx.Barrier(processes + 1)
+        for j0, j1 in strips:
+            worker = ctx.Process(target=_strip_worker, daemon=True, args=(
+                specs, kernel, j0, j1, u0, v0, wind_deg, omega, lattice_velocity,
+                threads_per_process, fill_value, step_barrier, command_barrier, control))
+            worker.start()
+            workers.append(worker)
+        print(f"🧩 Decomposed run: {processes} processes × {threads_per_process} threads, "
+              f"strips {strips}")
+
+        steps_done = [0]
+
+        def advance(n_steps):
+            control[0] = n_steps
+            try:
+                command_barrier.wait()
+                command_barrier.wait()
+            except threading.BrokenBarrierError:
+                raise RuntimeError("A decomposed LBM worker process failed") from None
+            steps_done[0] += n_steps
+
+        # Lattice mass for the history; before the first step the workers
+        # may still be filling their strips, so it is computed here
+        if initial_populations is not None:
+            initial_mass = float(np.sum(initial_populations))
+        elif kernel == "split":
+            initial_mass = 9.0 * ny * nx
+        else:
+            initial_mass = _RHO0 * ny * nx + ny * nx * float(np.sum(fill_value, dtype=np.float64))
+
+        def total_mass():
+            if steps_done[0] == 0:
+                return initial_mass
+            current = shared["F"] if steps_done[0] % 2 == 0 else shared["Fs"]
+            shift = 0.0 if kernel == "split" else _RHO0 * ny * nx
+            return shift + _array_sum(current.reshape(-1))
+
+        ux, uy = shared["ux"], shared["uy"]
+        convergence_history, iterations = _run_steps(
+            advance, max_iter, enable_performance_tracking, ux, uy,
+            convergence_tolerance, check_interval, total_mass=total_mass,
+            flow_stats=flow_stats, stats_start=stats_start)
+
+        control[0] = 0
+        command_barrier.wait()
+        for worker in workers:
+            worker.join()
+
+        final = shared["F"] if steps_done[0] % 2 == 0 else shared["Fs"]
+        if rho_out is not None:
+            if kernel == "split":
+                rho_out[:] = shared["rho"]
+            else:
+                rho_out[:] = _RHO0 + final.sum(axis=0, dtype=np.float64)
+
+        # Scale to physical velocity (post-processing always works in float64)
+        scale = wind_speed / lattice_velocity
+        return (ux.astype(np.float64) * scale, uy.astype(np.float64) * scale,
+                convergence_history, iterations)
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+# Population layouts selectable through sim_params["population_layout"]
+_LBM_LAYOUT_KERNELS = {
+    "aos": _lbm_enhanced,
+    "soa": _lbm_enhanced_soa,
+}
+
+# Fused kernels selectable through sim_params["lbm_kernel"]
+_LBM_STEPPING_KERNELS = {
+    "fused": _lbm_fused,
+    "aa": _lbm_aa,
+}
+
+# Obstacle wall treatments selectable through sim_params["bounce_back"]
+_BOUNCE_BACK_SCHEMES = ("fullway", "halfway")
+
+def _with_boundary_links(kernel):
+    """Wrap a split kernel so it runs halfway bounce-back on the mask's links"""
+    def run(mask, *args, **kwargs):
+        links = _lattice_index_for(mask, True, mask.shape[1])["boundary_links"]
+        ux, uy, convergence_history, iterations = kernel(mask, *args, boundary_links=links,
+                                                         **kwargs)
+        # Obstacle cells hold no physical state with link-based walls
+        solid = np.asarray(mask, dtype=bool)
+        ux[solid] = 0.0
+        uy[solid] = 0.0
+        if kwargs.get("rho_out") is not None:
+            kwargs["rho_out"][solid] = _RHO0
+        return ux, uy, convergence_history, iterations
+    return run
+
+def _select_lbm_kernel(sim_params: Dict):
+    """
+    Return the LBM kernel requested in sim_params.
+
+    sim_params["lbm_kernel"] picks the split reference kernels ("split"),
+    the fused pull kernel ("fused") or the single-buffer AA-pattern kernel
+    ("aa"); the last two always use the SoA layout and also honour
+    sim_params["precision"] ("float64" or "float32"). For the split kernels
+    sim_params["population_layout"] picks the memory layout.
+    sim_params["skip_solid_cells"] makes the fused kernel iterate the fluid
+    and wall row spans of `_build_lattice_index` instead of the whole mask
+    (faster by a margin growing with the solid fraction, see
+    `benchmark_lbm_kernels`); obstacle cells then report zero velocity. With
+    halfway walls obstacle cells are never read, so the fluid field is the
+    dense one to rounding. With full-way walls it changes the physics
+    slightly: the dense sweep reflects and then BGK-relaxes the populations
+    held inside obstacle cells, skipped wall cells only reflect them, so the
+    returned populations are not pulled towards equilibrium. That is the
+    textbook full-way scheme; on the bundled mask the converged fluid field
+    moves by under 1% (L2), at most ~5% of the inflow speed next to walls.
+    The split and aa span loops vectorize worse than their dense sweeps, so
+    they reject the option.
+    sim_params["bounce_back"] picks the obstacle wall treatment: "fullway"
+    (swap inside obstacle cells) or "halfway" (reflect along precomputed
+    fluid-solid links; split and fused kernels). sim_params["processes"] > 1
+    runs the split (AoS) or fused kernel decomposed into horizontal strips
+    over that many processes (see `_lbm_decomposed`).
+    sim_params["checkpoint_dir"] saves fused/aa runs every
+    sim_params["checkpoint_interval"] iterations and, with
+    sim_params["resume_from_checkpoint"], continues from the latest checkpoint.
+    sim_params["packed_mask"] makes fused runs read the obstacle mask
+    bit-packed (see `pack_obstacle_mask`), as they do for packed input masks.
+    sim_params["frozen_tile_size"] > 0 makes fused runs track per-tile
+    residuals and freeze settled tiles to a reduced update cadence
+    (sim_params["frozen_tile_tolerance"], sim_params["frozen_tile_interval"];
+    see `_frozen_tile_advance`). Keep the tile tolerance well below
+    convergence_tolerance: frozen tiles pass on slow changes late, so a tile
+    tolerance near it leaves the answer short of convergence.
+    """
+
+    kernel = sim_params.get("lbm_kernel", "split")
+    precision = sim_params.get("precision", "float64")
+    if precision not in _LBM_PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', "
+                         f"expected one of {sorted(_LBM_PRECISIONS)}")
+
+    bounce_back = sim_params.get("bounce_back", "fullway")
+    if bounce_back not in _BOUNCE_BACK_SCHEMES:
+        raise ValueError(f"Unknown bounce_back '{bounce_back}', "
+                         f"expected one of {list(_BOUNCE_BACK_SCHEMES)}")
+    if bounce_back == "halfway" and kernel == "aa":
+        raise ValueError("bounce_back='halfway' requires lbm_kernel 'split' or 'fused'")
+
+    skip_solid_cells = bool(sim_params.get("skip_solid_cells", False))
+    if skip_solid_cells and kernel != "fused":
+        raise ValueError("skip_solid_cells requires lbm_kernel 'fused'")
+
+    if sim_params.get("packed_mask", False) and (kernel != "fused" or
+                                                 int(sim_params.get("processes", 1)) > 1):
+        raise ValueError("packed_mask requires lbm_kernel 'fused' on one process")
+
+    frozen_tile_size = int(sim_params.get("frozen_tile_size", 0))
+    if frozen_tile_size > 0 and (kernel != "fused" or int(sim_params.get("processes", 1)) > 1
+                                 or sim_params.get("checkpoint_dir")):
+        raise ValueError("frozen_tile_size > 0 requires lbm_kernel 'fused' on one process, "
+                         "without checkpoint_dir")
+
+    checkpoint_kwargs = {}
+    if sim_params.get("checkpoint_dir"):
+        if kernel not in _LBM_STEPPING_KERNELS or int(sim_params.get("processes", 1)) > 1:
+            raise ValueError("checkpoint_dir requires lbm_kernel 'fused' or 'aa' on one process")
+        if sim_params.get("multigrid_levels", 1) > 1:
+            raise ValueError("checkpoint_dir cannot be combined with multigrid_levels")
+        checkpoint_kwargs = {
+            "checkpoint_dir": sim_params["checkpoint_dir"],
+            "checkpoint_interval": int(sim_params.get("checkpoint_interval", 0)),
+            "resume_from_checkpoint": bool(sim_params.get("resume_from_checkpoint", False))
+        }
+
+    processes = int(sim_params.get("processes", 1))
+    if processes > 1:
+        if kernel not in ("split", "fused"):
+            raise ValueError("processes > 1 requires lbm_kernel 'split' or 'fused'")
+        if kernel == "split" and (precision != "float64" or
+                                  sim_params.get("population_layout", "aos") != "aos"):
+            raise ValueError("The decomposed split kernel mirrors _lbm_enhanced "
+                             "(population_layout 'aos', precision 'float64')")
+        if skip_solid_cells or bounce_back != "fullway":
+            raise ValueError("processes > 1 supports the dense full-way bounce-back path only")
+        return functools.partial(_lbm_decomposed, processes=processes, kernel=kernel,
+                                 dtype=_LBM_PRECISIONS[precision],
+                                 threads_per_process=sim_params.get("threads_per_process"))
+
+    if kernel == "fused":
+        return functools.partial(
+            _lbm_fused, dtype=_LBM_PRECISIONS[precision], skip_solid_cells=skip_solid_cells,
+            bounce_back=bounce_back, frozen_tile_size=frozen_tile_size,
+            frozen_tile_tolerance=float(sim_params.get("frozen_tile_tolerance", 1e-4)),
+            frozen_tile_interval=int(sim_params.get("frozen_tile_interval", 8)),
+            **checkpoint_kwargs)
+    if kernel in _LBM_STEPPING_KERNELS:
+        return functools.partial(_LBM_STEPPING_KERNELS[kernel],
+                                 dtype=_LBM_PRECISIONS[precision], **checkpoint_kwargs)
+    if precision != "float64":
+        raise ValueError("precision='float32' requires lbm_kernel 'fused' or 'aa'")
+    if kernel != "split":
+        raise ValueError(f"Unknown lbm_kernel '{kernel}', expected 'split' "
+                         f"or one of {sorted(_LBM_STEPPING_KERNELS)}")
+
+    layout = sim_params.get("population_layout", "aos")
+    if layout not in _LBM_LAYOUT_KERNELS:
+        raise ValueError(f"Unknown population_layout '{layout}', "
+                         f"expected one of {sorted(_LBM_LAYOUT_KERNELS)}")
+    if bounce_back == "halfway":
+        return _with_boundary_links(_LBM_LAYOUT_KERNELS[layout])
+    return _LBM_LAYOUT_KERNELS[layout]
+
+# ──────────────────────────────────────────────────────────────────────────
+# SOLVER STATE (WARM START)
+# ──────────────────────────────────────────────────────────────────────────
+
+def _solver_state_from_velocity(ux: np.ndarray, uy: np.ndarray,
+                                weather_data: Dict, iterations: int,
+                                rho: Optional[np.ndarray] = None,
+                                lattice_velocity: float = _LATTICE_VELOCITY) -> Dict:
+    """Solver state (lattice units) for a finished run's physical velocity and density"""
+    scale = weather_data["wind_speed_ms"] / lattice_velocity
+    return {
+        "ux": (ux / scale).astype(np.float64),
+        "uy": (uy / scale).astype(np.float64),
+        "rho": rho,
+        "wind_speed_ms": float(weather_data["wind_speed_ms"]),
+        "wind_direction_deg": float(weather_data["wind_direction_deg"]),
+        "lattice_velocity": float(lattice_velocity),
+        "iterations": int(iterations)
+    }
+
+def solver_state_populations(state: Dict, shape: Tuple[int, int],
+                             lattice_velocity: Optional[float] = None) -> np.ndarray:
+    """
+    Initial populations f[9, ny, nx] (float64, unshifted) for a warm start.
+
+    `state` holds either "populations" directly or lattice-unit "ux"/"uy"
+    (plus optional "rho", default the rest density), as returned in
+    results["solver_state"] or by `load_solver_state`. Velocity states are
+    turned into their equilibrium populations, rescaled from the state's
+    "lattice_velocity" (default 0.1) to lattice_velocity when given.
+    """
+    ny, nx = shape
+    if state.get("populations") is not None:
+        f = np.asarray(state["populations"], dtype=np.float64)
+        if f.shape != (9, ny, nx):
+            raise ValueError(f"Solver state populations have shape {f.shape}, "
+                             f"expected {(9, ny, nx)}")
+    else:
+        u = np.asarray(state["ux"], dtype=np.float64)
+        v = np.asarray(state["uy"], dtype=np.float64)
+        if lattice_velocity is not None:
+            ratio = lattice_velocity / float(state.get("lattice_velocity", _LATTICE_VELOCITY))
+            u, v = u * ratio, v * ratio
+        rho = state.get("rho")
+        rho = np.full((ny, nx), _RHO0) if rho is None else np.asarray(rho, dtype=np.float64)
+        if u.shape != (ny, nx) or v.shape != (ny, nx) or rho.shape != (ny, nx):
+            raise ValueError(f"Solver state fields have shape {u.shape}, expected {(ny, nx)}")
+
+        usq = 1.5 * (u * u + v * v)
+        f = np.empty((9, ny, nx), dtype=np.float64)
+        for k in range(9):
+            cu = _D2Q9_CX[k] * u + _D2Q9_CY[k] * v
+            f[k] = _D2Q9_WEIGHTS[k] * rho * (1.0 + 3.0 * cu + 4.5 * cu * cu - usq)
+
+    if not np.all(np.isfinite(f)):
+        raise ValueError("Solver state contains non-finite values")
+    return f
+
+def save_solver_state(path: str, state: Dict) -> None:
+    """Save a solver state dict (arrays and scalars) to a compressed .npz file"""
+    np.savez_compressed(path, **{k: v for k, v in state.items() if v is not None})
+
+def load_solver_state(path: str) -> Dict:
+    """Load a solver state saved by `save_solver_state`"""
+    with np.load(path) as data:
+        return {k: (data[k].item() if data[k].ndim == 0 else data[k]) for k in data.files}
+
+# ──────────────────────────────────────────────────────────────────────────
+# CHECKPOINT / RESTART (stepping kernels)
+# ──────────────────────────────────────────────────────────────────────────
+
+_CHECKPOINT_FORMAT = 1
+
+def _checkpoint_writer(directory: str, config: Dict, first_slot: int = 0):
+    """
+    Background writer for solver checkpoints in `directory`; returns (submit, close).
+
+    submit(iteration, arrays, info) copies the arrays into one of two staging
+    buffers - the only work left on the compute thread, apart from waiting
+    for the previous write if it is still running - and a worker thread
+    saves them as <name>-<slot>.npy into the on-disk slot that checkpoint.json
+    does not reference, then atomically replaces checkpoint.json to point at
+    it. A crash mid-write leaves the previous checkpoint intact. Write errors
+    are raised by the next submit or by close(), which waits for the last write.
+    """
+    os.makedirs(directory, exist_ok=True)
+    staging = ({}, {})
+    writer = {"thread": None, "error": None, "slot": first_slot}
+
+    def write(slot, iteration, arrays, info):
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(directory, f"{name}-{slot}.npy"), array)
+            index = {"format": _CHECKPOINT_FORMAT, "slot": slot, "iteration": int(iteration),
+                     "arrays": sorted(arrays), "info": info, "config": config}
+            tmp_path = os.path.join(directory, "checkpoint.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(directory, "checkpoint.json"))
+        except Exception as error:
+            writer["error"] = error
+
+    def close():
+        if writer["thread"] is not None:
+            writer["thread"].join()
+            writer["thread"] = None
+        if writer["error"] is not None:
+            error, writer["error"] = writer["error"], None
+            raise RuntimeError(f"Writing checkpoint to {directory} failed") from error
+
+    def submit(iteration, arrays, info):
+        slot = writer["slot"]
+        buffers = staging[slot]
+        for name, array in arrays.items():
+            if name not in buffers or buffers[name].shape != array.shape or \
+                    buffers[name].dtype != array.dtype:
+                buffers[name] = np.empty_like(array)
+            np.copyto(buffers[name], array)
+        close()
+        writer["thread"] = threading.Thread(
+            target=write, args=(slot, iteration, {name: buffers[name] for name in arrays}, info),
+            daemon=True)
+        writer["thread"].start()
+        writer["slot"] = 1 - slot
+
+    return submit, close
+
+def _load_checkpoint(directory: str) -> Optional[Dict]:
+    """
+    Latest complete checkpoint in `directory` (index fields plus its arrays,
+    memory-mapped read-only), or None if there is none.
+    """
+    index_path = os.path.join(directory, "checkpoint.json")
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("format") != _CHECKPOINT_FORMAT:
+        raise ValueError(f"Unsupported checkpoint format {checkpoint.get('format')} in {directory}")
+    for name in checkpoint["arrays"]:
+        checkpoint[name] = np.load(os.path.join(directory, f"{name}-{checkpoint['slot']}.npy"),
+                                   mmap_mode="r")
+    return checkpoint
+
+def _checkpoint_hooks(checkpoint_dir: Optional[str], checkpoint_interval: int,
+                      resume: bool, config: Dict, driver_state):
+    """
+    Checkpoint plumbing shared by the stepping drivers.
+
+    driver_state() returns the driver's (arrays, info) to save: its live
+    population buffer, ux/uy and JSON scalars such as the AA parity. `config`
+    identifies the run; resuming from a checkpoint written for another
+    configuration raises ValueError. Returns (checkpoint to resume from or
+    None, keyword arguments for `_run_steps`, close) - call close() when the
+    run ends to wait for the last write.
+    """
+    if checkpoint_dir is None:
+        return None, {}, lambda: None
+
+    latest = _load_checkpoint(checkpoint_dir) if resume else None
+    if latest is not None:
+        mismatched = sorted(key for key in config if latest["config"].get(key) != config[key])
+        if mismatched:
+            raise ValueError(f"Checkpoint in {checkpoint_dir} belongs to a different run "
+                             f"({', '.join(mismatched)} differ)")
+        print(f"⏯️  Resuming from checkpoint at iteration {latest['iteration']}")
+    elif resume:
+        print(f"⏯️  No checkpoint in {checkpoint_dir}, starting from the beginning")
+
+    if checkpoint_interval <= 0:
+        return latest, {"resume": latest}, lambda: None
+
+    submit, close = _checkpoint_writer(checkpoint_dir, config,
+                                       0 if latest is None else 1 - latest["slot"])
+
+    def save_checkpoint(iteration, loop_state):
+        arrays, info = driver_state()
+        arrays = dict(arrays, **{name: value for name, value in loop_state.items()
+                                 if value is not None})
+        submit(iteration, arrays, info)
+
+    return latest, {"resume": latest, "checkpoint_interval": checkpoint_interval,
+                    "save_checkpoint": save_checkpoint}, close
+
+# ──────────────────────────────────────────────────────────────────────────
+# ENHANCED STREAMLINE GENERATION
+# ──────────────────────────────────────────────────────────────────────────
+
+@njit(cache=True)
+def _seed_path_rng(seed):
+    """Seed numba's random generator, which the jitted path generators draw from"""
+    np.random.seed(seed)
+
+@njit(fastmath=True, cache=True)
+def _iter_streamlines(ux, uy, nx, ny, num_streamlines=200, max_points=100,
+                      min_speed=0.1, step_size=1.0):
+    """
+    Generate streamlines using 4th-order Runge-Kutta integration, one
+    streamline (list of (x, y, speed) points) at a time
+    """
+    for stream_idx in range(num_streamlines):
+        # Random starting point
+        start_x = np.random.random() * (nx - 1)
+        start_y = np.random.random() * (ny - 1)
+        
+        streamline = []
+        x, y = start_x, start_y
+        
+        for point_idx in range(max_points):
+            # Check bounds
+            if x < 1 or x >= nx-1 or y < 1 or y >= ny-1:
+                break
+            
+            # Bilinear interpolation for velocity
+            i, j = int(x), int(y)
+            fx, fy = x - i, y - j
+            
+            # Get velocities at grid points
+            u00 = ux[j, i]
+            u10 = ux[j, i+1]  
+            u01 = ux[j+1, i]
+            u11 = ux[j+1, i+1]
+            
+            v00 = uy[j, i]
+            v10 = uy[j, i+1]
+            v01 = uy[j+1, i] 
+            v11 = uy[j+1, i+1]
+            
+            # Bilinear interpolation
+            u_interp = u00*(1-fx)*(1-fy) + u10*fx*(1-fy) + u01*(1-fx)*fy + u11*fx*fy
+            v_interp = v00*(1-fx)*(1-fy) + v10*fx*(1-fy) + v01*(1-fx)*fy + v11*fx*fy
+            
+            speed = np.sqrt(u_interp*u_interp + v_interp*v_interp)
+            
+            # Stop if speed too low
+            if speed < min_speed:
+                break
+            
+            # Add point to streamline
+            streamline.append((x, y, speed))
+            
+            # 4th-order Runge-Kutta step
+            k1x, k1y = u_interp * step_size, v_interp * step_size
+            
+            # For simplicity, use Euler step (can be enhanced to full RK4)
+            x += k1x
+            y += k1y
+        
+        if len(streamline) > 5:  # Only keep streamlines with sufficient points
+            yield streamline
+
+def _generate_streamlines(ux, uy, nx, ny, num_streamlines=200, max_points=100,
+                         min_speed=0.1, step_size=1.0):
+    """All `_iter_streamlines` streamlines as a list"""
+    return list(_iter_streamlines(ux, uy, nx, ny, num_streamlines, max_points, min_speed, step_size))
+
+# ──────────────────────────────────────────────────────────────────────────
+# ENHANCED PARTICLE SYSTEM
+# ──────────────────────────────────────────────────────────────────────────
+
+@njit(fastmath=True, cache=True)
+def _generate_particle_paths(ux, uy, nx, ny, num_particles=1000, max_steps=200,
+                            dt=0.1, min_speed=0.05):
+    """
+    Generate particle trajectories for visualization
+    """
+    particles = []
+    
+    for particle_idx in range(num_particles):
+        # Random starting position
+        start_x = np.random.random() * (nx - 1)
+        start_y = np.random.random() * (ny - 1)
+        
+        path = []
+        x, y = start_x, start_y
+        age = 0
+        
+        for step in range(max_steps):
+            # Check bounds
+            if x < 1 or x >= nx-1 or y < 1 or y >= ny-1:
+                break
+            
+            # Bilinear interpolation for velocity (same as streamlines)
+            i, j = int(x), int(y)
+            fx, fy = x - i, y - j
+            
+            u00 = ux[j, i]; u10 = ux[j, i+1]; u01 = ux[j+1, i]; u11 = ux[j+1, i+1]
+            v00 = uy[j, i]; v10 = uy[j, i+1]; v01 = uy[j+1, i]; v11 = uy[j+1, i+1]
+            
+            u_interp = u00*(1-fx)*(1-fy) + u10*fx*(1-fy) + u01*(1-fx)*fy + u11*fx*fy
+            v_interp = v00*(1-fx)*(1-fy) + v10*fx*(1-fy) + v01*(1-fx)*fy + v11*fx*fy
+            
+            speed = np.sqrt(u_interp*u_interp + v_interp*v_interp)
+            
+            if speed < min_speed:
+                break
+            
+            # Add random diffusion for more realistic particle motion
+            diffusion = 0.1
+            u_interp += np.random.normal(0, diffusion)
+            v_interp += np.random.normal(0, diffusion)
+            
+            # Store particle state
+            path.append((x, y, u_interp, v_interp, speed, age))
+            
+            # Update position
+            x += u_interp * dt
+            y += v_interp * dt
+            age += 1
+        
+        if len(path) > 3:
+            particles.append(path)
+    
+    return particles
+
+def _iter_particle_paths(ux, uy, nx, ny, num_particles=1000, max_steps=200, batch_size=256):
+    """
+    `_generate_particle_paths` one path at a time, computed batch_size
+    particles per call. numba's random state carries over between calls, so
+    the paths are the ones a single call would give.
+    """
+    for start in range(0, num_particles, batch_size):
+        yield from _generate_particle_paths(ux, uy, nx, ny, min(batch_size, num_particles - start), max_steps)
+
+# ──────────────────────────────────────────────────────────────────────────
+# BINARY RESULT BUNDLE
+# ──────────────────────────────────────────────────────────────────────────
+
+# Bundle file layout: _BUNDLE_MAGIC, the header length as a little-endian
+# uint32, a UTF-8 JSON header padded with spaces to a multiple of
+# _BUNDLE_ALIGN bytes, then the arrays' raw little-endian bytes. Each header
+# entry gives an array's stored dtype/shape and its offset from the end of
+# the header; offsets are multiples of _BUNDLE_ALIGN, so a browser can view
+# them as typed arrays and numpy can memory-map them
+_BUNDLE_MAGIC = b"WINDBNDL"
+_BUNDLE_FORMAT = 1
+_BUNDLE_ALIGN = 64
+
+# Storage of float grids selectable through sim_params["bundle_encoding"]
+_BUNDLE_ENCODINGS = ("uint16", "float16", "float32")
+
+def _encode_bundle_array(values: np.ndarray, encoding: str) -> Tuple[np.ndarray, Dict]:
+    """Stored little-endian array and header fields for one bundle array"""
+    values = np.asarray(values)
+    if values.dtype == np.bool_:
+        return np.packbits(values, axis=-1, bitorder="little"), {"encoding": "bits"}
+    if values.dtype.kind in "iu":
+        return values.astype(values.dtype.newbyteorder("<")), {"encoding": "raw"}
+    if encoding == "uint16":
+        finite = values[np.isfinite(values)]
+        low, high = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 0.0)
+        step = (high - low) / 65535.0 if high > low else 1.0
+        clean = np.nan_to_num(values, nan=low, posinf=high, neginf=low)
+        stored = np.clip(np.rint((clean - low) / step), 0, 65535).astype("<u2")
+        return stored, {"encoding": "uint16", "min": low, "step": step}
+    return values.astype("<f2" if encoding == "float16" else "<f4"), {"encoding": encoding}
+
+def _json_default(value):
+    """json.dump fallback for numpy scalars and arrays in bundle metadata"""
+    return value.tolist() if hasattr(value, "tolist") else str(value)
+
+def save_result_bundle(path: str, arrays: Dict[str, np.ndarray], metadata: Dict,
+                       encoding: str = "uint16") -> int:
+    """
+    Write grids and JSON metadata as one binary bundle (layout above).
+
+    Float arrays are stored per encoding: "uint16" quantises linearly
+    between the array's finite min and max (error at most half a step,
+    (max - min) / 131070; non-finite values are clamped), "float16" or
+    "float32". Bool arrays (masks) are bit-packed along rows as in
+    `save_obstacle_mask`, integer arrays stored as they are. The file is
+    written next to path and renamed into place. Returns its size in bytes.
+    """
+    if encoding not in _BUNDLE_ENCODINGS:
+        raise ValueError(f"Unknown bundle encoding '{encoding}', expected one of {list(_BUNDLE_ENCODINGS)}")
+
+    entries, blobs, offset = {}, [], 0
+    for name, values in arrays.items():
+        stored, entry = _encode_bundle_array(values, encoding)
+        entries[name] = dict(entry, shape=list(np.shape(values)), dtype=stored.dtype.str,
+                             stored_shape=list(stored.shape), offset=offset)
+        blobs.append(stored)
+        offset += -(-stored.nbytes // _BUNDLE_ALIGN) * _BUNDLE_ALIGN
+
+    header = json.dumps({"format": _BUNDLE_FORMAT, "arrays": entries, "metadata": metadata},
+                        default=_json_default).encode("utf-8")
+    header += b" " * (-(len(_BUNDLE_MAGIC) + 4 + len(header)) % _BUNDLE_ALIGN)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_BUNDLE_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for stored in blobs:
+            f.write(np.ascontiguousarray(stored).tobytes())
+            f.write(b"\0" * (-stored.nbytes % _BUNDLE_ALIGN))
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+def load_result_bundle(path: str) -> Dict:
+    """
+    Open a `save_result_bundle` file: {"metadata": ..., "arrays": {name:
+    read-only memory map of the stored values}, "entries": {name: header
+    entry}}. Nothing is read until used; `bundle_array` decodes an array.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(_BUNDLE_MAGIC)) != _BUNDLE_MAGIC:
+            raise ValueError(f"{path} is not a result bundle")
+        (header_length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length))
+    if header.get("format") != _BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported result bundle format {header.get('format')} in {path}")
+
+    data_start = len(_BUNDLE_MAGIC) + 4 + header_length
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        shape = tuple(entry["stored_shape"])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.empty(shape, dtype=entry["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=entry["dtype"], mode="r",
+                                     offset=data_start + entry["offset"], shape=shape)
+    return {"metadata": header["metadata"], "arrays": arrays, "entries": header["arrays"]}
+
+def bundle_array(bundle: Dict, name: str) -> np.ndarray:
+    """
+    Decoded array from a `load_result_bundle` result: quantised and float16
+    grids as float32, masks unpacked to bool, raw arrays as their memory map.
+    """
+    entry, stored = bundle["entries"][name], bundle["arrays"][name]
+    if entry["encoding"] == "bits":
+        return np.unpackbits(stored, axis=-1, count=entry["shape"][-1], bitorder="little").astype(bool)
+    if entry["encoding"] == "uint16":
+        return (entry["min"] + stored * entry["step"]).astype(np.float32)
+    if entry["encoding"] == "float16":
+        return stored.astype(np.float32)
+    return stored
+
+# ──────────────────────────────────────────────────────────────────────────
+# STREAMING JSON OUTPUT
+# ──────────────────────────────────────────────────────────────────────────
+
+# Target size (characters) of each batch of list elements `write_results_json`
+# encodes at once; batch lengths adapt to the elements' encoded size
+_JSON_STREAM_BATCH_CHARS = 1 << 20
+
+def _is_streamed(value) -> bool:
+    """Whether `write_results_json` streams value (or something inside it)"""
+    if isinstance(value, (Iterator, np.ndarray)):
+        return True
+    return isinstance(value, dict) and any(_is_streamed(item) for item in value.values())
+
+def _array_items(values: np.ndarray) -> Iterator:
+    """JSON-ready elements of an array along its first axis (sub-arrays as nested lists)"""
+    for start in range(0, len(values), 4096):
+        yield from values[start:start + 4096].tolist()
+
+def _json_chunks(value, indent: Optional[str], item_separator: str, key_separator: str,
+                 level: int = 0) -> Iterator[str]:
+    """
+    JSON text of value, in pieces, exactly as json.dumps(value, indent=indent,
+    separators=(item_separator, key_separator)) writes it nested `level`
+    deep. Iterators and numpy arrays are written as lists a batch of
+    elements at a time, dicts holding them key by key; everything else
+    goes through json.dumps whole.
+    """
+    def encode(item) -> str:
+        text = json.dumps(item, indent=indent, separators=(item_separator, key_separator))
+        return text.replace("\n", "\n" + indent * level) if indent is not None else text
+
+    if not _is_streamed(value):
+        yield encode(value)
+        return
+
+    # Separator placed before every element (json's newline_indent handling)
+    inner = "" if indent is None else "\n" + indent * (level + 1)
+    outer = "" if indent is None else "\n" + indent * level
+    if isinstance(value, dict):
+        if not value:
+            yield "{}"
+            return
+        for k, (key, item) in enumerate(value.items()):
+            yield ("{" if k == 0 else item_separator) + inner + json.dumps(key) + key_separator
+            yield from _json_chunks(item, indent, item_separator, key_separator, level + 1)
+        yield outer + "}"
+        return
+
+    items = _array_items(value) if isinstance(value, np.ndarray) else value
+    batch_size, first = 64, True
+    while True:
+        batch = [item.tolist() if isinstance(item, np.ndarray) else item
+                 for item in itertools.islice(items, batch_size)]
+        if not batch:
+            break
+        # Encode the batch as a list one level down and drop its brackets
+        text = json.dumps(batch, indent=indent, separators=(item_separator, key_separator))
+        if indent is not None:
+            text = text.replace("\n", "\n" + indent * level)
+        yield ("[" if first else item_separator) + inner + text[1 + len(inner):len(text) - 1 - len(outer)]
+        first = False
+        batch_size = max(1, min(batch_size * 4, len(batch) * _JSON_STREAM_BATCH_CHARS // len(text)))
+    yield "[]" if first else outer + "]"
+
+def write_results_json(target, results: Dict, indent=None, separators=None) -> int:
+    """
+    Write results as JSON, character for character what json.dump(results,
+    f, indent=indent, separators=separators) writes, without building it in
+    memory: values that are iterators (e.g. generators of vector records or
+    paths) or numpy arrays are written as JSON lists a batch of elements at
+    a time. target is a text file object or a path; paths ending in ".gz"
+    are gzip-compressed, and a path is written to a temporary file that
+    replaces it once complete. Returns the number of characters written.
+    """
+    if isinstance(indent, int):
+        indent = " " * indent
+    if separators is None:
+        separators = (", " if indent is None else ",", ": ")
+    if not isinstance(target, (str, os.PathLike)):
+        written = 0
+        for chunk in _json_chunks(results, indent, *separators):
+            target.write(chunk)
+            written += len(chunk)
+        return written
+
+    path = os.fspath(target)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        if path.endswith(".gz"):
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                written = write_results_json(f, results, indent, separators)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                written = write_results_json(f, results, indent, separators)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written
+
+# ──────────────────────────────────────────────────────────────────────────
+# ENHANCED PUBLIC API
+# ──────────────────────────────────────────────────────────────────────────
+
+def _run_lbm(obstacle_mask: np.ndarray, weather_data: Dict, sim_params: Dict,
+             enable_performance_tracking: bool, rho_out: Optional[np.ndarray] = None,
+             flow_stats: Optional[Dict] = None, tile_stats: Optional[Dict] = None):
+    """
+    Run the configured LBM kernel; returns (ux, uy, history, iterations used).
+    The final lattice density is written to rho_out when given. With
+    sim_params["averaging_window"] > 0, flow_stats receives the running
+    moments of the last window iterations ("moments", `_FLOW_STAT_FIELDS`
+    planes in physical units) and their sample count ("samples"); a run
+    that converges keeps going until window iterations after convergence
+    have been averaged. Runs with sim_params["frozen_tile_size"] > 0 add
+    their tile-update counts to tile_stats (see `_frozen_tile_advance`).
+    obstacle_mask may be packed (see `pack_obstacle_mask`); paths that
+    resample it unpack it first.
+    """
+
+    if sim_params.get("rotate_domain", False):
+        return _run_lbm_rotated(_dense_mask(obstacle_mask, _mask_shape(obstacle_mask)[1]),
+                                weather_data, sim_params,
+                                enable_performance_tracking, rho_out, flow_stats, tile_stats)
+    if sim_params.get("multigrid_levels", 1) > 1:
+        if sim_params.get("initial_state") is None:
+            return _run_lbm_multigrid(_dense_mask(obstacle_mask, _mask_shape(obstacle_mask)[1]),
+                                      weather_data, sim_params,
+                                      enable_performance_tracking, rho_out, flow_stats,
+                                      tile_stats)
+        print("🪜 Multigrid skipped: run is warm-started from a solver state")
+    return _run_lbm_level(obstacle_mask, weather_data, sim_params,
+                          enable_performance_tracking, rho_out, flow_stats, tile_stats)
+
+def _run_lbm_level(obstacle_mask: np.ndarray, weather_data: Dict, sim_params: Dict,
+                   enable_performance_tracking: bool, rho_out: Optional[np.ndarray] = None,
+                   flow_stats: Optional[Dict] = None, tile_stats: Optional[Dict] = None):
+    """Run the configured LBM kernel on a single grid"""
+
+    ny, nx = _mask_shape(obstacle_mask)
+    lbm_kernel = _select_lbm_kernel(sim_params)
+
+    # The fused kernel reads packed masks as words, the others need them dense
+    # (the aa dense sweep only vectorizes on a byte mask)
+    if sim_params.get("lbm_kernel", "split") == "fused" and int(sim_params.get("processes", 1)) == 1:
+        obstacle_mask = _kernel_mask(obstacle_mask, sim_params.get("packed_mask", False))
+    else:
+        obstacle_mask = _dense_mask(obstacle_mask, nx)
+
+    # Optional warm start from a previous run or a saved checkpoint
+    kernel_kwargs = {}
+    if rho_out is not None:
+        kernel_kwargs["rho_out"] = rho_out
+    lattice_velocity = float(sim_params.get("lattice_velocity", _LATTICE_VELOCITY))
+    kernel_kwargs["lattice_velocity"] = lattice_velocity
+    if tile_stats is not None and int(sim_params.get("frozen_tile_size", 0)) > 0:
+        kernel_kwargs["tile_stats"] = tile_stats
+    if sim_params.get("initial_state") is not None:
+        kernel_kwargs["initial_populations"] = solver_state_populations(
+            sim_params["initial_state"], (ny, nx), lattice_velocity)
+        print("♻️  Warm start from previous solver state")
+
+    # Optional running moments over the last averaging_window iterations
+    moments = None
+    window = int(sim_params.get("averaging_window", 0))
+    if flow_stats is not None and window > 0:
+        moments = np.zeros((len(_FLOW_STAT_FIELDS), ny, nx), dtype=np.float64)
+        stats_start = max(0, int(sim_params["max_iterations"]) - window)
+        kernel_kwargs["flow_stats"] = moments
+        kernel_kwargs["stats_start"] = stats_start
+
+    # Plain Python scalars keep the kernels on the signatures `precompile_kernels`
+    # puts in the cache (an int wind direction would compile a new one)
+    ux, uy, history, iterations = lbm_kernel(
+        obstacle_mask,
+        float(weather_data["wind_speed_ms"]),
+        float(weather_data["wind_direction_deg"]),
+        nx, ny,
+        int(sim_params["max_iterations"]),
+        float(sim_params["relaxation_rate"]),
+        bool(enable_performance_tracking),
+        float(sim_params.get("convergence_tolerance", 0.0)),
+        int(sim_params.get("check_interval", 100)),
+        **kernel_kwargs
+    )
+
+    if moments is not None:
+        # Moments were taken in lattice units, like the kernels' velocities
+        scale = float(weather_data["wind_speed_ms"]) / lattice_velocity
+        moments[:3] *= scale
+        moments[3:] *= scale * scale
+        # The kernels average a trailing window: the last `window` iterations
+        # before max_iterations or after convergence, whichever ends first
+        samples = min(window, iterations)
+        if samples < window:
+            print(f"⚠️  Averaging window of {window} iterations holds only {samples} samples "
+                  f"(max_iterations {sim_params['max_iterations']})")
+        flow_stats.update(moments=moments, samples=samples)
+    return ux, uy, history, iterations
+
+def _coarsen_mask(mask: np.ndarray) -> np.ndarray:
+    """Halve a mask's resolution; a coarse cell is solid if any of its 2×2 cells is"""
+    ny, nx = mask.shape
+    padded = np.pad(np.asarray(mask, dtype=bool), ((0, ny % 2), (0, nx % 2)), mode="edge")
+    return padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).any(axis=(1, 3))
+
+def _prolongate_state(state: Dict, mask: np.ndarray) -> Dict:
+    """Refine a lattice-unit state 2× onto `mask`'s grid (velocity zero in obstacles)"""
+    ny, nx = mask.shape
+    fine = dict(state)
+    for key in ("ux", "uy", "rho"):
+        if state.get(key) is None:
+            continue
+        field = np.repeat(np.repeat(state[key], 2, axis=0), 2, axis=1)[:ny, :nx]
+        fine[key] = field if key == "rho" else np.where(mask, 0.0, field)
+    return fine
+
+def _coarse_relaxation_rate(omega: float, factor: int) -> float:
+    """
+    BGK relaxation rate keeping the physical viscosity on a grid coarsened by
+    `factor` (same lattice velocity, so dt scales with dx and the lattice
+    viscosity (1/omega - 1/2)/3 scales with 1/factor). Capped below 2 for stability.
+    """
+    tau = 0.5 + (1.0 / omega - 0.5) / factor
+    return min(1.0 / tau, 1.95)
+
+def _multigrid_schedule(max_iterations: int, levels: int) -> List[int]:
+    """Iteration budget per level, coarsest first: halves per level, coarsest takes the rest"""
+    budget = [max_iterations >> (level + 1) for level in range(levels - 1)]
+    budget.append(max_iterations - sum(budget))
+    return budget[::-1]
+
+def _run_lbm_multigrid(obstacle_mask: np.ndarray, weather_data: Dict, sim_params: Dict,
+                       enable_performance_tracking: bool, rho_out: Optional[np.ndarray] = None,
+                       flow_stats: Optional[Dict] = None, tile_stats: Optional[Dict] = None):
+    """
+    Coarse-to-fine LBM run over sim_params["multigrid_levels"] grids.
+
+    The obstacle mask is coarsened 2× per level (down to >= 16 cells a side),
+    each level warm-starts from the prolongated velocity of the coarser one
+    (same lattice inflow speed, so lattice velocities carry over directly)
+    and density, with its relaxation rate scaled to keep the physical viscosity,
+    and iterations left unused by an early-converged level roll over to the
+    next. Returns the finest level's (ux, uy, history) and the iterations used
+    over all levels, which stays below max_iterations only if the finest
+    level converged. Running moments (flow_stats) come from the finest level.
+    """
+    masks = [np.asarray(obstacle_mask, dtype=bool)]
+    while len(masks) < sim_params["multigrid_levels"] and min(masks[-1].shape) >= 32:
+        masks.append(_coarsen_mask(masks[-1]))
+    masks = masks[::-1]
+    schedule = _multigrid_schedule(sim_params["max_iterations"], len(masks))
+
+    state = None
+    carry = 0
+    total_iterations = 0
+    for level, (mask, budget) in enumerate(zip(masks, schedule)):
+        finest = level == len(masks) - 1
+        factor = 2 ** (len(masks) - 1 - level)
+        level_params = dict(sim_params, max_iterations=budget + carry, initial_state=state,
+                            relaxation_rate=_coarse_relaxation_rate(
+                                sim_params["relaxation_rate"], factor))
+        print(f"🪜 Multigrid level {factor}×: {mask.shape[1]}×{mask.shape[0]} cells, "
+              f"up to {budget + carry} iterations")
+
+        level_rho = rho_out if finest else np.empty(mask.shape, dtype=np.float64)
+        ux, uy, history, iterations = _run_lbm_level(
+            mask, weather_data, level_params, enable_performance_tracking and finest, level_rho,
+            flow_stats if finest else None, tile_stats)
+        total_iterations += iterations
+        if finest:
+            if history is not None:
+                history = history[:iterations]
+            return ux, uy, history, total_iterations
+        carry = budget + carry - iterations
+        if not (np.all(np.isfinite(ux)) and np.all(np.isfinite(uy))):
+            print(f"⚠️  Multigrid level {factor}× diverged, next level starts from rest")
+            state = None
+            continue
+        state = _prolongate_state(
+            _solver_state_from_velocity(ux, uy, weather_data, iterations, level_rho,
+                                        sim_params.get("lattice_velocity", _LATTICE_VELOCITY)),
+            masks[level + 1])
+
+# Wind direction the rotated lattice is solved for: inflow on the west edge
+# with the wind along the x axis
+_ROTATED_WIND_DEG = 270.0
+
+# Fluid cells kept around the rotated obstacles when the rotated lattice is
+# cropped: at least sim_params["rotated_padding"] (None keeps the whole
+# bounding box) and at least this many times the obstacles' extent, which
+# keeps their wakes and the flow the open edges feed them on the lattice
+_ROTATED_PADDING = 16
+_ROTATED_PADDING_EXTENTS = 6
+
+def _rotation_frame(shape: Tuple[int, int], wind_deg: float,
+                    mask: Optional[np.ndarray] = None,
+                    padding: Optional[int] = _ROTATED_PADDING) -> Dict:
+    """
+    Rotation taking the kernel's inflow velocity for `wind_deg` onto the
+    +x/-x axis of `_ROTATED_WIND_DEG`, with the rotated grid sized to the
+    bounding box of the original cell centres (plus one cell for oblique
+    angles). Quarter turns are snapped to exact cos/sin so they map cells
+    one-to-one.
+
+    With a mask, oblique frames are cropped to the rotated obstacle cells
+    plus, on every side, `_ROTATED_PADDING_EXTENTS` times the larger side of
+    their rotated bounding box (at least `padding` cells), within the whole
+    bounding box. A few compact obstacles in a large domain then no longer
+    pay for its empty corners; obstacles spread over the domain keep the
+    whole bounding box, as do quarter turns, obstacle-free masks and
+    padding=None.
+    """
+    ny, nx = shape
+    turn = (90.0 + wind_deg) % 360.0
+    phi = np.deg2rad(turn)
+    cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+    margin = 1
+    if turn % 90.0 == 0.0:
+        cos_phi, sin_phi = float(round(cos_phi)), float(round(sin_phi))
+        margin = 0
+    nx_rot = int(np.ceil(abs(cos_phi) * (nx - 1) + abs(sin_phi) * (ny - 1) - 1e-9)) + 1 + 2 * margin
+    ny_rot = int(np.ceil(abs(sin_phi) * (nx - 1) + abs(cos_phi) * (ny - 1) - 1e-9)) + 1 + 2 * margin
+    frame = {
+        "cos": cos_phi, "sin": sin_phi, "turn_deg": turn,
+        "shape": (ny, nx), "rotated_shape": (ny_rot, nx_rot),
+        "centre": ((nx - 1) / 2.0, (ny - 1) / 2.0),
+        "rotated_centre": ((nx_rot - 1) / 2.0, (ny_rot - 1) / 2.0)
+    }
+    if mask is None or padding is None or margin == 0 or not np.any(mask):
+        return frame
+
+    jj, ii = np.nonzero(mask)
+    xr, yr = _to_rotated_coords(frame, ii.astype(np.float64), jj.astype(np.float64))
+    extent = max(xr.max() - xr.min(), yr.max() - yr.min()) + 1.0
+    padding = max(int(padding), int(np.ceil(_ROTATED_PADDING_EXTENTS * extent)))
+    x0 = max(int(np.floor(xr.min())) - padding, 0)
+    y0 = max(int(np.floor(yr.min())) - padding, 0)
+    x1 = min(int(np.ceil(xr.max())) + padding, nx_rot - 1)
+    y1 = min(int(np.ceil(yr.max())) + padding, ny_rot - 1)
+    (rx, ry) = frame["rotated_centre"]
+    frame.update(rotated_shape=(y1 - y0 + 1, x1 - x0 + 1),
+                 rotated_centre=(rx - x0, ry - y0))
+    return frame
+
+def _to_rotated_coords(frame: Dict, x: np.ndarray, y: np.ndarray):
+    """Positions of original-grid points on the rotated grid"""
+    (cx, cy), (rx, ry) = frame["centre"], frame["rotated_centre"]
+    c, s = frame["cos"], frame["sin"]
+    return c * (x - cx) - s * (y - cy) + rx, s * (x - cx) + c * (y - cy) + ry
+
+def _from_rotated_coords(frame: Dict, x: np.ndarray, y: np.ndarray):
+    """Positions of rotated-grid points on the original grid"""
+    (cx, cy), (rx, ry) = frame["centre"], frame["rotated_centre"]
+    c, s = frame["cos"], frame["sin"]
+    return c * (x - rx) + s * (y - ry) + cx, -s * (x - rx) + c * (y - ry) + cy
+
+def _rotate_mask(mask: np.ndarray, frame: Dict) -> np.ndarray:
+    """Obstacle mask on the rotated grid (nearest cell; outside the original domain is open)"""
+    ny_rot, nx_rot = frame["rotated_shape"]
+    y, x = np.mgrid[0:ny_rot, 0:nx_rot].astype(np.float64)
+    return _sample_nearest(np.asarray(mask, dtype=bool), *_from_rotated_coords(frame, x, y), fill=False)
+
+def _rotate_state(state: Dict, frame: Dict, rotated_mask: np.ndarray) -> Dict:
+    """Lattice-unit velocity/density solver state resampled onto the rotated grid"""
+    ny, nx = frame["shape"]
+    if state.get("populations") is not None:
+        f = solver_state_populations(state, (ny, nx))
+        rho = f.sum(axis=0)
+        ux = np.tensordot(_D2Q9_CX.astype(np.float64), f, axes=1) / rho
+        uy = np.tensordot(_D2Q9_CY.astype(np.float64), f, axes=1) / rho
+    else:
+        ux = np.asarray(state["ux"], dtype=np.float64)
+        uy = np.asarray(state["uy"], dtype=np.float64)
+        rho = state.get("rho")
+
+    ny_rot, nx_rot = frame["rotated_shape"]
+    y, x = np.mgrid[0:ny_rot, 0:nx_rot].astype(np.float64)
+    xs, ys = _from_rotated_coords(frame, x, y)
+    u = _sample_nearest(ux, xs, ys)
+    v = _sample_nearest(uy, xs, ys)
+    c, s = frame["cos"], frame["sin"]
+    rotated = dict(state, populations=None,
+                   ux=np.where(rotated_mask, 0.0, c * u - s * v),
+                   uy=np.where(rotated_mask, 0.0, s * u + c * v),
+                   rho=None if rho is None else _sample_nearest(np.asarray(rho, dtype=np.float64), xs, ys))
+    return rotated
+
+def _run_lbm_rotated(obstacle_mask: np.ndarray, weather_data: Dict, sim_params: Dict,
+                     enable_performance_tracking: bool, rho_out: Optional[np.ndarray] = None,
+                     flow_stats: Optional[Dict] = None, tile_stats: Optional[Dict] = None):
+    """
+    Solve on a copy of the domain rotated so the wind blows along the x axis.
+
+    The kernels pin the inflow to the edge of the wind's 90° sector, so an
+    oblique wind enters at up to 45° to that edge and needs wide buffers to
+    settle. Here the mask is rotated (nearest cell) onto the rotated grid,
+    the run uses a single clean inflow edge, and the velocity (bilinear,
+    vectors rotated back) and density are resampled onto the original grid.
+    Obstacle cells get zero velocity. For oblique winds the whole bounding
+    box would hold up to about 2× the original cells, so the lattice is
+    cropped to the rotated obstacles plus a margin sized from their extent
+    (see `_rotation_frame`; sim_params["rotated_padding"] is its minimum,
+    None disables the crop); original cells outside the crop take the
+    value of the nearest lattice edge cell, i.e. the inflow upstream and the
+    zero-gradient outflow continuation elsewhere. Returns the same tuple as
+    `_run_lbm`, in the original frame; running moments are resampled and
+    rotated back the same way (`_rotate_flow_moments`).
+    """
+    frame = _rotation_frame(obstacle_mask.shape, weather_data["wind_direction_deg"],
+                            obstacle_mask, sim_params.get("rotated_padding", _ROTATED_PADDING))
+    mask_rot = _rotate_mask(obstacle_mask, frame)
+    ny_rot, nx_rot = mask_rot.shape
+    print(f"🧭 Rotated domain: {frame['turn_deg']:.1f}° turn, {nx_rot}×{ny_rot} cells "
+          f"(original {obstacle_mask.shape[1]}×{obstacle_mask.shape[0]}, "
+          f"{mask_rot.size / obstacle_mask.size:.2f}× the cells)")
+
+    rotated_params = dict(sim_params, rotate_domain=False)
+    if sim_params.get("initial_state") is not None:
+        rotated_params["initial_state"] = _rotate_state(sim_params["initial_state"], frame, mask_rot)
+    rotated_weather = dict(weather_data, wind_direction_deg=_ROTATED_WIND_DEG)
+    rho_rot = None if rho_out is None else np.empty(mask_rot.shape, dtype=np.float64)
+    stats_rot = None if flow_stats is None else {}
+
+    ux_rot, uy_rot, history, iterations = _run_lbm(
+        mask_rot, rotated_weather, rotated_params, enable_performance_tracking, rho_rot, stats_rot,
+        tile_stats)
+
+    ny, nx = obstacle_mask.shape
+    y, x = np.mgrid[0:ny, 0:nx].astype(np.float64)
+    xr, yr = _to_rotated_coords(frame, x, y)
+    u = _sample_bilinear(np.where(mask_rot, 0.0, ux_rot), xr, yr)
+    v = _sample_bilinear(np.where(mask_rot, 0.0, uy_rot), xr, yr)
+    c, s = frame["cos"], frame["sin"]
+    solid = np.asarray(obstacle_mask, dtype=bool)
+    ux = np.where(solid, 0.0, c * u + s * v)
+    uy = np.where(solid, 0.0, -s * u + c * v)
+    if rho_out is not None:
+        rho_out[:] = _sample_bilinear(rho_rot, xr, yr)
+    if stats_rot:
+        planes = [_sample_bilinear(np.where(mask_rot, 0.0, plane), xr, yr)
+                  for plane in stats_rot["moments"]]
+        moments = _rotate_flow_moments(np.array(planes), c, s)
+        moments[:, solid] = 0.0
+        flow_stats.update(moments=moments, samples=stats_rot["samples"])
+    return ux, uy, history, iterations
+
+def _rotate_flow_moments(moments: np.ndarray, c: float, s: float) -> np.ndarray:
+    """
+    Running moments (`_FLOW_STAT_FIELDS`) of a velocity field u' turned into
+    those of u = (c u'x + s u'y, -s u'x + c u'y): the means rotate like the
+    velocity, the second moments like a symmetric tensor, and |u| is unchanged.
+    """
+    mean_u, mean_v, mean_s, m2_u, m2_v, m2_s, c_uv = moments
+    return np.array([
+        c * mean_u + s * mean_v,
+        -s * mean_u + c * mean_v,
+        mean_s,
+        c * c * m2_u + s * s * m2_v + 2.0 * c * s * c_uv,
+        s * s * m2_u + c * c * m2_v - 2.0 * c * s * c_uv,
+        m2_s,
+        c * s * (m2_v - m2_u) + (c * c - s * s) * c_uv
+    ])
+
+def _convergence_metrics(convergence_history: Optional[np.ndarray]) -> Dict:
+    """Tracked rows of a convergence history as JSON lists, one per `_HISTORY_COLUMNS` entry"""
+    if convergence_history is None:
+        return {}
+    tracked = np.arange(0, len(convergence_history), 10)
+    metrics = {"iteration": tracked.tolist()}
+    for column, name in enumerate(_HISTORY_COLUMNS):
+        metrics[name] = convergence_history[tracked, column].tolist()
+    return metrics
+
+# Layouts of results["vector_field"] selectable through sim_params["vector_field_format"]:
+# a list of per-point records (legacy) or one list per column
+_VECTOR_FIELD_FORMATS = ("records", "columns")
+
+# Result schemas selectable through sim_params["result_schema_version"] and
+# recorded in results["schema_version"] (absent means 2). Version 2 stores a
+# dict per vector, streamline point and particle sample; version 3 stores
+# vector_field as one list per column and streamlines/particles CSR-style:
+# "offsets" (path k is points offsets[k]:offsets[k + 1]) plus one flat list
+# per column. Integer columns (vector x/y, particle age) stay exact, the
+# others are rounded to output_precision
+_RESULT_SCHEMA_VERSIONS = (2, 3)
+_VECTOR_COLUMNS = ("x", "y", "vx", "vy", "magnitude")
+_STREAMLINE_COLUMNS = ("x", "y", "speed")
+_PARTICLE_COLUMNS = ("x", "y", "vx", "vy", "speed", "age")
+
+def _vector_field_columns(ux: np.ndarray, uy: np.ndarray, magnitude: np.ndarray,
+                          solid: np.ndarray, stride: int) -> Dict[str, np.ndarray]:
+    """
+    Fluid cells on every stride-th row and column as columnar arrays
+    x, y (int64 cell indices) and vx, vy, magnitude, in row-major order.
+    """
+    ny, nx = magnitude.shape
+    ys, xs = np.mgrid[0:ny:stride, 0:nx:stride]
+    fluid = ~solid[::stride, ::stride]
+    return {
+        "x": xs[fluid].astype(np.int64),
+        "y": ys[fluid].astype(np.int64),
+        "vx": ux[::stride, ::stride][fluid],
+        "vy": uy[::stride, ::stride][fluid],
+        "magnitude": magnitude[::stride, ::stride][fluid]
+    }
+
+def _path_columns(paths, names: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    """
+    Paths from `_generate_streamlines` / `_generate_particle_paths` (lists of
+    point tuples) as CSR columns: int64 "offsets" and one flat array per name
+    ("age" as int64, the rest float64).
+    """
+    offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum([len(path) for path in paths], out=offsets[1:])
+    points = np.array([point for path in paths for point in path],
+                      dtype=np.float64).reshape(-1, len(names))
+    columns = {"offsets": offsets}
+    for k, name in enumerate(names):
+        columns[name] = points[:, k].astype(np.int64) if name == "age" else points[:, k]
+    return columns
+
+def _json_columns(columns: Dict[str, np.ndarray], precision: int) -> Dict[str, list]:
+    """Columns as JSON lists: integer columns as they are, float columns rounded to precision"""
+    return {name: column.tolist() if column.dtype.kind in "iu" else column.round(precision).tolist()
+            for name, column in columns.items()}
+
+def _column_records(columns: Dict[str, list], names: Tuple[str, ...]) -> List[Dict]:
+    """Per-point records ({name: value}) from JSON columns"""
+    return [dict(zip(names, point)) for point in zip(*(columns[name] for name in names))]
+
+def _path_records(columns: Dict[str, list], names: Tuple[str, ...]) -> List[List[Dict]]:
+    """Schema-2 paths (a list of point records per path) from CSR JSON columns"""
+    records = _column_records(columns, names)
+    offsets = columns["offsets"]
+    return [records[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+def _records_to_columns(records, names: Tuple[str, ...]) -> Dict[str, list]:
+    """JSON columns from per-point records (a columns dict is returned as it is)"""
+    if isinstance(records, dict):
+        return records
+    return {name: [point[name] for point in records] for name in names}
+
+def _paths_to_csr(paths: List[List[Dict]], names: Tuple[str, ...]) -> Dict[str, list]:
+    """CSR JSON columns from schema-2 paths"""
+    offsets = [0]
+    for path in paths:
+        offsets.append(offsets[-1] + len(path))
+    return dict(offsets=offsets, **_records_to_columns(
+        [point for path in paths for point in path], names))
+
+def _vector_field_records(columns: Dict[str, np.ndarray], precision: int) -> List[Dict]:
+    """Legacy `vector_field` JSON records ({"x", "y", "vx", "vy", "magnitude"} per point) from columns"""
+    return _column_records(_json_columns(columns, precision), _VECTOR_COLUMNS)
+
+def _vector_count(vector_field) -> int:
+    """Number of points in a `vector_field` result, in either `_VECTOR_FIELD_FORMATS` layout"""
+    return len(vector_field["x"]) if isinstance(vector_field, dict) else len(vector_field)
+
+def _path_count(paths) -> int:
+    """Number of paths in a streamlines/particles result, in either result schema"""
+    return len(paths["offsets"]) - 1 if isinstance(paths, dict) else len(paths)
+
+def _batched(items, size: int) -> Iterator[list]:
+    """Lists of up to size consecutive items"""
+    items = iter(items)
+    return iter(lambda: list(itertools.islice(items, size)), [])
+
+def _json_column_items(column: np.ndarray, precision: int) -> Iterator:
+    """A column's `_json_columns` list, element by element (computed 4096 at a time)"""
+    for start in range(0, len(column), 4096):
+        chunk = column[start:start + 4096]
+        yield from (chunk if chunk.dtype.kind in "iu" else chunk.round(precision)).tolist()
+
+def _streamed_vector_field(columns: Dict[str, np.ndarray], precision: int, columnar: bool):
+    """
+    `vector_field` for `write_results_json`: a dict of column iterators, or
+    an iterator of the legacy records built 4096 points at a time.
+    """
+    if columnar:
+        return {name: _json_column_items(column, precision) for name, column in columns.items()}
+    return (record for start in range(0, len(columns["x"]), 4096)
+            for record in _vector_field_records(
+                {name: column[start:start + 4096] for name, column in columns.items()}, precision))
+
+def _streamed_paths(paths, names: Tuple[str, ...], precision: int, schema_version: int, counts: Dict, key: str):
+    """
+    streamlines/particles for `write_results_json` from a path iterator,
+    counting the paths into counts[key]. Schema 2 paths are converted 256
+    at a time as they are generated. Schema 3 has to write all offsets
+    before the points, so the CSR columns are spooled 256 paths at a time
+    to anonymous temporary files and streamed back from memory maps; memory
+    stays bounded, but the paths take their binary size in temporary disk
+    space until the results are written.
+    """
+    counts[key] = 0
 
-# ──────────────────────────────────────────────────────────────────────────
-# ENHANCED PARTICLE SYSTEM
-# ──────────────────────────────────────────────────────────────────────────
+    def batches():
+        for batch in _batched(paths, 256):
+            counts[key] += len(batch)
+            yield _path_columns(batch, names)
 
-@njit(fastmath=True, cache=True)
-def _generate_particle_paths(ux, uy, nx, ny, num_particles=1000, max_steps=200,
-                            dt=0.1, min_speed=0.05):
+    if schema_version == 2:
+        return (path for columns in batches()
+                for path in _path_records(_json_columns(columns, precision), names))
+    dtypes = {name: column.dtype for name, column in _path_columns([], names).items()}
+    spools = {name: tempfile.TemporaryFile() for name in dtypes}
+    spools["offsets"].write(np.zeros(1, dtype=np.int64).tobytes())
+    end = 0
+    for part in batches():
+        spools["offsets"].write((part["offsets"][1:] + end).tobytes())
+        end += int(part["offsets"][-1])
+        for name in names:
+            spools[name].write(part[name].tobytes())
+
+    columns = {}
+    for name, spool in spools.items():
+        spool.flush()
+        size = spool.tell() // dtypes[name].itemsize
+        columns[name] = (np.memmap(spool, dtype=dtypes[name], mode="r", shape=(size,)) if size
+                         else np.zeros(0, dtype=dtypes[name]))
+        spool.close()
+    return {name: _json_column_items(column, precision) for name, column in columns.items()}
+
+def convert_results_schema(results: Dict, schema_version: int = 3) -> Dict:
     """
-    Generate particle trajectories for visualization
+    A `run_wind_simulation` result in another result schema (see
+    `_RESULT_SCHEMA_VERSIONS`), e.g. a stored version-2 JSON converted to
+    the columnar version 3. Values are carried over exactly, so converting
+    back gives the original; keys other than vector_field, streamlines and
+    particles are shared with the input, not copied. A version-2 vector
+    field already in the "columns" layout (sim_params["vector_field_format"])
+    is marked with results["vector_field_format"] in version 3, and
+    converting back restores that layout instead of per-point records.
     """
-    particles = []
-    
-    for particle_idx in range(num_particles):
-        # Random starting position
-        start_x = np.random.random() * (nx - 1)
-        start_y = np.random.random() * (ny - 1)
-        
-        path = []
-        x, y = start_x, start_y
-        age = 0
-        
-        for step in range(max_steps):
-            # Check bounds
-            if x < 1 or x >= nx-1 or y < 1 or y >= ny-1:
-                break
-            
-            # Bilinear interpolation for velocity (same as streamlines)
-            i, j = int(x), int(y)
-            fx, fy = x - i, y - j
-            
-            u00 = ux[j, i]; u10 = ux[j, i+1]; u01 = ux[j+1, i]; u11 = ux[j+1, i+1]
-            v00 = uy[j, i]; v10 = uy[j, i+1]; v01 = uy[j+1, i]; v11 = uy[j+1, i+1]
-            
-            u_interp = u00*(1-fx)*(1-fy) + u10*fx*(1-fy) + u01*(1-fx)*fy + u11*fx*fy
-            v_interp = v00*(1-fx)*(1-fy) + v10*fx*(1-fy) + v01*(1-fx)*fy + v11*fx*fy
-            
-            speed = np.sqrt(u_interp*u_interp + v_interp*v_interp)
-            
-            if speed < min_speed:
-                break
-            
-            # Add random diffusion for more realistic particle motion
-            diffusion = 0.1
-            u_interp += np.random.normal(0, diffusion)
-            v_interp += np.random.normal(0, diffusion)
-            
-            # Store particle state
-            path.append((x, y, u_interp, v_interp, speed, age))
-            
-            # Update position
-            x += u_interp * dt
-            y += v_interp * dt
-            age += 1
-        
-        if len(path) > 3:
-            particles.append(path)
-    
-    return particles
+    if schema_version not in _RESULT_SCHEMA_VERSIONS:
+        raise ValueError(f"Unknown result schema_version {schema_version}, "
+                         f"expected one of {list(_RESULT_SCHEMA_VERSIONS)}")
+    converted = dict(results, schema_version=schema_version)
+    if results.get("schema_version", 2) == schema_version:
+        return converted
 
-# ──────────────────────────────────────────────────────────────────────────
-# ENHANCED PUBLIC API
-# ──────────────────────────────────────────────────────────────────────────
+    blocks = (("streamlines", _STREAMLINE_COLUMNS), ("particles", _PARTICLE_COLUMNS))
+    if schema_version == 3:
+        if isinstance(results.get("vector_field"), dict):
+            converted["vector_field_format"] = "columns"
+        converted["vector_field"] = _records_to_columns(results.get("vector_field", []), _VECTOR_COLUMNS)
+        for key, names in blocks:
+            converted[key] = _paths_to_csr(results.get(key, []), names)
+    else:
+        if converted.pop("vector_field_format", "records") != "columns":
+            converted["vector_field"] = _column_records(results["vector_field"], _VECTOR_COLUMNS)
+        for key, names in blocks:
+            converted[key] = _path_records(results[key], names)
+    return converted
+
+def _time_averaged_fields(flow_stats: Dict, ux: np.ndarray, uy: np.ndarray, solid: np.ndarray,
+                          window: int, buffer_size: int, precision: int) -> Dict:
+    """
+    Time-averaged results block from a run's running moments: mean velocity
+    components, mean speed, speed standard deviation and the turbulence
+    intensity sqrt((var ux + var uy) / 2) / |mean u| (0 in obstacles and where
+    the mean velocity vanishes), as JSON grids plus core-area statistics.
+    Without samples it falls back to the final field with zero variance.
+    """
+    samples = int(flow_stats.get("samples", 0))
+    if samples > 0:
+        moments = flow_stats["moments"]
+        mean_ux, mean_uy, mean_speed = moments[:3]
+        var_ux, var_uy, var_speed = np.maximum(moments[3:6] / samples, 0.0)
+    else:
+        mean_ux, mean_uy = ux, uy
+        mean_speed = np.sqrt(ux**2 + uy**2)
+        var_ux = var_uy = var_speed = np.zeros_like(ux)
+
+    mean_velocity = np.sqrt(mean_ux**2 + mean_uy**2)
+    fluctuation = np.sqrt((var_ux + var_uy) / 2.0)
+    intensity = np.divide(fluctuation, mean_velocity, out=np.zeros_like(fluctuation),
+                          where=(mean_velocity > 1e-12) & ~solid)
+    std_speed = np.where(solid, 0.0, np.sqrt(var_speed))
+
+    core = (slice(buffer_size, -buffer_size),) * 2 if buffer_size > 0 else (slice(None),) * 2
+    core_fluid = ~solid[core]
+    core_speed = mean_speed[core][core_fluid]
+    core_intensity = intensity[core][core_fluid]
+    statistics = {
+        "mean_magnitude": float(np.mean(core_speed)) if core_speed.size else 0.0,
+        "max_magnitude": float(np.max(core_speed)) if core_speed.size else 0.0,
+        "mean_turbulence_intensity": float(np.mean(core_intensity)) if core_intensity.size else 0.0,
+        "percentile_95_turbulence_intensity":
+            float(np.percentile(core_intensity, 95)) if core_intensity.size else 0.0
+    }
+    return {
+        "window": int(window),
+        "samples": samples,
+        "mean_ux_grid": mean_ux.round(precision).tolist(),
+        "mean_uy_grid": mean_uy.round(precision).tolist(),
+        "mean_magnitude_grid": mean_speed.round(precision).tolist(),
+        "std_magnitude_grid": std_speed.round(precision).tolist(),
+        "turbulence_intensity_grid": intensity.round(precision).tolist(),
+        "statistics": statistics
+    }
+
+def _tile_pyramid_module():
+    """tile_pyramid.py next to this file, imported within the colab package or on its own"""
+    try:
+        from . import tile_pyramid
+    except ImportError:
+        import tile_pyramid
+    return tile_pyramid
 
 def run_wind_simulation(obstacle_mask: np.ndarray, 
                                 grid_info: Dict, 
@@ -303,37 +3455,84 @@ def run_wind_simulation(obstacle_mask: np.ndarray,
     Enhanced wind simulation with improved performance and additional features
     
     Args:
-        obstacle_mask: Boolean array where True = obstacle
+        obstacle_mask: Boolean array where True = obstacle, or a packed mask
+            (see `pack_obstacle_mask` / `load_obstacle_mask`)
         grid_info: Grid information dictionary
         weather_data: Weather conditions
-        sim_params: Simulation parameters
+        sim_params: Simulation parameters; unless sim_params["autotune"] is
+            False the run applies this host's stored `autotune_kernels` entry
+            for the grid, kernel and precision, read from
+            sim_params["autotune_file"] (default `_AUTOTUNE_FILE`); hosts that
+            never ran the autotuner have no file and keep numba's settings
         
     Returns:
         Enhanced results dictionary with streamlines, particles, and performance data
     """
     
     print(f"🌬️  Starting enhanced wind simulation...")
-    print(f"    Grid size: {obstacle_mask.shape}")
+    ny, nx = _mask_shape(obstacle_mask)
+    print(f"    Grid size: {(ny, nx)}")
     print(f"    Wind: {weather_data['wind_speed_ms']} m/s @ {weather_data['wind_direction_deg']}°")
-    
-    ny, nx = obstacle_mask.shape
+
     t_start = time.time()
     
     # Enhanced simulation parameters
     enable_performance_tracking = sim_params.get("enable_performance_tracking", False)
     generate_streamlines = sim_params.get("generate_streamlines", True)
     generate_particles = sim_params.get("generate_particles", True)
+    vector_format = sim_params.get("vector_field_format", "records")
+    if vector_format not in _VECTOR_FIELD_FORMATS:
+        raise ValueError(f"Unknown vector_field_format '{vector_format}', "
+                         f"expected one of {list(_VECTOR_FIELD_FORMATS)}")
+    schema_version = int(sim_params.get("result_schema_version", 2))
+    if schema_version not in _RESULT_SCHEMA_VERSIONS:
+        raise ValueError(f"Unknown result_schema_version {schema_version}, "
+                         f"expected one of {list(_RESULT_SCHEMA_VERSIONS)}")
+    bundle_encoding = sim_params.get("bundle_encoding", "uint16")
+    if sim_params.get("bundle_path") and bundle_encoding not in _BUNDLE_ENCODINGS:
+        raise ValueError(f"Unknown bundle_encoding '{bundle_encoding}', "
+                         f"expected one of {list(_BUNDLE_ENCODINGS)}")
+    results_path = sim_params.get("results_path")
+    tile_pyramid = _tile_pyramid_module() if sim_params.get("tile_pyramid_dir") else None
+    tile_bounds = tile_pyramid.grid_bounds(grid_info) if tile_pyramid is not None else None
+    if sim_params.get("tile_pyramid_dir") and tile_bounds is None:
+        raise ValueError("tile_pyramid_dir needs EPSG:2180 grid_info['bounds'] "
+                         "(or grid_info['grid_properties']['bounds'])")
     
-    # Run enhanced LBM simulation
-    ux, uy, convergence_history = _lbm_enhanced(
-        obstacle_mask,
-        weather_data["wind_speed_ms"],
-        weather_data["wind_direction_deg"],
-        nx, ny,
-        sim_params["max_iterations"],
-        sim_params["relaxation_rate"],
-        enable_performance_tracking
-    )
+    # Run enhanced LBM simulation (kernel chosen by sim_params)
+    rho = np.empty((ny, nx), dtype=np.float64) if sim_params.get("return_solver_state", False) else None
+    flow_stats = {}
+    tile_stats = {}
+    autotuned, restore_threads = _apply_autotuned_config((ny, nx), sim_params)
+    try:
+        ux, uy, convergence_history, iterations_used = _run_lbm(
+            obstacle_mask, weather_data, sim_params, enable_performance_tracking, rho, flow_stats,
+            tile_stats)
+
+        # Accuracy guardrail: a float32 run that went non-finite is repeated in float64
+        if sim_params.get("precision", "float64") == "float32" and not (
+                np.all(np.isfinite(ux)) and np.all(np.isfinite(uy))):
+            print("⚠️  float32 run produced non-finite velocities, repeating in float64")
+            sim_params = dict(sim_params, precision="float64", resume_from_checkpoint=False)
+            flow_stats = {}
+            tile_stats = {}
+            ux, uy, convergence_history, iterations_used = _run_lbm(
+                obstacle_mask, weather_data, sim_params, enable_performance_tracking, rho, flow_stats,
+                tile_stats)
+    finally:
+        restore_threads()
+
+    # Lattice cells per iteration of the (cropped) rotated frame
+    rotated_cells = None
+    if sim_params.get("rotate_domain", False):
+        rotated_cells = int(np.prod(_rotation_frame(
+            (ny, nx), weather_data["wind_direction_deg"],
+            _dense_mask(obstacle_mask, nx),
+            sim_params.get("rotated_padding", _ROTATED_PADDING))["rotated_shape"]))
+    if iterations_used < sim_params["max_iterations"]:
+        print(f"🎯 Converged after {iterations_used} of {sim_params['max_iterations']} iterations")
+    if convergence_history is not None:
+        convergence_history = convergence_history[:iterations_used]
     
     simulation_time = time.time() - t_start
     print(f"✅ LBM simulation completed in {simulation_time:.2f}s")
@@ -377,75 +3576,83 @@ def run_wind_simulation(obstacle_mask: np.ndarray,
     stride = sim_params.get("vector_stride", 5)
     precision = sim_params.get("output_precision", 4)
     
-    vectors = []
-    for y in range(0, ny, stride):
-        for x in range(0, nx, stride):
-            if not obstacle_mask[y, x]:
-                vectors.append({
-                    "x": int(x),
-                    "y": int(y), 
-                    "vx": round(float(ux[y, x]), precision),
-                    "vy": round(float(uy[y, x]), precision),
-                    "magnitude": round(float(magnitude[y, x]), precision)
-                })
-    
-    print(f"🎯 Generated {len(vectors)} vector field points")
-    
-    # Generate streamlines if requested
-    streamlines_data = []
-    if generate_streamlines:
+    solid = _dense_mask(obstacle_mask, nx)
+    vector_columns = _vector_field_columns(ux, uy, magnitude, solid, stride)
+    if results_path:
+        vectors = _streamed_vector_field(vector_columns, precision,
+                                         schema_version == 3 or vector_format == "columns")
+    elif schema_version == 3 or vector_format == "columns":
+        vectors = _json_columns(vector_columns, precision)
+    else:
+        vectors = _vector_field_records(vector_columns, precision)
+    
+    print(f"🎯 Generated {len(vector_columns['x'])} vector field points")
+
+    # Time-averaged fields over the last averaging_window iterations
+    averaging_window = int(sim_params.get("averaging_window", 0))
+    time_averaged = None
+    if averaging_window > 0:
+        time_averaged = _time_averaged_fields(flow_stats, ux, uy, solid, averaging_window,
+                                              buffer_size, precision)
+        print(f"⏱️  Time-averaged over {time_averaged['samples']} iterations, mean turbulence "
+              f"intensity {time_averaged['statistics']['mean_turbulence_intensity']:.3f}")
+    
+    # Generate streamlines if requested (as they are written when streaming
+    # the JSON results)
+    streamlines = []
+    if generate_streamlines and results_path:
+        streamlines = _iter_streamlines(
+            ux, uy, nx, ny,
+            num_streamlines=int(sim_params.get("streamline_count", 200)),
+            max_points=int(sim_params.get("streamline_max_points", 100))
+        )
+    elif generate_streamlines:
         t_streamlines = time.time()
         streamlines = _generate_streamlines(
             ux, uy, nx, ny,
-            num_streamlines=sim_params.get("streamline_count", 200),
-            max_points=sim_params.get("streamline_max_points", 100)
+            num_streamlines=int(sim_params.get("streamline_count", 200)),
+            max_points=int(sim_params.get("streamline_max_points", 100))
         )
-        
-        # Convert to serializable format
-        for streamline in streamlines:
-            streamline_points = []
-            for point in streamline:
-                streamline_points.append({
-                    "x": round(point[0], precision),
-                    "y": round(point[1], precision),
-                    "speed": round(point[2], precision)
-                })
-            streamlines_data.append(streamline_points)
-        
         streamlines_time = time.time() - t_streamlines
-        print(f"🌊 Generated {len(streamlines_data)} streamlines in {streamlines_time:.2f}s")
+        print(f"🌊 Generated {len(streamlines)} streamlines in {streamlines_time:.2f}s")
     
     # Generate particle paths if requested
-    particles_data = []
-    if generate_particles:
+    particles = []
+    if generate_particles and results_path:
+        particles = _iter_particle_paths(
+            ux, uy, nx, ny,
+            num_particles=int(sim_params.get("particle_count", 1000)),
+            max_steps=int(sim_params.get("particle_max_steps", 200))
+        )
+    elif generate_particles:
         t_particles = time.time()
         particles = _generate_particle_paths(
             ux, uy, nx, ny,
-            num_particles=sim_params.get("particle_count", 1000),
-            max_steps=sim_params.get("particle_max_steps", 200)
+            num_particles=int(sim_params.get("particle_count", 1000)),
+            max_steps=int(sim_params.get("particle_max_steps", 200))
         )
-        
-        # Convert to serializable format
-        for particle_path in particles:
-            path_points = []
-            for point in particle_path:
-                path_points.append({
-                    "x": round(point[0], precision),
-                    "y": round(point[1], precision),
-                    "vx": round(point[2], precision),
-                    "vy": round(point[3], precision),
-                    "speed": round(point[4], precision),
-                    "age": int(point[5])
-                })
-            particles_data.append(path_points)
-        
         particles_time = time.time() - t_particles
-        print(f"🔴 Generated {len(particles_data)} particle paths in {particles_time:.2f}s")
+        print(f"🔴 Generated {len(particles)} particle paths in {particles_time:.2f}s")
+
+    # Convert to serializable format: CSR columns, or a record per point
+    path_counts = {}
+    if results_path:
+        streamlines_data = _streamed_paths(streamlines, _STREAMLINE_COLUMNS, precision, schema_version,
+                                           path_counts, "streamlines")
+        particles_data = _streamed_paths(particles, _PARTICLE_COLUMNS, precision, schema_version,
+                                         path_counts, "particles")
+    else:
+        streamlines_data = _json_columns(_path_columns(streamlines, _STREAMLINE_COLUMNS), precision)
+        particles_data = _json_columns(_path_columns(particles, _PARTICLE_COLUMNS), precision)
+    if schema_version == 2 and not results_path:
+        streamlines_data = _path_records(streamlines_data, _STREAMLINE_COLUMNS)
+        particles_data = _path_records(particles_data, _PARTICLE_COLUMNS)
     
     total_time = time.time() - t_start
     
     # Build enhanced results
     results = {
+        "schema_version": schema_version,
         "metadata": {
             "version": "2.3.1",
             "enhanced_features": True,
@@ -457,28 +3664,183 @@ def run_wind_simulation(obstacle_mask: np.ndarray,
             "total_time": round(total_time, 2),
             "simulation_time": round(simulation_time, 2),
             "post_processing_time": round(total_time - simulation_time, 2),
-            "iterations_per_second": round(sim_params["max_iterations"] / simulation_time, 1),
-            "grid_cells_per_second": round((nx * ny * sim_params["max_iterations"]) / simulation_time, 0)
+            "iterations": iterations_used,
+            "iterations_per_second": round(iterations_used / simulation_time, 1),
+            "grid_cells_per_second": round((nx * ny * iterations_used) / simulation_time, 0),
+            "mlups": round((nx * ny * iterations_used) / simulation_time / 1e6, 2),
+            "population_layout": sim_params.get("population_layout", "aos"),
+            "lbm_kernel": sim_params.get("lbm_kernel", "split"),
+            "precision": sim_params.get("precision", "float64"),
+            "skip_solid_cells": bool(sim_params.get("skip_solid_cells", False)),
+            "bounce_back": sim_params.get("bounce_back", "fullway"),
+            "warm_start": sim_params.get("initial_state") is not None,
+            "multigrid_levels": sim_params.get("multigrid_levels", 1),
+            "processes": sim_params.get("processes", 1),
+            "rotate_domain": bool(sim_params.get("rotate_domain", False)),
+            "checkpoint_dir": sim_params.get("checkpoint_dir"),
+            "packed_mask": _is_packed_mask(obstacle_mask) or bool(sim_params.get("packed_mask", False)),
+            "lattice_velocity": sim_params.get("lattice_velocity", _LATTICE_VELOCITY),
+            "averaging_window": averaging_window,
+            "averaging_samples": time_averaged["samples"] if time_averaged is not None else 0,
+            "autotuned": None if autotuned is None else {
+                key: autotuned[key] for key in ("threading_layer", "threads", "chunk_size")}
         },
         "flow_statistics": stats,
         "vector_field": vectors,
-        "magnitude_grid": magnitude.round(precision).tolist(),
+        "magnitude_grid": ((row.round(precision) for row in magnitude) if results_path
+                           else magnitude.round(precision).tolist()),
         
         # Enhanced features
-        "streamlines": streamlines_data if generate_streamlines else [],
-        "particles": particles_data if generate_particles else [],
+        "streamlines": streamlines_data,
+        "particles": particles_data,
         
-        # Optional performance tracking
-        "convergence_history": convergence_history.tolist() if convergence_history is not None else []
+        # Optional performance tracking: mean |u|^2 per iteration (0 between
+        # tracked iterations) and all metrics of the tracked iterations
+        "convergence_history": convergence_history[:, 0].tolist() if convergence_history is not None else [],
+        "convergence_metrics": _convergence_metrics(convergence_history)
     }
+
+    if time_averaged is not None:
+        results["time_averaged"] = time_averaged
+    if rotated_cells is not None:
+        results["performance"].update(rotated_cells=rotated_cells,
+                                      rotated_cell_ratio=round(rotated_cells / (nx * ny), 3))
+    if tile_stats.get("tile_updates"):
+        results["performance"]["skipped_tile_fraction"] = round(
+            tile_stats["skipped_tile_updates"] / tile_stats["tile_updates"], 4)
+
+    # Optional binary bundle of the grids next to the JSON result
+    if sim_params.get("bundle_path"):
+        bundle_bytes = save_result_bundle(
+            sim_params["bundle_path"],
+            {"ux": ux, "uy": uy, "magnitude": magnitude, "mask": solid},
+            {"schema_version": schema_version, "metadata": results["metadata"],
+             "performance": results["performance"], "flow_statistics": stats,
+             "grid_info": grid_info, "weather": weather_data},
+            bundle_encoding)
+        results["bundle"] = {"path": sim_params["bundle_path"], "bytes": bundle_bytes,
+                             "encoding": bundle_encoding}
+        print(f"💾 Wrote {bundle_encoding} result bundle {sim_params['bundle_path']} "
+              f"({bundle_bytes / 1e6:.2f} MB)")
+
+    # Optional XYZ tile pyramid for the web map
+    if tile_bounds is not None:
+        zooms = sim_params.get("tile_pyramid_zooms")
+        results["tiles"] = tile_pyramid.generate_tile_pyramid(
+            ux, uy, tile_bounds, sim_params["tile_pyramid_dir"], mask=solid,
+            zoom_range=None if zooms is None else tuple(zooms),
+            processes=sim_params.get("tile_pyramid_processes"))
+        results["tiles"]["path"] = sim_params["tile_pyramid_dir"]
+
+    # Optional JSON file of the results, streamed: the vector field, grid and
+    # paths are produced as they are written and are left out of the
+    # returned dict, which records their counts under "output" instead
+    if results_path:
+        t_write = time.time()
+        characters = write_results_json(results_path, results)
+        for key in ("vector_field", "magnitude_grid", "streamlines", "particles"):
+            del results[key]
+        results["output"] = {"path": results_path, "characters": characters,
+                             "vector_points": len(vector_columns["x"]), **path_counts}
+        print(f"📝 Streamed {characters / 1e6:.1f} MB of JSON results to {results_path} "
+              f"in {time.time() - t_write:.2f}s")
+
+    # Solver state for warm-starting the next run (numpy arrays, not JSON)
+    if sim_params.get("return_solver_state", False):
+        results["solver_state"] = _solver_state_from_velocity(
+            ux, uy, weather_data, iterations_used, rho,
+            sim_params.get("lattice_velocity", _LATTICE_VELOCITY))
     
     print(f"🎉 Enhanced simulation completed successfully!")
     print(f"    Total time: {total_time:.2f}s")
     print(f"    Performance: {results['performance']['iterations_per_second']:.1f} iter/s")
     print(f"    Grid cells/s: {results['performance']['grid_cells_per_second']:,.0f}")
+    print(f"    MLUPS: {results['performance']['mlups']:.2f} ({results['performance']['population_layout']} layout)")
     
     return results
 
+def run_wind_ensemble(obstacle_mask: np.ndarray,
+                      grid_info: Dict,
+                      weather_data: Dict,
+                      sim_params: Dict) -> Dict:
+    """
+    Wind-rose run: one simulation per wind direction on the same mask.
+
+    Args:
+        obstacle_mask: Boolean array where True = obstacle, or a packed mask
+            (see `pack_obstacle_mask`)
+        grid_info: Grid information dictionary
+        weather_data: "wind_directions_deg" (sequence) and "wind_speed_ms"
+            (one speed for all directions or one per direction)
+        sim_params: Simulation parameters; the ensemble always uses the fused
+            kernel and honours precision, max_iterations, relaxation_rate,
+            convergence_tolerance/check_interval, buffer_size and
+            "ensemble_batch_size" (directions per kernel call, default all)
+
+    Returns:
+        Dictionary with stacked "ux", "uy", "magnitude" arrays of shape
+        (n_dirs, ny, nx), per-direction flow statistics and performance data
+    """
+
+    directions = [float(deg) for deg in weather_data["wind_directions_deg"]]
+    speeds = np.broadcast_to(np.asarray(weather_data["wind_speed_ms"], dtype=np.float64),
+                             (len(directions),))
+    ny, nx = _mask_shape(obstacle_mask)
+    print(f"🌹 Starting wind ensemble: {len(directions)} directions on grid {(ny, nx)}")
+    mask = _kernel_mask(obstacle_mask, sim_params.get("packed_mask", False))
+    precision = sim_params.get("precision", "float64")
+    if precision not in _LBM_PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', "
+                         f"expected one of {sorted(_LBM_PRECISIONS)}")
+    batch_size = sim_params.get("ensemble_batch_size") or len(directions)
+
+    t_start = time.time()
+    ux = np.empty((len(directions), ny, nx), dtype=np.float64)
+    uy = np.empty((len(directions), ny, nx), dtype=np.float64)
+    iterations = []
+    for b0 in range(0, len(directions), batch_size):
+        b1 = min(b0 + batch_size, len(directions))
+        ux[b0:b1], uy[b0:b1], _, batch_iterations = _lbm_ensemble(
+            mask, speeds[b0:b1], directions[b0:b1], nx, ny,
+            int(sim_params["max_iterations"]), float(sim_params["relaxation_rate"]), False,
+            float(sim_params.get("convergence_tolerance", 0.0)),
+            int(sim_params.get("check_interval", 100)),
+            dtype=_LBM_PRECISIONS[precision],
+            lattice_velocity=float(sim_params.get("lattice_velocity", _LATTICE_VELOCITY)))
+        iterations.append(batch_iterations)
+    simulation_time = time.time() - t_start
+    print(f"✅ Ensemble simulation completed in {simulation_time:.2f}s")
+
+    magnitude = np.sqrt(ux**2 + uy**2)
+    buffer_size = sim_params.get("buffer_size", 0)
+    core = magnitude[:, buffer_size:ny - buffer_size, buffer_size:nx - buffer_size]
+    stats = [{
+        "wind_direction_deg": deg,
+        "wind_speed_ms": float(speed),
+        "min_magnitude": float(np.min(member)),
+        "max_magnitude": float(np.max(member)),
+        "mean_magnitude": float(np.mean(member)),
+        "percentile_95": float(np.percentile(member, 95))
+    } for deg, speed, member in zip(directions, speeds, core)]
+
+    cell_updates = sum(nx * ny * it * (min(b0 + batch_size, len(directions)) - b0)
+                       for b0, it in zip(range(0, len(directions), batch_size), iterations))
+    return {
+        "wind_directions_deg": directions,
+        "ux": ux,
+        "uy": uy,
+        "magnitude": magnitude,
+        "flow_statistics": stats,
+        "performance": {
+            "simulation_time": round(simulation_time, 2),
+            "iterations": iterations,
+            "mlups": round(cell_updates / simulation_time / 1e6, 2),
+            "precision": precision,
+            "ensemble_batch_size": batch_size,
+            "packed_mask": bool(mask.dtype == np.uint64)
+        }
+    }
+
 # ──────────────────────────────────────────────────────────────────────────
 # UTILITY FUNCTIONS
 # ──────────────────────────────────────────────────────────────────────────
@@ -489,6 +3851,39 @@ def validate_simulation_params(sim_params: Dict) -> Dict:
     defaults = {
         "max_iterations": 4000,
         "relaxation_rate": 1.4,
+        "lattice_velocity": _LATTICE_VELOCITY,
+        "population_layout": "aos",
+        "lbm_kernel": "split",
+        "precision": "float64",
+        "skip_solid_cells": False,
+        "bounce_back": "fullway",
+        "convergence_tolerance": 0.0,
+        "check_interval": 100,
+        "initial_state": None,
+        "return_solver_state": False,
+        "multigrid_levels": 1,
+        "processes": 1,
+        "threads_per_process": None,
+        "rotate_domain": False,
+        "rotated_padding": _ROTATED_PADDING,
+        "checkpoint_dir": None,
+        "checkpoint_interval": 500,
+        "resume_from_checkpoint": False,
+        "packed_mask": False,
+        "frozen_tile_size": 0,
+        "frozen_tile_tolerance": 1e-4,
+        "frozen_tile_interval": 8,
+        "averaging_window": 0,
+        "vector_field_format": "records",
+        "result_schema_version": 2,
+        "bundle_path": None,
+        "bundle_encoding": "uint16",
+        "tile_pyramid_dir": None,
+        "tile_pyramid_zooms": None,
+        "tile_pyramid_processes": None,
+        "results_path": None,
+        "autotune": True,
+        "autotune_file": None,
         "height_threshold": 2.5,
         "vector_stride": 5,
         "output_precision": 4,
@@ -509,17 +3904,161 @@ def validate_simulation_params(sim_params: Dict) -> Dict:
     # Validate ranges
     validated["max_iterations"] = max(100, min(10000, validated["max_iterations"]))
     validated["relaxation_rate"] = max(0.5, min(2.0, validated["relaxation_rate"]))
+    validated["lattice_velocity"] = max(_LATTICE_VELOCITY_RANGE[0],
+                                        min(_LATTICE_VELOCITY_RANGE[1], validated["lattice_velocity"]))
+    validated["convergence_tolerance"] = max(0.0, validated["convergence_tolerance"])
+    validated["check_interval"] = max(1, min(validated["max_iterations"], validated["check_interval"]))
+    validated["multigrid_levels"] = max(1, min(4, int(validated["multigrid_levels"])))
+    validated["processes"] = max(1, int(validated["processes"]))
+    validated["frozen_tile_size"] = max(0, int(validated["frozen_tile_size"]))
+    validated["frozen_tile_interval"] = max(1, int(validated["frozen_tile_interval"]))
+    if validated["rotated_padding"] is not None:
+        validated["rotated_padding"] = max(1, int(validated["rotated_padding"]))
+    validated["averaging_window"] = max(0, min(validated["max_iterations"],
+                                               int(validated["averaging_window"])))
     validated["streamline_count"] = max(10, min(1000, validated["streamline_count"]))
     validated["particle_count"] = max(100, min(10000, validated["particle_count"]))
     
     return validated
 
+def _flow_length_cells(grid_shape: Tuple[int, int], wind_deg: float) -> float:
+    """Extent of the grid along the wind direction, in cells"""
+    ny, nx = grid_shape
+    rad = np.deg2rad(wind_deg)
+    return round(float(nx * abs(np.sin(rad)) + ny * abs(np.cos(rad))), 6)
+
+def _measure_mlups(sim_params: Dict, grid_shape: Tuple[int, int], iterations: int = 20,
+                   max_side: Optional[int] = 256) -> float:
+    """Throughput of the configured kernel on a synthetic mask (at most max_side cells a side)"""
+    shape = tuple(grid_shape) if max_side is None else \
+        (min(grid_shape[0], max_side), min(grid_shape[1], max_side))
+    mask = _synthetic_block_mask(shape)
+    params = dict(validate_simulation_params(sim_params), convergence_tolerance=0.0,
+                  initial_state=None, checkpoint_dir=None, multigrid_levels=1,
+                  rotate_domain=False)
+    weather = {"wind_speed_ms": 5.0, "wind_direction_deg": 270.0}
+    _run_lbm(mask, weather, dict(params, max_iterations=2), False)
+
+    t0 = time.time()
+    _run_lbm(mask, weather, dict(params, max_iterations=iterations), False)
+    return shape[0] * shape[1] * iterations / (time.time() - t0) / 1e6
+
+def plan_simulation_params(wind_speed_ms: float,
+                           pixel_size_m: float,
+                           grid_shape: Tuple[int, int],
+                           target_reynolds: float,
+                           wind_direction_deg: float = 270.0,
+                           flow_throughs: float = 2.0,
+                           reynolds_length_m: Optional[float] = None,
+                           max_lattice_velocity: float = _LATTICE_VELOCITY,
+                           omega_range: Tuple[float, float] = (0.5, 1.9),
+                           sim_params: Optional[Dict] = None,
+                           mlups: Optional[float] = None) -> Dict:
+    """
+    Choose lattice velocity, relaxation rate and iteration count for a run.
+
+    The Reynolds number is target_reynolds over reynolds_length_m (default
+    the domain extent along the wind). Iterations scale with 1/u, so the
+    lattice velocity is the largest allowed (max_lattice_velocity, which
+    bounds the Mach number) whose viscosity u·L/Re gives ω = 1/(3ν + ½)
+    inside omega_range. Below the range (very viscous) u is lowered; above
+    it (BGK unstable) ω is capped and the reachable Reynolds number is
+    reported. u stays within `_LATTICE_VELOCITY_RANGE`, the bounds
+    `validate_simulation_params` enforces; a target Re that needs a slower
+    flow is raised to the lowest reachable one, with a warning.
+    max_iterations covers flow_throughs transits of the domain.
+
+    The cost is predicted from mlups, or by timing the kernel configured in
+    sim_params for a few steps. Returns {"sim_params": {...to merge...},
+    "reynolds_number", "mach_number", "lattice_viscosity", "time_step_s",
+    "simulated_time_s", "cell_updates", "mlups", "predicted_seconds",
+    "warnings"}.
+    """
+
+    ny, nx = grid_shape
+    omega_min, omega_max = omega_range
+    nu_min = (1.0 / omega_max - 0.5) / 3.0
+    nu_max = (1.0 / omega_min - 0.5) / 3.0
+    flow_length = _flow_length_cells(grid_shape, wind_direction_deg)
+    reynolds_cells = (reynolds_length_m / pixel_size_m if reynolds_length_m is not None
+                      else flow_length)
+
+    warnings = []
+    u_floor, u_cap = _LATTICE_VELOCITY_RANGE
+    u = max(u_floor, min(u_cap, max_lattice_velocity))
+    if u != max_lattice_velocity:
+        warnings.append(f"max_lattice_velocity {max_lattice_velocity:g} is outside "
+                        f"{list(_LATTICE_VELOCITY_RANGE)}; using {u:g}")
+    nu = u * reynolds_cells / target_reynolds
+    if nu > nu_max:
+        u = max(target_reynolds * nu_max / reynolds_cells, u_floor)
+        nu = nu_max
+        if u == u_floor:
+            warnings.append(f"target Re {target_reynolds:g} needs ω < {omega_min} even at the "
+                            f"lattice velocity floor {u_floor:g}; using Re "
+                            f"{u * reynolds_cells / nu:.1f} (coarsen the grid to go lower)")
+        else:
+            warnings.append(f"target Re {target_reynolds:g} needs ω < {omega_min}; "
+                            f"lattice velocity lowered to {u:.4f}")
+    elif nu < nu_min:
+        nu = nu_min
+        warnings.append(f"target Re {target_reynolds:g} needs ω > {omega_max} on this grid; "
+                        f"using Re {u * reynolds_cells / nu:.0f} (refine the grid to go higher)")
+    omega = 1.0 / (3.0 * nu + 0.5)
+    iterations = int(np.ceil(flow_throughs * flow_length / u))
+    if iterations > 10000:
+        warnings.append(f"{iterations} iterations exceed the 10000 that "
+                        f"validate_simulation_params allows")
+
+    if mlups is None:
+        mlups = _measure_mlups(dict(sim_params or {}, lattice_velocity=u,
+                                    relaxation_rate=omega), grid_shape)
+    cell_updates = nx * ny * iterations
+    time_step = u * pixel_size_m / wind_speed_ms
+
+    plan = {
+        "sim_params": {
+            "lattice_velocity": round(u, 6),
+            "relaxation_rate": round(omega, 6),
+            "max_iterations": iterations
+        },
+        "reynolds_number": round(u * reynolds_cells / nu, 1),
+        "mach_number": round(u * np.sqrt(3.0), 4),
+        "lattice_viscosity": nu,
+        "flow_length_cells": round(flow_length, 1),
+        "time_step_s": time_step,
+        "simulated_time_s": round(iterations * time_step, 2),
+        "cell_updates": cell_updates,
+        "mlups": round(mlups, 2),
+        "predicted_seconds": round(cell_updates / (mlups * 1e6), 1),
+        "warnings": warnings
+    }
+
+    print(f"📐 Plan: u_lat {u:.4f} (Ma {plan['mach_number']:.3f}), ω {omega:.4f}, "
+          f"Re {plan['reynolds_number']:g}, {iterations:,} iterations "
+          f"({flow_throughs:g} flow-throughs) → ~{plan['predicted_seconds']:.1f}s at {mlups:.1f} MLUPS")
+    for warning in warnings:
+        print(f"⚠️  {warning}")
+    return plan
+
 def create_performance_report(results: Dict) -> str:
     """Create a detailed performance report"""
     
     perf = results.get("performance", {})
     meta = results.get("metadata", {})
     stats = results.get("flow_statistics", {})
+    metrics = results.get("convergence_metrics", {})
+    # Counts of results streamed to results_path instead of returned
+    output = results.get("output", {})
+
+    convergence = ""
+    if metrics.get("iteration"):
+        convergence = f"""
+Convergence (last tracked iteration {metrics['iteration'][-1]}):
+- Residual: {metrics['residual'][-1]:.2e}
+- Max velocity change: {metrics['max_velocity_change'][-1]:.2e} (lattice units)
+- Mass drift: {metrics['mass_drift'][-1]:+.2e}
+"""
     
     report = f"""
 Enhanced Wind Simulation Performance Report
@@ -531,9 +4070,11 @@ Performance Metrics:
 - Total computation time: {perf.get('total_time', 0):.2f} seconds
 - LBM simulation time: {perf.get('simulation_time', 0):.2f} seconds  
 - Post-processing time: {perf.get('post_processing_time', 0):.2f} seconds
+- Iterations run: {perf.get('iterations', 0)}{' (warm start)' if perf.get('warm_start') else ''}
 - Iterations per second: {perf.get('iterations_per_second', 0):.1f}
 - Grid cells per second: {perf.get('grid_cells_per_second', 0):,.0f}
-
+- MLUPS: {perf.get('mlups', 0):.2f} ({perf.get('population_layout', 'aos')} layout)
+{convergence}
 Flow Statistics:
 - Speed range: {stats.get('min_magnitude', 0):.2f} - {stats.get('max_magnitude', 0):.2f} m/s
 - Mean speed: {stats.get('mean_magnitude', 0):.2f} ± {stats.get('std_magnitude', 0):.2f} m/s
@@ -541,21 +4082,643 @@ Flow Statistics:
 - Mean vorticity: {stats.get('mean_vorticity', 0):.4f} s⁻¹
 
 Generated Data:
-- Vector field points: {len(results.get('vector_field', []))}
-- Streamlines: {len(results.get('streamlines', []))}
-- Particle trajectories: {len(results.get('particles', []))}
+- Vector field points: {output.get('vector_points', _vector_count(results.get('vector_field', [])))}
+- Streamlines: {output.get('streamlines', _path_count(results.get('streamlines', [])))}
+- Particle trajectories: {output.get('particles', _path_count(results.get('particles', [])))}
 """
     
     return report
 
+def _synthetic_block_mask(grid_shape: Tuple[int, int], block_divisor: int = 20) -> np.ndarray:
+    """
+    Sparse block pattern roughly resembling a built-up area; blocks are
+    1/block_divisor of the grid per side (12 gives about a third solid)
+    """
+    ny, nx = grid_shape
+    mask = np.zeros((ny, nx), dtype=bool)
+    for j0 in range(ny // 10, ny - ny // 10, max(ny // 8, 4)):
+        for i0 in range(nx // 10, nx - nx // 10, max(nx // 8, 4)):
+            mask[j0:j0 + max(ny // block_divisor, 1), i0:i0 + max(nx // block_divisor, 1)] = True
+    return mask
+
+def benchmark_lbm_layouts(grid_shape: Tuple[int, int] = (609, 850),
+                          iterations: int = 200,
+                          wind_deg: float = 201.0,
+                          omega: float = 1.4,
+                          layouts: Tuple[str, ...] = ("aos", "soa")) -> Dict:
+    """
+    Benchmark the LBM kernel for each population layout on a synthetic mask.
+
+    A short warm-up run compiles the kernel first so the timings exclude JIT.
+    Returns {layout: {"time": s, "iterations_per_second": ..., "mlups": ...}}.
+    """
+
+    ny, nx = grid_shape
+    mask = _synthetic_block_mask(grid_shape)
+
+    report = {}
+    for layout in layouts:
+        kernel = _select_lbm_kernel({"population_layout": layout})
+        kernel(mask, 5.0, wind_deg, nx, ny, 2, omega, False)
+
+        t0 = time.time()
+        kernel(mask, 5.0, wind_deg, nx, ny, iterations, omega, False)
+        elapsed = time.time() - t0
+
+        report[layout] = {
+            "time": round(elapsed, 3),
+            "iterations_per_second": round(iterations / elapsed, 1),
+            "mlups": round(nx * ny * iterations / elapsed / 1e6, 2)
+        }
+        print(f"⏱️  {layout}: {report[layout]['mlups']:.2f} MLUPS "
+              f"({report[layout]['iterations_per_second']:.1f} iter/s)")
+
+    return report
+
+def benchmark_lbm_kernels(grid_shape: Tuple[int, int] = (609, 850),
+                          iterations: int = 200,
+                          wind_deg: float = 201.0,
+                          omega: float = 1.4,
+                          kernels: Tuple[str, ...] = ("split", "fused", "aa"),
+                          obstacle_mask: Optional[np.ndarray] = None) -> Dict:
+    """
+    Benchmark each LBM kernel densely and, for the fused kernel (the only one
+    accepting it), with skip_solid_cells.
+
+    Runs on obstacle_mask or a dense synthetic block mask of grid_shape
+    (about a third solid, as in downtown masks); JIT compilation is done
+    beforehand. Returns {"solid_fraction": ..., kernel: {"dense": {"time",
+    "mlups"}}} with MLUPS counted over all lattice cells; the fused entry also
+    holds "skip_solid_cells": {"time", "mlups"} and "speedup".
+    """
+
+    if obstacle_mask is None:
+        obstacle_mask = _synthetic_block_mask(grid_shape, block_divisor=12)
+    ny, nx = obstacle_mask.shape
+
+    report = {"solid_fraction": round(float(np.mean(obstacle_mask)), 3)}
+    for kernel_name in kernels:
+        report[kernel_name] = {}
+        variants = (("dense", False), ("skip_solid_cells", True)) if kernel_name == "fused" \
+            else (("dense", False),)
+        for label, skip in variants:
+            kernel = _select_lbm_kernel({"lbm_kernel": kernel_name, "skip_solid_cells": skip})
+            kernel(obstacle_mask, 5.0, wind_deg, nx, ny, 2, omega, False)
+
+            t0 = time.time()
+            kernel(obstacle_mask, 5.0, wind_deg, nx, ny, iterations, omega, False)
+            elapsed = time.time() - t0
+            report[kernel_name][label] = {
+                "time": round(elapsed, 3),
+                "mlups": round(nx * ny * iterations / elapsed / 1e6, 2)
+            }
+        if len(variants) == 1:
+            print(f"⏱️  {kernel_name}: {report[kernel_name]['dense']['mlups']:.2f} MLUPS dense")
+            continue
+        speedup = report[kernel_name]["dense"]["time"] / report[kernel_name]["skip_solid_cells"]["time"]
+        report[kernel_name]["speedup"] = round(speedup, 2)
+        print(f"⏱️  {kernel_name}: {report[kernel_name]['dense']['mlups']:.2f} MLUPS dense, "
+              f"{report[kernel_name]['skip_solid_cells']['mlups']:.2f} MLUPS skipping solid cells "
+              f"({speedup:.2f}× at {report['solid_fraction']:.0%} solid)")
+
+    return report
+
+def benchmark_multigrid(obstacle_mask: Optional[np.ndarray] = None,
+                        grid_shape: Tuple[int, int] = (609, 850),
+                        levels: Tuple[int, ...] = (1, 2, 3),
+                        tolerance: float = 1e-3,
+                        max_iterations: int = 10000,
+                        lbm_kernel: str = "fused",
+                        wind_speed: float = 5.0,
+                        wind_deg: float = 201.0,
+                        omega: float = 1.0,
+                        check_interval: int = 100) -> Dict:
+    """
+    Wall time to reach a velocity residual with and without multigrid.
+
+    Runs the same case once per entry of `levels` (1 = single grid) with
+    convergence_tolerance=tolerance, on obstacle_mask or a synthetic block
+    mask of grid_shape. JIT compilation is done beforehand. The default
+    omega keeps the synthetic case steady; at higher Reynolds numbers the
+    wakes shed vortices and the residual levels off above small tolerances.
+    Returns {levels: {"time": s, "iterations": iterations over all levels,
+    "converged": bool, "finite": bool}}.
+    """
+
+    if obstacle_mask is None:
+        obstacle_mask = _synthetic_block_mask(grid_shape)
+    weather = {"wind_speed_ms": wind_speed, "wind_direction_deg": wind_deg}
+    params = {"lbm_kernel": lbm_kernel, "relaxation_rate": omega,
+              "max_iterations": max_iterations, "convergence_tolerance": tolerance,
+              "check_interval": check_interval}
+    _run_lbm(obstacle_mask[:32, :32], weather, dict(params, max_iterations=2), False)
+
+    report = {}
+    for n_levels in levels:
+        t0 = time.time()
+        ux, uy, _, iterations = _run_lbm(obstacle_mask, weather,
+                                         dict(params, multigrid_levels=n_levels), False)
+        elapsed = time.time() - t0
+
+        report[n_levels] = {
+            "time": round(elapsed, 2),
+            "iterations": iterations,
+            "converged": iterations < max_iterations,
+            "finite": bool(np.all(np.isfinite(ux)) and np.all(np.isfinite(uy)))
+        }
+        print(f"⏱️  multigrid levels={n_levels}: {elapsed:.2f}s to residual {tolerance:g} "
+              f"({iterations} iterations over all levels)")
+
+    return report
+
+def benchmark_frozen_tiles(obstacle_mask: Optional[np.ndarray] = None,
+                           grid_shape: Tuple[int, int] = (128, 768),
+                           tile_size: int = 32,
+                           tile_tolerance: float = 3e-4,
+                           tolerance: float = 1e-3,
+                           max_iterations: int = 10000,
+                           wind_speed: float = 5.0,
+                           wind_deg: float = 270.0,
+                           omega: float = 1.0,
+                           check_interval: int = 100) -> Dict:
+    """
+    Wall time to reach a velocity residual with and without frozen tiles.
+
+    Runs the fused kernel with convergence_tolerance=tolerance, plainly and
+    with sim_params["frozen_tile_size"] = tile_size, on obstacle_mask or a
+    long open field of grid_shape with one block near its outflow end (the
+    default wind drives the flow towards x = 0), whose upstream fetch
+    settles long before the wake. JIT compilation is done beforehand.
+    Returns {"plain": {"time", "iterations"}, "frozen_tiles": {"time",
+    "iterations", "skipped_tile_fraction"}, "speedup": ..., "work_ratio":
+    tile updates of the tiled run over those of the plain run (the speedup
+    without timing noise), "difference": relative L2 difference of the two
+    speed fields}.
+    """
+
+    if obstacle_mask is None:
+        ny, nx = grid_shape
+        side = max(ny // 8, 1)
+        obstacle_mask = np.zeros(grid_shape, dtype=bool)
+        obstacle_mask[(ny - side) // 2:(ny + side) // 2, nx // 12:nx // 12 + side] = True
+    weather = {"wind_speed_ms": wind_speed, "wind_direction_deg": wind_deg}
+    params = {"lbm_kernel": "fused", "relaxation_rate": omega,
+              "max_iterations": max_iterations, "convergence_tolerance": tolerance,
+              "check_interval": check_interval}
+    tiled_params = dict(params, frozen_tile_size=tile_size, frozen_tile_tolerance=tile_tolerance)
+    for warmup in (params, tiled_params):
+        _run_lbm(np.ascontiguousarray(obstacle_mask[:32, :32]), weather,
+                 dict(warmup, max_iterations=2, check_interval=1), False)
+
+    report, speeds = {}, {}
+    for label, run_params in (("plain", params), ("frozen_tiles", tiled_params)):
+        tile_stats = {}
+        t0 = time.time()
+        ux, uy, _, iterations = _run_lbm(obstacle_mask, weather, run_params, False,
+                                         None, None, tile_stats)
+        elapsed = time.time() - t0
+        speeds[label] = np.hypot(ux, uy)
+        report[label] = {"time": round(elapsed, 2), "iterations": iterations}
+        if tile_stats:
+            report[label]["skipped_tile_fraction"] = round(
+                tile_stats["skipped_tile_updates"] / tile_stats["tile_updates"], 3)
+
+    report["speedup"] = round(report["plain"]["time"] / report["frozen_tiles"]["time"], 2)
+    report["work_ratio"] = round(report["frozen_tiles"]["iterations"] *
+                                 (1.0 - report["frozen_tiles"]["skipped_tile_fraction"]) /
+                                 report["plain"]["iterations"], 3)
+    report["difference"] = float(np.linalg.norm(speeds["frozen_tiles"] - speeds["plain"]) /
+                                 np.linalg.norm(speeds["plain"]))
+    print(f"⏱️  frozen tiles: {report['plain']['time']:.2f}s plain, "
+          f"{report['frozen_tiles']['time']:.2f}s tiled to residual {tolerance:g} "
+          f"({report['frozen_tiles']['skipped_tile_fraction']:.1%} of tile updates skipped, "
+          f"{report['speedup']:.2f}× in time, {report['work_ratio']:.2f} of the work, "
+          f"speed fields {report['difference']:.1e} apart)")
+    return report
+
+def compare_lbm_kernels(obstacle_mask: np.ndarray,
+                        reference_params: Dict,
+                        candidate_params: Dict,
+                        wind_speed: float = 5.0,
+                        wind_deg: float = 201.0,
+                        iterations: int = 500,
+                        omega: float = 1.4) -> Dict:
+    """
+    Run two kernel configurations on the same case and compare velocities.
+
+    Used as the regression check for alternative kernels against the split
+    reference path. Returns max absolute differences (physical units) and the
+    relative L2 error of the velocity magnitude.
+    """
+
+    ny, nx = obstacle_mask.shape
+    fields = []
+    for params in (reference_params, candidate_params):
+        kernel = _select_lbm_kernel(params)
+        ux, uy, _, _ = kernel(obstacle_mask, wind_speed, wind_deg, nx, ny,
+                              iterations, omega, False)
+        fields.append((ux, uy, np.sqrt(ux**2 + uy**2)))
+
+    (ux_ref, uy_ref, mag_ref), (ux_new, uy_new, mag_new) = fields
+    ref_norm = np.sqrt(np.sum(mag_ref**2))
+
+    return {
+        "max_abs_ux": float(np.max(np.abs(ux_new - ux_ref))),
+        "max_abs_uy": float(np.max(np.abs(uy_new - uy_ref))),
+        "max_abs_magnitude": float(np.max(np.abs(mag_new - mag_ref))),
+        "rel_l2_magnitude": float(np.sqrt(np.sum((mag_new - mag_ref)**2)) / ref_norm) if ref_norm > 0 else 0.0
+    }
+
+def _bundled_test_mask() -> np.ndarray:
+    """Obstacle mask of the bundled self-test case (single rectangular block)"""
+    test_mask = np.zeros((100, 150), dtype=bool)
+    test_mask[40:60, 70:90] = True
+    return test_mask
+
+def validate_precision(obstacle_mask: Optional[np.ndarray] = None,
+                       lbm_kernel: str = "aa",
+                       wind_speed: float = 5.0,
+                       wind_deg: float = 270.0,
+                       iterations: int = 1000,
+                       omega: float = 1.5,
+                       tolerance: float = 1e-3) -> Dict:
+    """
+    Compare a float32 run against the float64 result of the same kernel.
+
+    Defaults to the bundled test case. The run passes when the relative L2
+    error of the velocity magnitude is below `tolerance`.
+    """
+
+    if obstacle_mask is None:
+        obstacle_mask = _bundled_test_mask()
+
+    report = compare_lbm_kernels(
+        obstacle_mask,
+        {"lbm_kernel": lbm_kernel, "precision": "float64"},
+        {"lbm_kernel": lbm_kernel, "precision": "float32"},
+        wind_speed=wind_speed, wind_deg=wind_deg,
+        iterations=iterations, omega=omega
+    )
+    report["lbm_kernel"] = lbm_kernel
+    report["tolerance"] = tolerance
+    report["passed"] = report["rel_l2_magnitude"] < tolerance
+
+    print(f"🎚️  float32 vs float64 ({lbm_kernel}): max |Δ|u|| = {report['max_abs_magnitude']:.2e} m/s, "
+          f"rel. L2 = {report['rel_l2_magnitude']:.2e} -> {'PASS' if report['passed'] else 'FAIL'}")
+
+    return report
+
+# ──────────────────────────────────────────────────────────────────────────
+# JIT CACHE / WARM-UP
+# ──────────────────────────────────────────────────────────────────────────
+
+# Kernel configurations the warm-up runs (merged over validate_simulation_params
+# defaults); precision-dependent kernels are run once per precision
+_WARMUP_SPLIT_CONFIGS = (
+    {"lbm_kernel": "split", "population_layout": "aos"},
+    {"lbm_kernel": "split", "population_layout": "soa"},
+    {"lbm_kernel": "split", "population_layout": "aos", "bounce_back": "halfway"},
+    {"lbm_kernel": "split", "population_layout": "soa", "bounce_back": "halfway"},
+)
+_WARMUP_STEPPING_CONFIGS = (
+    {"lbm_kernel": "fused"},
+    {"lbm_kernel": "fused", "skip_solid_cells": True},
+    {"lbm_kernel": "fused", "bounce_back": "halfway"},
+    {"lbm_kernel": "fused", "frozen_tile_size": 8},
+    {"lbm_kernel": "aa"},
+)
+
+def _module_dispatchers() -> Dict[str, Dispatcher]:
+    """The module's numba-compiled functions by name"""
+    return {name: obj for name, obj in globals().items() if isinstance(obj, Dispatcher)}
+
+def set_kernel_cache_dir(cache_dir: str) -> str:
+    """
+    Point numba's on-disk cache for this module's kernels at cache_dir.
+
+    Every `@njit(cache=True)` kernel otherwise caches next to the module in
+    __pycache__, which is lost with the container. The directory is also put
+    in NUMBA_CACHE_DIR so worker processes started afterwards (e.g. the
+    decomposed runner) read and fill the same cache. Entries are keyed on the
+    module's path and modification time, so a shared volume serves every
+    process importing the same copy of this file. Returns the absolute path.
+    """
+
+    cache_dir = os.path.abspath(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ["NUMBA_CACHE_DIR"] = cache_dir
+    numba.config.CACHE_DIR = cache_dir
+
+    # Each dispatcher fixed its cache location at decoration time
+    for dispatcher in _module_dispatchers().values():
+        dispatcher.enable_caching()
+    return cache_dir
+
+def precompile_kernels(cache_dir: Optional[str] = None,
+                       precisions: Tuple[str, ...] = ("float64", "float32"),
+                       mask_dtypes: Tuple = (np.bool_, np.uint8, "packed"),
+                       decomposed: bool = True,
+                       lbm_kernels: Tuple[str, ...] = ("split", "fused", "aa")) -> Dict:
+    """
+    Compile every kernel signature the public API dispatches to and cache it.
+
+    Runs each kernel configuration for a few iterations on a small grid through
+    the same entry points as run_wind_simulation/run_wind_ensemble - with and
+    without a warm start, a returned solver state and time averaging, for each storage
+    precision and obstacle-mask dtype ("packed" for `pack_obstacle_mask`
+    masks, which only the fused kernels read packed) - plus the streamline
+    generator `_iter_streamlines` and particle paths. lbm_kernels limits the
+    warm-up to those sim_params["lbm_kernel"] values; the ensemble kernel is
+    compiled with "fused".
+    With decomposed=True the multi-process strip kernels are compiled in
+    their worker processes too (callers need the usual
+    `if __name__ == "__main__":` guard). With cache_dir the cache is moved
+    there first (see `set_kernel_cache_dir`). A second call, or a fresh
+    process using the same cache, only loads the compiled code.
+
+    Returns {"cache_dir": ..., "seconds": total, "timings": {config: s}}.
+    """
+
+    if cache_dir is not None:
+        set_kernel_cache_dir(cache_dir)
+    for precision in precisions:
+        if precision not in _LBM_PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}', "
+                             f"expected one of {sorted(_LBM_PRECISIONS)}")
+    print(f"🔥 Precompiling kernels into {numba.config.CACHE_DIR or 'the module __pycache__'}")
+
+    configs = list(_WARMUP_SPLIT_CONFIGS) if "float64" in precisions else []
+    configs += [dict(config, precision=precision)
+                for precision in precisions for config in _WARMUP_STEPPING_CONFIGS]
+    if decomposed:
+        configs += [{"lbm_kernel": "split", "processes": 2}] if "float64" in precisions else []
+        configs += [{"lbm_kernel": "fused", "processes": 2, "precision": precision}
+                    for precision in precisions]
+    configs = [config for config in configs if config["lbm_kernel"] in lbm_kernels]
+
+    block = _synthetic_block_mask((24, 32))
+    weather = {"wind_speed_ms": 5.0, "wind_direction_deg": 250.0}
+    warmup = {"max_iterations": 4, "check_interval": 2, "convergence_tolerance": 1e-12,
+              "buffer_size": 0}
+
+    timings = {}
+    t_total = time.time()
+    for mask_dtype in mask_dtypes:
+        if isinstance(mask_dtype, str) and mask_dtype == "packed":
+            mask, dtype_name = pack_obstacle_mask(block), "packed"
+            mask_configs = [config for config in configs
+                            if config["lbm_kernel"] == "fused" and "processes" not in config]
+        else:
+            mask, dtype_name = block.astype(mask_dtype), np.dtype(mask_dtype).name
+            mask_configs = configs
+        for config in mask_configs:
+            params = dict(validate_simulation_params(config), **warmup)
+            label = "/".join([dtype_name] + [f"{k}={v}" for k, v in config.items()])
+            t0 = time.time()
+
+            # Cold start, then warm start with the solver state returned;
+            # the decomposed runner accumulates moments outside its kernels
+            windows = (0, 2) if params["processes"] == 1 else (0,)
+            for window in windows:
+                run_params = dict(params, averaging_window=window)
+                rho = np.empty(block.shape, dtype=np.float64)
+                ux, uy, _, iterations = _run_lbm(mask, weather, run_params, True, rho, {})
+                if params["processes"] == 1:
+                    state = _solver_state_from_velocity(ux, uy, weather, iterations, rho)
+                    _run_lbm(mask, weather, dict(run_params, initial_state=state), False,
+                             None, {})
+                    _run_lbm(mask, weather, dict(run_params, initial_state=state), True,
+                             rho, {})
+                    _run_lbm(mask, weather, run_params, False, None, {})
+            timings[label] = round(time.time() - t0, 2)
+
+        if "fused" not in lbm_kernels:
+            continue
+        t0 = time.time()
+        for precision in precisions:
+            run_wind_ensemble(mask, {}, {"wind_directions_deg": [250.0, 90.0], "wind_speed_ms": 5.0},
+                              dict(validate_simulation_params({"precision": precision}), **warmup))
+        timings[f"{dtype_name}/ensemble"] = round(time.time() - t0, 2)
+
+    t0 = time.time()
+    ny, nx = block.shape
+    ux, uy = np.ones(block.shape), np.zeros(block.shape)
+    # Streamed results call the jitted generator directly (defaults omitted),
+    # in-memory results go through `_generate_streamlines`
+    list(_iter_streamlines(ux, uy, nx, ny, num_streamlines=10, max_points=10))
+    _generate_streamlines(ux, uy, nx, ny, num_streamlines=10, max_points=10)
+    _generate_particle_paths(ux, uy, nx, ny, num_particles=10, max_steps=10)
+    timings["streamlines/particles"] = round(time.time() - t0, 2)
+
+    total = round(time.time() - t_total, 2)
+    print(f"🔥 Precompiled {len(timings)} kernel configurations in {total:.2f}s")
+    return {"cache_dir": numba.config.CACHE_DIR or None, "seconds": total, "timings": timings}
+
+# ──────────────────────────────────────────────────────────────────────────
+# THREAD AUTOTUNING
+# ──────────────────────────────────────────────────────────────────────────
+
+# Where `autotune_kernels` stores its results unless sim_params["autotune_file"]
+# or its path argument points elsewhere
+_AUTOTUNE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "wind_simulation", "autotune.json")
+
+# Numba threading layers tried by `autotune_kernels`
+_THREADING_LAYERS = ("tbb", "omp", "workqueue")
+
+def _shape_bucket(grid_shape: Tuple[int, int]) -> str:
+    """Autotune key for a grid: each side rounded up to a power of two (e.g. 1024x1024)"""
+    return "x".join(str(1 << max(0, int(n) - 1).bit_length()) for n in grid_shape)
+
+def _autotune_key(grid_shape: Tuple[int, int], sim_params: Dict) -> str:
+    """Autotune entry key: shape bucket, kernel and precision (e.g. 1024x1024/fused/float32)"""
+    return "/".join((_shape_bucket(grid_shape), sim_params.get("lbm_kernel", "split"),
+                     sim_params.get("precision", "float64")))
+
+def _load_autotune(path: str) -> Dict:
+    """Stored autotune results, {host: {key: entry}}; empty if missing or unreadable"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as error:
+        print(f"⚠️  Ignoring unreadable autotune file {path}: {error}")
+        return {}
+
+def _autotuned_config(grid_shape: Tuple[int, int], sim_params: Dict,
+                      path: Optional[str] = None) -> Optional[Dict]:
+    """This host's stored autotune entry for grid_shape and the configured kernel, or None"""
+    tuned = _load_autotune(path or _AUTOTUNE_FILE)
+    return tuned.get(socket.gethostname(), {}).get(_autotune_key(grid_shape, sim_params))
+
+def _autotune_sweep(grid_shape: Tuple[int, int], sim_params: Dict, thread_counts: List[int],
+                    chunk_sizes: List[int], iterations: int, repeats: int, cache_dir: str):
+    """
+    Benchmark worker for `autotune_kernels`, run in a fresh process whose
+    NUMBA_THREADING_LAYER is already set: MLUPS of the configured kernel on
+    grid_shape for every thread count × prange chunk size (best of repeats).
+    Returns (threading layer actually loaded, results).
+    """
+    if cache_dir:
+        set_kernel_cache_dir(cache_dir)
+    _measure_mlups(sim_params, grid_shape, 1, max_side=None)
+
+    results = []
+    for threads in thread_counts:
+        if threads > numba.config.NUMBA_NUM_THREADS:
+            continue
+        for chunk_size in chunk_sizes:
+            set_num_threads(threads)
+            numba.set_parallel_chunksize(chunk_size)
+            mlups = max(_measure_mlups(sim_params, grid_shape, iterations, max_side=None)
+                        for _ in range(repeats))
+            results.append({"threads": threads, "chunk_size": chunk_size, "mlups": round(mlups, 2)})
+    return numba.threading_layer(), results
+
+def autotune_kernels(grid_shape: Tuple[int, int],
+                     sim_params: Optional[Dict] = None,
+                     thread_counts: Optional[List[int]] = None,
+                     threading_layers: Tuple[str, ...] = _THREADING_LAYERS,
+                     chunk_sizes: Tuple[int, ...] = (0, 1, 4, 16),
+                     iterations: int = 20,
+                     repeats: int = 2,
+                     path: Optional[str] = None) -> Dict:
+    """
+    Find the fastest thread count, threading layer and prange chunk size for
+    the configured kernel (sim_params, default `_lbm_enhanced`) on grid_shape
+    and store it for `run_wind_simulation`, which applies it by default.
+
+    Numba fixes the threading layer at its first parallel launch, so each
+    layer is benchmarked in its own spawned process (callers need the usual
+    `if __name__ == "__main__":` guard); layers that fail to load are
+    skipped. Thread counts default to the powers of two up to the core count
+    plus the core count; chunk size 0 is numba's static schedule, n > 0
+    hands out n rows at a time. The best configuration is saved in path
+    (default `_AUTOTUNE_FILE`) under this host, the grid's shape bucket
+    (sides rounded up to powers of two), the kernel and its precision,
+    replacing any earlier entry for that combination.
+
+    Returns the stored entry plus "results" (every measurement) and "path".
+    """
+    path = path or _AUTOTUNE_FILE
+    params = validate_simulation_params(dict(sim_params or {}, processes=1))
+    if thread_counts is None:
+        cores = numba.config.NUMBA_NUM_THREADS
+        thread_counts = sorted({1 << k for k in range(cores.bit_length())} | {cores})
+    host, bucket = socket.gethostname(), _autotune_key(grid_shape, params)
+    print(f"🎛️  Autotuning {params['lbm_kernel']} kernel for {grid_shape[1]}×{grid_shape[0]} "
+          f"cells on {host}: threads {list(thread_counts)}, layers {list(threading_layers)}, "
+          f"chunk sizes {list(chunk_sizes)}")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for layer in threading_layers:
+        previous = os.environ.get("NUMBA_THREADING_LAYER")
+        os.environ["NUMBA_THREADING_LAYER"] = layer
+        try:
+            with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+                loaded, sweep = pool.submit(
+                    _autotune_sweep, tuple(grid_shape), params, list(thread_counts),
+                    list(chunk_sizes), iterations, repeats, numba.config.CACHE_DIR or "").result()
+        except Exception as error:
+            print(f"⚠️  Threading layer {layer} skipped: {error}")
+            continue
+        finally:
+            if previous is None:
+                os.environ.pop("NUMBA_THREADING_LAYER", None)
+            else:
+                os.environ["NUMBA_THREADING_LAYER"] = previous
+        results += [dict(row, threading_layer=loaded) for row in sweep]
+        if sweep:
+            fastest = max(sweep, key=lambda row: row["mlups"])
+            print(f"    {loaded}: best {fastest['mlups']:.1f} MLUPS with {fastest['threads']} "
+                  f"threads, chunk size {fastest['chunk_size']}")
+    if not results:
+        raise RuntimeError("No threading layer could be benchmarked")
+
+    best = max(results, key=lambda row: row["mlups"])
+    entry = {
+        "threading_layer": best["threading_layer"],
+        "threads": best["threads"],
+        "chunk_size": best["chunk_size"],
+        "mlups": best["mlups"],
+        "lbm_kernel": params["lbm_kernel"],
+        "precision": params["precision"],
+        "grid_shape": [int(n) for n in grid_shape],
+        "timestamp": time.time()
+    }
+    tuned = _load_autotune(path)
+    tuned.setdefault(host, {})[bucket] = entry
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(tuned, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f"🎛️  Stored {bucket} on {host}: {entry['threads']} threads, {entry['threading_layer']} "
+          f"layer, chunk size {entry['chunk_size']} ({entry['mlups']:.1f} MLUPS) in {path}")
+    return dict(entry, results=results, path=path)
+
+def _apply_autotuned_config(grid_shape: Tuple[int, int],
+                            sim_params: Dict) -> Tuple[Optional[Dict], Callable[[], None]]:
+    """
+    Apply this host's stored `autotune_kernels` entry for grid_shape and the
+    run's kernel and precision to one single-process run (unless
+    sim_params["autotune"] is False); returns (entry or None, restore). Runs
+    without an entry, or with an unreadable autotune file, keep numba's
+    settings. Thread count and chunk size are set now and put back by
+    restore(). The threading layer can only be chosen before numba's first
+    parallel launch: then the stored layer is put in numba.config for this
+    run (restore() resets the setting; the loaded layer stays for the
+    process), otherwise a stored layer that differs from the loaded one is
+    reported instead.
+    """
+    if not sim_params.get("autotune", True) or sim_params.get("processes", 1) > 1:
+        return None, lambda: None
+    entry = _autotuned_config(grid_shape, sim_params, sim_params.get("autotune_file"))
+    if entry is None:
+        return None, lambda: None
+
+    config_layer = numba.config.THREADING_LAYER
+    try:
+        layer = numba.threading_layer()
+    except ValueError:
+        numba.config.THREADING_LAYER = layer = entry["threading_layer"]
+    if layer != entry["threading_layer"]:
+        print(f"🎛️  Autotuned layer {entry['threading_layer']} not used: numba already runs on "
+              f"{layer} (set NUMBA_THREADING_LAYER before the first run)")
+
+    threads, chunk_size = numba.get_num_threads(), numba.get_parallel_chunksize()
+    set_num_threads(min(int(entry["threads"]), numba.config.NUMBA_NUM_THREADS))
+    numba.set_parallel_chunksize(int(entry["chunk_size"]))
+    print(f"🎛️  Autotuned: {numba.get_num_threads()} threads, chunk size {entry['chunk_size']}")
+
+    def restore():
+        set_num_threads(threads)
+        numba.set_parallel_chunksize(chunk_size)
+        numba.config.THREADING_LAYER = config_layer
+
+    return entry, restore
+
 # Example usage and testing
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Wind simulation demo (feature tests live in tests/)")
+    parser.add_argument("--warmup", action="store_true",
+                        help="precompile all kernel signatures into the JIT cache and exit")
+    parser.add_argument("--cache-dir", help="JIT cache directory (shared by worker processes)")
+    args = parser.parse_args()
+    if args.cache_dir:
+        set_kernel_cache_dir(args.cache_dir)
+    if args.warmup:
+        precompile_kernels()
+        raise SystemExit(0)
+
     # Test the enhanced simulation
     print("🧪 Testing enhanced wind simulation...")
     
     # Create test data
-    test_mask = np.zeros((100, 150), dtype=bool)
-    test_mask[40:60, 70:90] = True  # Rectangular obstacle
+    test_mask = _bundled_test_mask()  # Rectangular obstacle
     
     test_grid_info = {"width": 150, "height": 100}
     test_weather = {"wind_speed_ms": 5.0, "wind_direction_deg": 270}
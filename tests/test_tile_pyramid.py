@@ -0,0 +1,68 @@
+"""Tests for colab/tile_pyramid.py (EPSG:2180 projection and PNG tiles)"""
+
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from colab.tile_pyramid import (
+    _PUWG92, _lonlat_from_puwg92, _puwg92_from_lonlat, _tile_lonlat, generate_tile_pyramid,
+    grid_bounds)
+
+
+def test_central_meridian_northing():
+    # Easting is the false easting and northing the GRS80 meridian arc
+    # (integrated numerically here) times k0 plus the false northing
+    p = _PUWG92
+    e2 = p["f"] * (2.0 - p["f"])
+    phi = np.linspace(0.0, np.deg2rad(52.0), 200001)
+    radius = p["a"] * (1.0 - e2) / (1.0 - e2 * np.sin(phi) ** 2) ** 1.5
+    arc = np.sum((radius[1:] + radius[:-1]) / 2.0 * np.diff(phi))
+    easting, northing = _puwg92_from_lonlat(np.array([19.0]), np.array([52.0]))
+    assert abs(easting[0] - 500000.0) < 1e-6
+    assert abs(northing[0] - (p["k0"] * arc + p["false_northing"])) < 1e-3
+
+
+def test_projection_round_trip():
+    # Across Poland (14°E-24.2°E, 49°N-55°N) to well below a millimetre
+    lon, lat = np.meshgrid(np.linspace(14.0, 24.2, 41), np.linspace(49.0, 55.0, 25))
+    easting, northing = _puwg92_from_lonlat(lon, lat)
+    lon_back, lat_back = _lonlat_from_puwg92(easting, northing)
+    error_m = 6.4e6 * np.deg2rad(max(np.max(np.abs(lon_back - lon)), np.max(np.abs(lat_back - lat))))
+    assert error_m < 1e-3
+
+
+def test_pyramid_decodes_to_velocity(tmp_path):
+    # A 3 m grid in Gdańsk: every zoom written, PNGs decode to the encoded
+    # velocity, obstacles transparent
+    ny, nx = 100, 150
+    y, x = np.mgrid[0:ny, 0:nx]
+    ux = 3.0 + np.sin(x / 20.0)
+    uy = np.cos(y / 15.0)
+    mask = np.zeros((ny, nx), dtype=bool)
+    mask[40:60, 70:90] = True
+    bounds = grid_bounds({"grid_properties": {"bounds": [477000.0, 720500.0, 477450.0, 720800.0]}})
+    pyramid = generate_tile_pyramid(ux, uy, bounds, str(tmp_path), mask=mask, zoom_range=(14, 17),
+                                    processes=2)
+    velocity_dir = tmp_path / "velocity"
+    tiles = sorted(os.path.relpath(os.path.join(root, name), velocity_dir)
+                   for root, _, names in os.walk(velocity_dir) for name in names)
+    assert len(tiles) == pyramid["tiles"] > 0
+    assert {int(tile.split(os.sep)[0]) for tile in tiles} == set(range(14, 18))
+
+    z, tx, ty = (int(part) for part in tiles[-1][:-len(".png")].split(os.sep))
+    data = (velocity_dir / str(z) / str(tx) / f"{ty}.png").read_bytes()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height = struct.unpack(">II", data[16:24])
+    idat_length = struct.unpack(">I", data[33:37])[0]
+    rows = np.frombuffer(zlib.decompress(data[41:41 + idat_length]), dtype=np.uint8)
+    rgba = rows.reshape(height, 4 * width + 1)[:, 1:].reshape(height, width, 4)
+
+    lon, lat = _tile_lonlat(z, tx, ty, width)
+    easting, _ = _puwg92_from_lonlat(lon, lat)
+    col = (easting - bounds[0]) / (bounds[2] - bounds[0]) * nx - 0.5
+    opaque = rgba[..., 3] == 255
+    decoded = (rgba[..., 0] / 127.5 - 1.0) * pyramid["velocity"]["scale"]
+    assert opaque.any()
+    assert np.max(np.abs(decoded - (3.0 + np.sin(col / 20.0)))[opaque]) < pyramid["velocity"]["scale"] / 127.5
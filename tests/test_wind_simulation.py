@@ -0,0 +1,473 @@
+"""Feature tests for colab/wind_simulation_module.py (one test per feature)"""
+
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import numba
+import numpy as np
+import pytest
+
+from colab.wind_simulation_module import (
+    _LATTICE_VELOCITY_RANGE, _RHO0, _autotuned_config, _bundled_test_mask, _inflow_edge,
+    _initial_populations, _lattice_index_for, _lbm_enhanced, _lbm_enhanced_soa, _lbm_fused_steps,
+    _lbm_tiled_steps, _path_count, _rotation_frame, _run_lbm, _seed_path_rng, _select_lbm_kernel,
+    _vector_count, autotune_kernels, benchmark_lbm_layouts, benchmark_multigrid, bundle_array,
+    compare_lbm_kernels, convert_results_schema, load_obstacle_mask, load_result_bundle,
+    plan_simulation_params, run_wind_ensemble, run_wind_simulation, save_obstacle_mask,
+    unpack_obstacle_mask, validate_precision, validate_simulation_params, write_results_json)
+
+GRID_INFO = {"width": 150, "height": 100}
+WEATHER = {"wind_speed_ms": 5.0, "wind_direction_deg": 270}
+TEST_PARAMS = {
+    "max_iterations": 1000,
+    "relaxation_rate": 1.5,
+    "generate_streamlines": True,
+    "generate_particles": True,
+    "streamline_count": 50,
+    "particle_count": 200,
+    "enable_performance_tracking": True,
+    "return_solver_state": True
+}
+
+
+@pytest.fixture(scope="module")
+def mask():
+    return _bundled_test_mask()
+
+
+@pytest.fixture(scope="module")
+def reference_run(mask):
+    return run_wind_simulation(mask, GRID_INFO, WEATHER, TEST_PARAMS)
+
+
+@pytest.fixture(scope="module")
+def warm_params():
+    return dict(validate_simulation_params(TEST_PARAMS), lbm_kernel="fused",
+                max_iterations=4000, convergence_tolerance=3e-3, buffer_size=0,
+                generate_streamlines=False, generate_particles=False,
+                enable_performance_tracking=False, return_solver_state=False)
+
+
+@pytest.fixture(scope="module")
+def vector_params():
+    return dict(validate_simulation_params({"lbm_kernel": "fused"}), max_iterations=100,
+                buffer_size=0, generate_streamlines=False, generate_particles=False)
+
+
+@pytest.fixture(scope="module")
+def columnar(mask, vector_params):
+    _seed_path_rng(7)
+    return run_wind_simulation(mask, GRID_INFO, WEATHER,
+                               dict(vector_params, generate_streamlines=True,
+                                    generate_particles=True, streamline_count=20,
+                                    particle_count=100, result_schema_version=3))
+
+
+def test_convergence_metrics(reference_run):
+    metrics = reference_run["convergence_metrics"]
+    assert len(metrics["residual"]) == reference_run["performance"]["iterations"] // 10
+    assert np.all(np.isfinite(metrics["mass_drift"]))
+
+
+def test_early_termination(mask):
+    # A converging run stops early, with the fields of a fixed-length run
+    # of the same length
+    converging_params = dict(validate_simulation_params({"lbm_kernel": "fused"}),
+                             max_iterations=4000, convergence_tolerance=3e-3)
+    ux, uy, _, iterations = _run_lbm(mask, WEATHER, converging_params, False)
+    ux_fixed, uy_fixed, _, _ = _run_lbm(mask, WEATHER, dict(converging_params, max_iterations=iterations,
+                                                            convergence_tolerance=0.0), False)
+    assert iterations < 4000
+    assert np.array_equal(ux, ux_fixed) and np.array_equal(uy, uy_fixed)
+
+
+def test_warm_start_reduces_iterations(mask, reference_run, warm_params):
+    # The next "hour" (wind veered 10°) from the reference run's state
+    next_weather = {"wind_speed_ms": 5.5, "wind_direction_deg": 260}
+    cold = run_wind_simulation(mask, GRID_INFO, next_weather, warm_params)
+    warm = run_wind_simulation(mask, GRID_INFO, next_weather,
+                               dict(warm_params, initial_state=reference_run["solver_state"]))
+    assert warm["performance"]["iterations"] < cold["performance"]["iterations"]
+
+
+def test_population_layouts(mask):
+    # Both layouts give the same fields, and the benchmark times both
+    fields = {}
+    for layout, kernel in (("aos", _lbm_enhanced), ("soa", _lbm_enhanced_soa)):
+        rho = np.empty(mask.shape)
+        ux, uy, _, _ = kernel(mask, 5.0, 201.0, mask.shape[1], mask.shape[0], 301, 1.4, rho_out=rho)
+        fields[layout] = (ux, uy, rho)
+    for aos, soa in zip(fields["aos"], fields["soa"]):
+        np.testing.assert_allclose(soa, aos, rtol=0.0, atol=1e-10)
+    report = benchmark_lbm_layouts(mask.shape, iterations=200)
+    assert set(report) == {"aos", "soa"} and all(row["mlups"] > 0 for row in report.values())
+
+
+def test_multigrid_converges(mask):
+    multigrid = benchmark_multigrid(mask, levels=(1, 3), max_iterations=6000, wind_deg=270.0)
+    assert all(run["converged"] and run["finite"] for run in multigrid.values())
+
+
+@pytest.mark.parametrize("kernel_name", ["fused", "aa"])
+def test_stepping_kernels_match_split(mask, kernel_name):
+    check = compare_lbm_kernels(mask, {"lbm_kernel": "split"}, {"lbm_kernel": kernel_name},
+                                iterations=301)
+    assert check["max_abs_magnitude"] < 1e-8
+
+
+def test_halfway_bounce_back_kernels_agree(mask):
+    halfway = compare_lbm_kernels(mask, {"lbm_kernel": "split", "bounce_back": "halfway"},
+                                  {"lbm_kernel": "fused", "bounce_back": "halfway"}, iterations=301)
+    assert halfway["max_abs_magnitude"] < 1e-8
+
+
+def test_rotated_domain(mask, reference_run):
+    # An oblique wind keeps the inflow direction it was given, a quarter
+    # turn reproduces the plain run
+    rot_params = dict(validate_simulation_params({"lbm_kernel": "fused", "relaxation_rate": 1.0}),
+                      max_iterations=3000)
+    fluid = ~mask
+    for deg in (270.0, 135.0):
+        ux_rot, uy_rot, _, _ = _run_lbm(mask, {"wind_speed_ms": 5.0, "wind_direction_deg": deg},
+                                        dict(rot_params, rotate_domain=True), False)
+        angle = np.degrees(np.arctan2(uy_rot[fluid].mean(), ux_rot[fluid].mean()))
+        expected = (270.0 - deg) % 360.0 - 180.0
+        ny_rot, nx_rot = _rotation_frame(mask.shape, deg)["rotated_shape"]
+        assert (ny_rot * nx_rot == mask.size) == (deg % 90.0 == 0.0)
+        assert abs((angle - expected + 180.0) % 360.0 - 180.0) < 3.0
+    ux_ref, uy_ref, _, _ = _run_lbm(mask, WEATHER, rot_params, False)
+    ux_rot, uy_rot, _, _ = _run_lbm(mask, WEATHER, dict(rot_params, rotate_domain=True), False)
+    assert np.array_equal(ux_rot[fluid], ux_ref[fluid]) and np.array_equal(uy_rot[fluid], uy_ref[fluid])
+    assert "rotated_cells" not in reference_run["performance"]
+
+
+def test_rotated_domain_crop(vector_params):
+    # A small obstacle crops the oblique lattice to well under its bounding
+    # box, and around the obstacle the cropped run matches the uncropped one
+    block = np.zeros((64, 96), dtype=bool)
+    block[30:34, 46:50] = True
+    ny_rot, nx_rot = _rotation_frame(block.shape, 135.0)["rotated_shape"]
+    ny_crop, nx_crop = _rotation_frame(block.shape, 135.0, block)["rotated_shape"]
+    assert ny_crop * nx_crop < 0.5 * ny_rot * nx_rot
+    rot_params = dict(validate_simulation_params({"lbm_kernel": "fused", "relaxation_rate": 1.6,
+                                                  "rotate_domain": True}), max_iterations=8000)
+    weather = {"wind_speed_ms": 5.0, "wind_direction_deg": 135.0}
+    ux, uy, _, _ = _run_lbm(block, weather, rot_params, False)
+    ux_full, uy_full, _, _ = _run_lbm(block, weather, dict(rot_params, rotated_padding=None), False)
+    near = ~block
+    near[:22] = near[42:] = False
+    near[:, :38] = near[:, 58:] = False
+    difference = np.linalg.norm(np.hypot(ux - ux_full, uy - uy_full)[near])
+    assert difference < 0.075 * np.linalg.norm(np.hypot(ux_full, uy_full)[near])
+    # Only rotated runs report the (cropped) lattice size
+    oblique = run_wind_simulation(block, {"width": 96, "height": 64}, weather,
+                                  dict(vector_params, rotate_domain=True))
+    assert oblique["performance"]["rotated_cell_ratio"] < 1.0
+
+
+def test_checkpoint_resume(mask, warm_params, tmp_path):
+    # A preempted run resumed from its checkpoint finishes bitwise identical
+    ckpt_params = dict(warm_params, max_iterations=900, convergence_tolerance=0.0,
+                       checkpoint_interval=200)
+    uninterrupted = run_wind_simulation(mask, GRID_INFO, WEATHER, ckpt_params)
+    run_wind_simulation(mask, GRID_INFO, WEATHER,
+                        dict(ckpt_params, max_iterations=500, checkpoint_dir=str(tmp_path)))
+    resumed = run_wind_simulation(mask, GRID_INFO, WEATHER,
+                                  dict(ckpt_params, checkpoint_dir=str(tmp_path),
+                                       resume_from_checkpoint=True))
+    assert resumed["magnitude_grid"] == uninterrupted["magnitude_grid"]
+    assert resumed["performance"]["iterations"] == uninterrupted["performance"]["iterations"]
+
+
+def test_wind_rose_ensemble(mask):
+    rose_params = dict(validate_simulation_params(TEST_PARAMS), max_iterations=301, buffer_size=0)
+    rose = run_wind_ensemble(mask, GRID_INFO,
+                             {"wind_directions_deg": [0, 90, 201, 270], "wind_speed_ms": 5.0},
+                             rose_params)
+    fused = _select_lbm_kernel({"lbm_kernel": "fused"})
+    for member, deg in enumerate(rose["wind_directions_deg"]):
+        ux_ref, uy_ref, _, _ = fused(mask, 5.0, deg, mask.shape[1], mask.shape[0],
+                                     301, rose_params["relaxation_rate"], False)
+        # Kernels loaded from the JIT cache may round differently from fresh builds
+        np.testing.assert_allclose(rose["ux"][member], ux_ref, rtol=0.0, atol=1e-10)
+        np.testing.assert_allclose(rose["uy"][member], uy_ref, rtol=0.0, atol=1e-10)
+
+
+def test_precompile_kernels(tmp_path):
+    # Warm-up in fresh processes (moving the JIT cache is process-wide): the
+    # second process only loads what the first compiled into cache_dir
+    script = ("import json, numpy as np; from colab.wind_simulation_module import precompile_kernels; "
+              f"report = precompile_kernels({str(tmp_path)!r}, precisions=('float32',), "
+              "mask_dtypes=(np.uint8,), decomposed=False, lbm_kernels=('aa',)); "
+              "print(json.dumps(report))")
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cold, hot = (json.loads(subprocess.run([sys.executable, "-c", script], cwd=repo, check=True,
+                                           capture_output=True, text=True).stdout.splitlines()[-1])
+                 for _ in range(2))
+    assert cold["cache_dir"] == hot["cache_dir"] == str(tmp_path)
+    assert "streamlines/particles" in hot["timings"] and hot["seconds"] < cold["seconds"] / 5
+
+
+def test_packed_mask(mask, tmp_path):
+    save_obstacle_mask(str(tmp_path / "mask.npz"), mask)
+    packed_mask = load_obstacle_mask(str(tmp_path / "mask.npz"))
+    assert np.array_equal(unpack_obstacle_mask(packed_mask), mask)
+    packed_params = dict(validate_simulation_params({"lbm_kernel": "fused", "skip_solid_cells": True}),
+                         max_iterations=301)
+    ux_ref, uy_ref, _, _ = _run_lbm(mask, WEATHER, packed_params, False)
+    ux_packed, uy_packed, _, _ = _run_lbm(packed_mask, WEATHER, packed_params, False)
+    np.testing.assert_allclose(ux_packed, ux_ref, rtol=0.0, atol=1e-10)
+    np.testing.assert_allclose(uy_packed, uy_ref, rtol=0.0, atol=1e-10)
+
+
+def test_planned_lattice_velocity(mask):
+    # Two flow-throughs at the inflow speed, and the same Reynolds number at
+    # half the lattice velocity gives the same flow
+    plan = plan_simulation_params(5.0, 2.0, mask.shape, 300.0, mlups=50.0)
+    assert plan["sim_params"]["max_iterations"] == 3000
+    assert 0.5 <= plan["sim_params"]["relaxation_rate"] <= 1.9
+    slow_plan = plan_simulation_params(5.0, 2.0, mask.shape, 300.0, mlups=50.0,
+                                       max_lattice_velocity=0.05)
+    planned = []
+    for p in (plan, slow_plan):
+        plan_params = dict(validate_simulation_params({"lbm_kernel": "fused"}), **p["sim_params"])
+        ux_plan, uy_plan, _, _ = _run_lbm(mask, WEATHER, plan_params, False)
+        planned.append(np.hypot(ux_plan, uy_plan))
+    assert np.linalg.norm(planned[1] - planned[0]) / np.linalg.norm(planned[0]) < 0.05
+
+
+def test_plan_stays_in_validated_range(mask):
+    viscous_plan = plan_simulation_params(5.0, 2.0, mask.shape, 0.5, mlups=50.0)
+    viscous_params = validate_simulation_params(dict(viscous_plan["sim_params"]))
+    assert viscous_plan["sim_params"]["lattice_velocity"] == _LATTICE_VELOCITY_RANGE[0]
+    assert all(viscous_params[key] == viscous_plan["sim_params"][key]
+               for key in ("lattice_velocity", "relaxation_rate"))
+    assert any("floor" in w for w in viscous_plan["warnings"])
+
+
+def test_time_averaging(mask):
+    # Split and fused kernels accumulate the same moments, and the
+    # turbulence-intensity map is finite and non-negative
+    averaged = {}
+    for kernel_name in ("split", "fused"):
+        averaged_params = dict(validate_simulation_params({"lbm_kernel": kernel_name}),
+                               max_iterations=301, averaging_window=100, buffer_size=0)
+        averaged[kernel_name] = {}
+        _run_lbm(mask, WEATHER, averaged_params, False, None, averaged[kernel_name])
+    assert averaged["split"]["samples"] == averaged["fused"]["samples"] == 100
+    np.testing.assert_allclose(averaged["split"]["moments"], averaged["fused"]["moments"],
+                               rtol=0.0, atol=1e-8)
+    averaged_run = run_wind_simulation(mask, GRID_INFO, WEATHER,
+                                       dict(averaged_params, generate_streamlines=False,
+                                            generate_particles=False))
+    intensity = np.array(averaged_run["time_averaged"]["turbulence_intensity_grid"])
+    assert np.all(np.isfinite(intensity)) and np.all(intensity >= 0.0)
+
+
+@pytest.mark.parametrize("kernel_name", ["split", "fused"])
+def test_converged_run_averages_full_window(mask, kernel_name):
+    # The same moments as a fixed-length run ending where it stopped
+    converging_params = dict(validate_simulation_params({"lbm_kernel": kernel_name}),
+                             max_iterations=4000, convergence_tolerance=3e-3,
+                             averaging_window=200, buffer_size=0)
+    converged, fixed = {}, {}
+    _, _, _, converged_iterations = _run_lbm(mask, WEATHER, converging_params, False,
+                                             None, converged)
+    _run_lbm(mask, WEATHER, dict(converging_params, max_iterations=converged_iterations,
+                                 convergence_tolerance=0.0), False, None, fixed)
+    assert converged_iterations < 4000 and converged["samples"] == fixed["samples"] == 200
+    np.testing.assert_allclose(converged["moments"], fixed["moments"], rtol=0.0, atol=1e-12)
+
+
+def test_autotune(mask, tmp_path):
+    # The stored configuration is found again and applied by the next run;
+    # an unreadable file leaves runs untuned
+    tune_path = str(tmp_path / "autotune.json")
+    threading_layer = numba.config.THREADING_LAYER
+    tuned = autotune_kernels(mask.shape, threading_layers=("workqueue",),
+                             chunk_sizes=(0, 4), iterations=5, repeats=1, path=tune_path)
+    assert _autotuned_config(mask.shape, {}, tune_path)["threads"] == tuned["threads"]
+    assert _autotuned_config(mask.shape, {"lbm_kernel": "fused", "precision": "float32"},
+                             tune_path) is None
+    run_params = dict(validate_simulation_params(TEST_PARAMS), max_iterations=100, buffer_size=0,
+                      autotune_file=tune_path, generate_streamlines=False, generate_particles=False)
+    tuned_run = run_wind_simulation(mask, GRID_INFO, WEATHER, run_params)
+    assert tuned_run["performance"]["autotuned"]["chunk_size"] == tuned["chunk_size"]
+    assert numba.config.THREADING_LAYER == threading_layer
+    # autotune=False opts a run out
+    assert run_wind_simulation(mask, GRID_INFO, WEATHER,
+                               dict(run_params, autotune=False))["performance"]["autotuned"] is None
+    with open(tune_path, "w") as f:
+        f.write('{"truncated": ')
+    untuned_run = run_wind_simulation(mask, GRID_INFO, WEATHER, run_params)
+    assert untuned_run["performance"]["autotuned"] is None
+
+
+def test_columnar_vector_field(mask, vector_params):
+    records = run_wind_simulation(mask, GRID_INFO, WEATHER, vector_params)["vector_field"]
+    columns = run_wind_simulation(mask, GRID_INFO, WEATHER,
+                                  dict(vector_params, vector_field_format="columns"))["vector_field"]
+    assert [dict(zip(columns, point)) for point in zip(*columns.values())] == records
+
+
+def test_result_schema_round_trip(columnar):
+    legacy = convert_results_schema(columnar, 2)
+    assert columnar["schema_version"] == 3 and convert_results_schema(legacy, 3) == columnar
+    assert [len(path) for path in legacy["particles"]] == np.diff(columnar["particles"]["offsets"]).tolist()
+    legacy_columns = dict(legacy, vector_field=columnar["vector_field"])
+    assert convert_results_schema(convert_results_schema(legacy_columns, 3), 2) == legacy_columns
+
+
+def test_result_bundle(mask, vector_params, tmp_path):
+    # Memory-mapped uint16 grids within half a quantisation step of the
+    # (rounded) JSON grid
+    bundled = run_wind_simulation(mask, GRID_INFO, WEATHER,
+                                  dict(vector_params, bundle_path=str(tmp_path / "result.bin")))
+    bundle = load_result_bundle(bundled["bundle"]["path"])
+    tolerance = (bundle["entries"]["magnitude"]["step"] / 2
+                 + 0.5 * 10.0 ** -vector_params["output_precision"] + 1e-6)
+    assert isinstance(bundle["arrays"]["magnitude"], np.memmap)
+    assert np.max(np.abs(bundle_array(bundle, "magnitude") - np.array(bundled["magnitude_grid"]))) <= tolerance
+    assert np.array_equal(bundle_array(bundle, "mask"), mask)
+
+
+def test_tile_pyramid_output(mask, vector_params, tmp_path):
+    # A 3 m grid in Gdańsk, rendered by two worker processes, gives PNG
+    # tiles for every zoom
+    tiled = run_wind_simulation(mask, dict(GRID_INFO, bounds=[477000.0, 720500.0, 477450.0, 720800.0]),
+                                WEATHER, dict(vector_params, tile_pyramid_dir=str(tmp_path),
+                                              tile_pyramid_processes=2))["tiles"]
+    with open(tmp_path / "tiles.json") as f:
+        assert json.load(f)["tiles"] == tiled["tiles"] > 0
+    written = {layer: sorted(os.path.relpath(os.path.join(root, name), tmp_path / layer)
+                             for root, _, names in os.walk(tmp_path / layer) for name in names)
+               for layer in ("magnitude", "velocity")}
+    zooms = {int(name.split(os.sep)[0]) for name in written["magnitude"]}
+    with open(tmp_path / "magnitude" / written["magnitude"][0], "rb") as f:
+        assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+    assert written["magnitude"] == written["velocity"] and len(written["magnitude"]) == tiled["tiles"]
+    assert zooms == set(range(tiled["zoom_range"][0], tiled["zoom_range"][1] + 1))
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_results_writer_matches_json_dumps(columnar, tmp_path, indent):
+    with open(tmp_path / "columnar.json", "w") as f:
+        write_results_json(f, columnar, indent=indent)
+    assert (tmp_path / "columnar.json").read_text() == json.dumps(columnar, indent=indent)
+
+
+def test_streamed_results_file(mask, vector_params, columnar, tmp_path):
+    # The gzip file holds exactly the grid and CSR paths the run no longer returns
+    _seed_path_rng(7)
+    streamed = run_wind_simulation(mask, GRID_INFO, WEATHER,
+                                   dict(vector_params, generate_streamlines=True,
+                                        generate_particles=True, streamline_count=20,
+                                        particle_count=100, result_schema_version=3,
+                                        results_path=str(tmp_path / "result.json.gz")))
+    with gzip.open(streamed["output"]["path"], "rt") as f:
+        written = json.load(f)
+    untimed = [key for key in columnar if key not in ("metadata", "performance")]
+    assert "magnitude_grid" not in streamed and list(written) == list(columnar)
+    assert {key: written[key] for key in untimed} == json.loads(json.dumps({key: columnar[key] for key in untimed}))
+    assert _vector_count(written["vector_field"]) == streamed["output"]["vector_points"]
+    assert _path_count(written["particles"]) == streamed["output"]["particles"]
+    assert written["particles"]["offsets"][-1] == len(written["particles"]["age"])
+
+
+def test_domain_decomposition(mask):
+    # Two strip processes reproduce _lbm_enhanced exactly
+    decomposed = compare_lbm_kernels(mask, {"lbm_kernel": "split"},
+                                     {"lbm_kernel": "split", "processes": 2}, iterations=301)
+    assert decomposed["max_abs_magnitude"] == 0.0
+
+
+@pytest.mark.parametrize("bounce_back, tolerance", [("halfway", 1e-10), ("fullway", 0.02)])
+def test_skip_solid_cells(mask, bounce_back, tolerance):
+    # Skipping obstacle cells leaves the converged fluid field as the dense
+    # run's: identical with halfway walls, within 2% (L2) with full-way walls,
+    # whose skipped wall cells reflect without relaxing (see _select_lbm_kernel)
+    fields = {}
+    for skip in (False, True):
+        kernel = _select_lbm_kernel({"lbm_kernel": "fused", "skip_solid_cells": skip,
+                                     "bounce_back": bounce_back})
+        fields[skip] = kernel(mask, 5.0, 270.0, mask.shape[1], mask.shape[0], 3000, 1.0, False)[:2]
+    (ux, uy), (dense_ux, dense_uy) = fields[True], fields[False]
+    fluid = ~mask
+    difference = np.linalg.norm(np.hypot(ux - dense_ux, uy - dense_uy)[fluid])
+    assert difference <= tolerance * np.linalg.norm(np.hypot(dense_ux, dense_uy)[fluid])
+    assert not ux[mask].any() and not uy[mask].any()
+
+
+@pytest.mark.parametrize("kernel_name", ["split", "aa"])
+def test_skip_solid_cells_rejected(kernel_name):
+    with pytest.raises(ValueError, match="skip_solid_cells"):
+        _select_lbm_kernel({"lbm_kernel": kernel_name, "skip_solid_cells": True})
+
+
+@pytest.mark.parametrize("skip, halfway", [(False, False), (True, False), (False, True)])
+def test_frozen_tile_segments(mask, skip, halfway):
+    # Updating every tile in column runs (all but the last step) reproduces
+    # the full sweep up to rounding; the empty frozen run forces the tiled
+    # path (zeroed spare buffers, as skipped obstacle interiors are never written)
+    ny, nx = mask.shape
+    index = _lattice_index_for(mask, skip or halfway, nx, walls=not halfway)
+    spans = (skip, index["span_ptr"], index["span_start"], index["span_end"], index["span_solid"],
+             halfway, index["boundary_links"])
+    u0, v0, edge = -0.036, -0.093, _inflow_edge(201.0)
+    warm = _initial_populations(ny, nx)
+    ux, uy = np.zeros((ny, nx)), np.zeros((ny, nx))
+    warm = _lbm_fused_steps(warm, np.empty_like(warm), mask, u0, v0, edge, 1.6, _RHO0, 200,
+                            ux, uy, *spans)[0]
+
+    fields = []
+    for tiled in (False, True):
+        F = warm.copy()
+        ux, uy = np.zeros((ny, nx)), np.zeros((ny, nx))
+        if tiled:
+            tiles = -(-ny // 16)
+            active = (np.arange(tiles + 1) * 3, np.tile([0, 37, 64], tiles),
+                      np.tile([37, 64, nx], tiles))
+            frozen = (np.r_[0, np.ones(tiles, dtype=np.int64)], np.zeros(1, dtype=np.int64),
+                      np.zeros(1, dtype=np.int64))
+            F = _lbm_tiled_steps(F, np.zeros_like(F), mask, u0, v0, edge, 1.6, _RHO0, 30,
+                                 ux, uy, *spans, 16, *active, *frozen,
+                                 np.zeros(30, dtype=np.bool_))[0]
+        else:
+            F = _lbm_fused_steps(F, np.zeros_like(F), mask, u0, v0, edge, 1.6, _RHO0, 30,
+                                 ux, uy, *spans)[0]
+        fields.append((F, ux, uy))
+    for plain, tiled in zip(*fields):
+        np.testing.assert_allclose(tiled, plain, rtol=0.0, atol=1e-12)
+
+
+def test_frozen_tiles(vector_params):
+    # The settled upstream fetch of a long field is frozen and the answer
+    # stays near the plain run's; other kernels and checkpointed runs are
+    # rejected
+    block = np.zeros((48, 288), dtype=bool)
+    block[21:27, 24:30] = True
+    params = dict(validate_simulation_params({"lbm_kernel": "fused", "relaxation_rate": 1.0}),
+                  max_iterations=12000, convergence_tolerance=1e-3)
+    tile_stats = {}
+    ux, uy, _, _ = _run_lbm(block, WEATHER, dict(params, frozen_tile_size=12,
+                                                 frozen_tile_tolerance=3e-4),
+                            False, None, None, tile_stats)
+    ux_plain, uy_plain, _, _ = _run_lbm(block, WEATHER, params, False)
+    assert tile_stats["skipped_tile_updates"] > 0.1 * tile_stats["tile_updates"]
+    difference = np.linalg.norm(np.hypot(ux, uy) - np.hypot(ux_plain, uy_plain))
+    assert difference < 5e-3 * np.linalg.norm(np.hypot(ux_plain, uy_plain))
+    for rejected in ({"lbm_kernel": "aa"}, {"lbm_kernel": "fused", "checkpoint_dir": "ckpt"}):
+        with pytest.raises(ValueError, match="frozen_tile_size"):
+            _select_lbm_kernel(dict(rejected, frozen_tile_size=12))
+    # Only tiled runs report the skipped share of tile updates
+    tiled = run_wind_simulation(block, {"width": 288, "height": 48}, WEATHER,
+                                dict(vector_params, frozen_tile_size=12))
+    assert 0.0 <= tiled["performance"]["skipped_tile_fraction"] < 1.0
+
+
+@pytest.mark.parametrize("kernel_name", ["fused", "aa"])
+def test_float32_precision(kernel_name):
+    assert validate_precision(lbm_kernel=kernel_name)["passed"]